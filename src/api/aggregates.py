@@ -0,0 +1,186 @@
+# Cross-evaluator aggregates.
+# Collects the (Evaluator, Lab, Scores) rows of every company in a run into one score
+# matrix and computes per-company and per-lab mean, min, max, standard deviation and
+# evaluator disagreement for all tabs in a single vectorized pass, instead of sheet
+# formulas recalculating cell by cell. The results go to a summary tab in one batchUpdate.
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+# Title the summary tab gets when it is turned on without a title of its own.
+DEFAULT_SUMMARY_TAB = 'Radar Summary'
+# Title of the summary tab. Off (an empty string) by default, so runs do not add a tab
+# to the workbook unless asked; set RADAR_SUMMARY_TAB to a title to turn it on.
+SUMMARY_TAB = os.environ.get('RADAR_SUMMARY_TAB', '')
+# Draw each company's mean scores over its radar plot. Override with RADAR_MEAN_OVERLAY=1.
+MEAN_OVERLAY = os.environ.get('RADAR_MEAN_OVERLAY', '').lower() in ('1', 'true', 'yes')
+
+COMPANY = 'Company'
+LAB = 'Lab'
+SUMMARY_HEADER = ['Sheet', 'Level', 'Name', 'Evaluations', 'Category', 'Mean', 'Min', 'Max', 'Std Dev',
+                  'Disagreement']
+DECIMALS = 3
+
+# Statistics per group, as arrays over groups (and categories).
+# - count: Rows per group.
+# - mean, min, max, std: (groups x categories); std is the population standard deviation.
+# - disagreement: Mean over categories of std, one number per group; 0 when every
+#   evaluator gave the same scores.
+GroupStats = namedtuple('GroupStats', ['count', 'mean', 'min', 'max', 'std', 'disagreement'])
+
+
+def grouped_stats(scores, codes, group_count):
+    """
+    Compute GroupStats for every group of a score matrix in one pass.
+    - scores: float matrix (rows x categories).
+    - codes: Group index of each row, from 0 to group_count - 1; every group needs a row.
+    """
+    order = np.argsort(codes, kind='stable')
+    ordered = scores[order]
+    count = np.bincount(codes, minlength=group_count)
+    starts = np.concatenate(([0], np.cumsum(count)[:-1]))
+    mean = np.add.reduceat(ordered, starts, axis=0) / count[:, None]
+    deviations = ordered - np.repeat(mean, count, axis=0)
+    std = np.sqrt(np.add.reduceat(deviations * deviations, starts, axis=0) / count[:, None])
+    return GroupStats(
+        count=count,
+        mean=mean,
+        min=np.minimum.reduceat(ordered, starts, axis=0),
+        max=np.maximum.reduceat(ordered, starts, axis=0),
+        std=std,
+        disagreement=std.mean(axis=1),
+    )
+
+def mean_scores(valid_rows):
+    """Return the per-category mean of a company's [(Evaluator, Lab, [Scores])] rows."""
+    return np.asarray([values for _, _, values in valid_rows], dtype=float).mean(axis=0).tolist()
+
+def data_sheet_properties(sheet_properties, summary_tab=SUMMARY_TAB):
+    """
+    Return the sheet properties without the summary tab, which is never read as data.
+    A DEFAULT_SUMMARY_TAB tab is skipped too, also when the summary is turned off, so a
+    tab written by an earlier run is not reported as an invalid evaluation tab.
+    """
+    skipped = {summary_tab, DEFAULT_SUMMARY_TAB} - {''}
+    return [properties for properties in sheet_properties if properties['title'] not in skipped]
+
+
+class ScoreCollector:
+    """
+    Score matrix of a run, filled group by group as the tabs stream in. Safe to share
+    between threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sheets = []       # Sheet names in order of first appearance
+        self.categories = {}   # {sheet name: categories}
+        self.groups = []       # [(sheet index, company name)], one per added group
+        self.row_counts = []   # Valid rows per group
+        self.labs = []         # Lab of every row
+        self.chunks = []       # Score matrix of every group
+
+    def __len__(self):
+        return len(self.groups)
+
+    def add(self, group):
+        """Add a CompanyGroup's valid rows."""
+        if not group.valid_rows:
+            return
+        scores = np.asarray([values for _, _, values in group.valid_rows], dtype=float)
+        with self.lock:
+            if group.sheet_name not in self.categories:
+                self.sheets.append(group.sheet_name)
+                self.categories[group.sheet_name] = list(group.categories)
+            self.groups.append((self.sheets.index(group.sheet_name), group.company_name))
+            self.row_counts.append(len(group.valid_rows))
+            self.labs.extend(str(lab) for _, lab, _ in group.valid_rows)
+            self.chunks.append(scores)
+
+    def summary_rows(self):
+        """
+        Return the summary tab rows (header first): per-company rows in tab order, then
+        per-lab rows, each expanded to one row per category.
+        """
+        with self.lock:
+            if not self.groups:
+                return [SUMMARY_HEADER]
+            scores = np.vstack(self.chunks)
+            row_counts = np.asarray(self.row_counts)
+            company_codes = np.repeat(np.arange(len(self.groups)), row_counts)
+            row_sheets = np.asarray([sheet for sheet, _ in self.groups])[company_codes]
+            lab_names, lab_index = np.unique(np.asarray(self.labs, dtype=str), return_inverse=True)
+            groups = list(self.groups)
+            sheets = list(self.sheets)
+            categories = dict(self.categories)
+
+        companies = grouped_stats(scores, company_codes, len(groups))
+        # Labs are compared within a tab, since tabs score different topics
+        lab_keys, lab_codes = np.unique(row_sheets * len(lab_names) + lab_index.ravel(), return_inverse=True)
+        labs = grouped_stats(scores, lab_codes.ravel(), len(lab_keys))
+        lab_groups = [(int(key) // len(lab_names), lab_names[int(key) % len(lab_names)]) for key in lab_keys]
+
+        rows = [SUMMARY_HEADER]
+        for level, keys, stats in ((COMPANY, groups, companies), (LAB, lab_groups, labs)):
+            order = sorted(range(len(keys)), key=lambda index: keys[index][0])  # Tab order, stable within a tab
+            for index in order:
+                sheet_name = sheets[keys[index][0]]
+                disagreement = round(float(stats.disagreement[index]), DECIMALS)
+                for column, category in enumerate(categories[sheet_name]):
+                    rows.append([
+                        sheet_name, level, str(keys[index][1]), int(stats.count[index]), str(category),
+                        round(float(stats.mean[index, column]), DECIMALS),
+                        round(float(stats.min[index, column]), DECIMALS),
+                        round(float(stats.max[index, column]), DECIMALS),
+                        round(float(stats.std[index, column]), DECIMALS),
+                        disagreement,
+                    ])
+        return rows
+
+
+def summary_fingerprint(rows):
+    """Hash the summary rows, so an unchanged summary is not written again."""
+    encoded = json.dumps(rows, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def _cell(value):
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+def summary_tab_requests(sheet_properties, rows, summary_tab=SUMMARY_TAB):
+    """
+    Return the spreadsheets.batchUpdate requests that replace the summary tab's contents,
+    creating the tab when it does not exist yet.
+    - sheet_properties: The spreadsheet's sheet property dicts (see SpreadsheetSnapshot).
+    """
+    existing = next((properties for properties in sheet_properties if properties['title'] == summary_tab), None)
+    grid = {'rowCount': max(len(rows), 2), 'columnCount': len(SUMMARY_HEADER), 'frozenRowCount': 1}
+    if existing is None:
+        sheet_id = max((properties['sheetId'] for properties in sheet_properties), default=0) + 1
+        requests = [{'addSheet': {'properties': {'sheetId': sheet_id, 'title': summary_tab, 'gridProperties': grid}}}]
+    else:
+        sheet_id = existing['sheetId']
+        # Size the grid to the summary, which also drops the rows of a longer earlier one
+        requests = [{'updateSheetProperties': {
+            'properties': {'sheetId': sheet_id, 'gridProperties': grid},
+            'fields': 'gridProperties(rowCount,columnCount,frozenRowCount)',
+        }}]
+    requests.append({'updateCells': {
+        'range': {'sheetId': sheet_id},  # Whole tab: cells the rows do not cover are cleared
+        'rows': [{'values': [_cell(value) for value in row]} for row in rows],
+        'fields': 'userEnteredValue',
+    }})
+    return requests
+
+def write_summary_tab(sheets_service, spreadsheet_id, sheet_properties, rows, summary_tab=SUMMARY_TAB):
+    """Replace the summary tab with rows in one spreadsheets.batchUpdate."""
+    sheets_service.spreadsheets().batchUpdate(
+        spreadsheetId=spreadsheet_id,
+        body={'requests': summary_tab_requests(sheet_properties, rows, summary_tab)}
+    ).execute()
+    print(f"Wrote {len(rows) - 1} aggregate rows to the {summary_tab} tab in one batch update.")
@@ -0,0 +1,613 @@
+# Local stand-in for the Sheets v4 and Drive v3 endpoints RadarSheets calls.
+# Serves synthetic workbooks over HTTP with optional latency and quota errors, and
+# counts every call, so the whole pipeline can be run and timed without real
+# credentials. Point google_clients at it with RADARSHEETS_API_EMULATOR.
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from sheet_writes import quote_sheet_name
+
+HEADER = ['Company', 'Evaluator', 'Lab', 'Innovate', 'Impact', 'Savings', 'Scalability', 'Risk']
+LABS = ['NREL', 'ORNL', 'PNNL', 'LBNL', 'ANL', 'INL']
+
+_A1_CELL = re.compile(r'^([A-Za-z]*)(\d*)$')
+_APP_PROPERTY = re.compile(r"appProperties has \{ key='((?:\\.|[^'\\])*)' and value='((?:\\.|[^'\\])*)' \}")
+
+
+def synthetic_workbook(tabs=24, companies_per_tab=125, evaluators=3, seed=0):
+    """
+    Build {tab title: rows} in the layout of the evaluation spreadsheet.
+    - tabs: Number of tabs.
+    - companies_per_tab: Companies per tab; each has one row per evaluator.
+    - evaluators: Evaluator rows per company.
+    About one row in fifty has a blank score, like unfinished evaluations.
+    """
+    rng = random.Random(seed)
+    workbook = {}
+    for tab in range(tabs):
+        rows = [list(HEADER)]
+        for company in range(companies_per_tab):
+            for evaluator in range(evaluators):
+                scores = [rng.randint(0, 10) for _ in range(5)]
+                if rng.random() < 0.02:
+                    scores[rng.randrange(5)] = ''
+                rows.append([f"Company {tab:02d}-{company:04d}", f"Evaluator {evaluator + 1}",
+                             rng.choice(LABS)] + scores)
+        workbook[f"Topic {tab + 1:02d}"] = rows
+    return workbook
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+def _column_index(letters):
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+def parse_a1(a1):
+    """
+    Split an A1 range into (title, first_row, first_col, last_row, last_col).
+    Bounds are zero-based and inclusive; open ends are None (e.g. 'A1:Z' has no last row).
+    """
+    if '!' in a1:
+        title, cells = a1.rsplit('!', 1)
+    else:
+        title, cells = a1, ''
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    if not cells:
+        return title, 0, 0, None, None
+    start, _, end = cells.partition(':')
+    start_col, start_row = _A1_CELL.match(start).groups()
+    end_col, end_row = _A1_CELL.match(end or start).groups()
+    return (
+        title,
+        int(start_row) - 1 if start_row else 0,
+        _column_index(start_col) if start_col else 0,
+        int(end_row) - 1 if end_row else None,
+        _column_index(end_col) if end_col else None,
+    )
+
+def _unescape(literal):
+    return re.sub(r'\\(.)', r'\1', literal)
+
+def _split_multipart(body, boundary):
+    """Return [(headers dict, payload bytes)] for a multipart body."""
+    parts = []
+    delimiter = b'--' + boundary.encode()
+    for chunk in body.split(delimiter)[1:]:
+        if chunk.startswith(b'--'):
+            break
+        chunk = chunk[2:] if chunk.startswith(b'\r\n') else chunk[1:]
+        for separator in (b'\r\n\r\n', b'\n\n'):
+            head, found, payload = chunk.partition(separator)
+            if found:
+                break
+        # The generator puts exactly one line break before the next delimiter
+        if payload.endswith(b'\r\n'):
+            payload = payload[:-2]
+        elif payload.endswith(b'\n'):
+            payload = payload[:-1]
+        parts.append((_parse_headers(head.decode('utf-8')), payload))
+    return parts
+
+def _parse_headers(text):
+    headers = {}
+    for line in text.splitlines():
+        name, found, value = line.partition(':')
+        if found:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+def _boundary(content_type):
+    match = re.search(r'boundary="?([^";]+)"?', content_type or '')
+    return match.group(1) if match else None
+
+
+class ApiError(Exception):
+    """An error response: HTTP status plus a Google-style error body."""
+
+    def __init__(self, status, message, reason='backendError', headers=None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.headers = headers or {}
+
+    def body(self):
+        return {'error': {'code': self.status, 'message': str(self),
+                          'errors': [{'reason': self.reason, 'message': str(self)}]}}
+
+
+class ApiEmulator:
+    """
+    Threaded HTTP server emulating the Sheets and Drive calls RadarSheets makes.
+    - port: Port to listen on; 0 picks a free one.
+    - latency: Seconds added to every HTTP request (batch parts are not delayed again).
+    - quota_error_rate: Fraction of calls (including batch parts) answered with a
+      429 RESOURCE_EXHAUSTED error carrying a Retry-After header.
+    - retry_after: Retry-After value in seconds for quota errors.
+    - seed: Seed for the quota error draws, so runs are repeatable.
+    Use as a context manager; url is the value for RADARSHEETS_API_EMULATOR.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, quota_error_rate=0.0, retry_after=1, seed=0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.quota_error_rate = quota_error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.spreadsheets = {}  # {id: {'title', 'sheets': [properties], 'values': {title: rows}, 'modifiedTime'}}
+        self.files = {}         # {id: metadata dict}
+        self.media = {}         # {id: bytes}
+        self.sessions = {}      # {upload_id: (file_id or None, metadata, bytearray)}
+        self.changes = []       # Drive changes feed: [(file_id, time)]; page tokens index into it
+        self.calls = Counter()
+        self.server = None
+        self.thread = None
+
+    # Server lifecycle
+    def start(self):
+        emulator = self
+
+        class Handler(_Handler):
+            pass
+        Handler.emulator = emulator
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='api-emulator', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    # Test data and statistics
+    def add_spreadsheet(self, workbook, spreadsheet_id=None, title='Synthetic Reviewer Scoring'):
+        """Serve a {tab title: rows} workbook and return its spreadsheet ID."""
+        spreadsheet_id = spreadsheet_id or uuid.uuid4().hex
+        with self.lock:
+            self.spreadsheets[spreadsheet_id] = {
+                'title': title,
+                'sheets': [
+                    {'sheetId': index, 'title': name, 'index': index, 'sheetType': 'GRID',
+                     'gridProperties': {'rowCount': max(1000, len(rows)), 'columnCount': 26}}
+                    for index, (name, rows) in enumerate(workbook.items())
+                ],
+                'values': {name: [list(row) for row in rows] for name, rows in workbook.items()},
+                'dimensions': {},
+            }
+            self._touch(spreadsheet_id, self.spreadsheets[spreadsheet_id])
+        return spreadsheet_id
+
+    def edit_cells(self, spreadsheet_id, a1, values):
+        """Change cells as an evaluator would, e.g. edit_cells(id, "'Topic 01'!D2", [[4]])."""
+        with self.lock:
+            self._write_range(spreadsheet_id, a1, values)
+
+    def call_counts(self):
+        """Return {method ID: calls}, e.g. {'drive.files.list': 120, 'batch': 2}."""
+        with self.lock:
+            return dict(self.calls)
+
+    def reset_counts(self):
+        with self.lock:
+            self.calls.clear()
+
+    # Request handling
+    def _count(self, method_id):
+        with self.lock:
+            self.calls[method_id] += 1
+            if self.quota_error_rate and self.random.random() < self.quota_error_rate:
+                self.calls['quota_errors'] += 1
+                raise ApiError(429, f"Quota exceeded for {method_id}.", reason='rateLimitExceeded',
+                               headers={'Retry-After': str(self.retry_after)})
+
+    def dispatch(self, method, path, query, headers, body):
+        """Handle one API call and return (status, headers, JSON-able body or bytes)."""
+        segments = [unquote(segment) for segment in path.strip('/').split('/')]
+        if segments[:2] == ['v4', 'spreadsheets'] and len(segments) >= 3:
+            return self._sheets(method, segments[2:], query, body)
+        if segments[:3] == ['upload', 'drive', 'v3']:
+            return self._upload(method, segments[3:], query, headers, body)
+        if segments[:2] == ['drive', 'v3']:
+            return self._drive(method, segments[2:], query, body)
+        raise ApiError(404, f"No emulated endpoint for {method} {path}", reason='notFound')
+
+    def _touch(self, file_id, resource):
+        """Update a file's modifiedTime and add it to the changes feed (lock held)."""
+        resource['modifiedTime'] = _now()
+        self.changes.append((file_id, resource['modifiedTime']))
+
+    def _spreadsheet(self, spreadsheet_id):
+        spreadsheet = self.spreadsheets.get(spreadsheet_id)
+        if spreadsheet is None:
+            raise ApiError(404, f"Requested entity was not found: {spreadsheet_id}", reason='notFound')
+        return spreadsheet
+
+    def _sheets(self, method, segments, query, body):
+        spreadsheet_id, _, action = segments[0].partition(':')
+        if len(segments) == 1 and not action and method == 'GET':
+            self._count('sheets.spreadsheets.get')
+            with self.lock:
+                spreadsheet = self._spreadsheet(spreadsheet_id)
+                return 200, {}, {
+                    'spreadsheetId': spreadsheet_id,
+                    'properties': {'title': spreadsheet['title']},
+                    'sheets': [{'properties': dict(properties)} for properties in spreadsheet['sheets']],
+                }
+        if len(segments) == 1 and action == 'batchUpdate' and method == 'POST':
+            self._count('sheets.spreadsheets.batchUpdate')
+            requests = json.loads(body or b'{}').get('requests', [])
+            with self.lock:
+                spreadsheet = self._spreadsheet(spreadsheet_id)
+                replies = [self._sheet_request(spreadsheet, request) for request in requests]
+                self._touch(spreadsheet_id, spreadsheet)
+            return 200, {}, {'spreadsheetId': spreadsheet_id, 'replies': replies}
+        if len(segments) == 2 and segments[1] == 'values:batchGet' and method == 'GET':
+            self._count('sheets.spreadsheets.values.batchGet')
+            with self.lock:
+                spreadsheet = self._spreadsheet(spreadsheet_id)
+                unformatted = query.get('valueRenderOption', [''])[0] == 'UNFORMATTED_VALUE'
+                value_ranges = [self._read_range(spreadsheet, a1, unformatted) for a1 in query.get('ranges', [])]
+            return 200, {}, {'spreadsheetId': spreadsheet_id, 'valueRanges': value_ranges}
+        if len(segments) == 2 and segments[1] == 'values:batchUpdate' and method == 'POST':
+            self._count('sheets.spreadsheets.values.batchUpdate')
+            data = json.loads(body or b'{}').get('data', [])
+            with self.lock:
+                cells = sum(self._write_range(spreadsheet_id, item['range'], item.get('values', [])) for item in data)
+            return 200, {}, {'spreadsheetId': spreadsheet_id, 'totalUpdatedCells': cells,
+                             'totalUpdatedRanges': len(data)}
+        if len(segments) == 3 and segments[1] == 'values':
+            a1 = segments[2]
+            if method in ('GET', 'PUT'):
+                self._count('sheets.spreadsheets.values.' + ('get' if method == 'GET' else 'update'))
+            with self.lock:
+                spreadsheet = self._spreadsheet(spreadsheet_id)
+                if method == 'GET':
+                    unformatted = query.get('valueRenderOption', [''])[0] == 'UNFORMATTED_VALUE'
+                    return 200, {}, self._read_range(spreadsheet, a1, unformatted)
+                if method == 'PUT':
+                    values = json.loads(body or b'{}').get('values', [])
+                    cells = self._write_range(spreadsheet_id, a1, values)
+                    return 200, {}, {'spreadsheetId': spreadsheet_id, 'updatedRange': a1, 'updatedCells': cells}
+        raise ApiError(404, f"No emulated Sheets endpoint for {method} {'/'.join(segments)}", reason='notFound')
+
+    def _sheet_request(self, spreadsheet, request):
+        """Apply one spreadsheets.batchUpdate request (lock held) and return its reply."""
+        by_id = {properties['sheetId']: properties for properties in spreadsheet['sheets']}
+        if 'updateDimensionProperties' in request:
+            update = request['updateDimensionProperties']
+            span = update['range']
+            for index in range(span['startIndex'], span['endIndex']):
+                spreadsheet['dimensions'][(span['sheetId'], span['dimension'], index)] = \
+                    update['properties'].get('pixelSize')
+            return {}
+        if 'addSheet' in request:
+            properties = dict(request['addSheet'].get('properties', {}))
+            if any(sheet['title'] == properties.get('title') for sheet in spreadsheet['sheets']):
+                raise ApiError(400, f"A sheet with the name \"{properties['title']}\" already exists.",
+                               reason='badRequest')
+            properties.setdefault('sheetId', max(by_id, default=0) + 1)
+            properties.setdefault('index', len(spreadsheet['sheets']))
+            properties.setdefault('sheetType', 'GRID')
+            properties['gridProperties'] = dict({'rowCount': 1000, 'columnCount': 26},
+                                                **properties.get('gridProperties', {}))
+            spreadsheet['sheets'].append(properties)
+            spreadsheet['values'][properties['title']] = []
+            return {'addSheet': {'properties': properties}}
+        if 'updateSheetProperties' in request:
+            update = request['updateSheetProperties']['properties']
+            properties = by_id[update['sheetId']]
+            properties.setdefault('gridProperties', {}).update(update.get('gridProperties', {}))
+            rows = spreadsheet['values'][properties['title']]
+            del rows[properties['gridProperties'].get('rowCount', len(rows)):]
+            return {}
+        if 'updateCells' in request:
+            update = request['updateCells']
+            span = update['range']
+            rows = spreadsheet['values'][by_id[span['sheetId']]['title']]
+            if 'startRowIndex' not in span:
+                rows.clear()  # Whole-sheet range: cells the rows do not cover are cleared
+            first_row, first_col = span.get('startRowIndex', 0), span.get('startColumnIndex', 0)
+            for offset, row in enumerate(update.get('rows', [])):
+                values = [next(iter(cell.get('userEnteredValue', {'stringValue': ''}).values()))
+                          for cell in row.get('values', [])]
+                self._place_row(rows, first_row + offset, first_col, values)
+            return {}
+        raise ApiError(400, f"Unsupported batchUpdate request: {sorted(request)}", reason='badRequest')
+
+    def _place_row(self, rows, index, first_col, row_values):
+        while len(rows) <= index:
+            rows.append([])
+        row = rows[index]
+        if len(row) < first_col + len(row_values):
+            row.extend([''] * (first_col + len(row_values) - len(row)))
+        row[first_col:first_col + len(row_values)] = row_values
+
+    def _read_range(self, spreadsheet, a1, unformatted=False):
+        """Return a ValueRange; numbers come back as text unless unformatted is set."""
+        title, first_row, first_col, last_row, last_col = parse_a1(a1)
+        if title not in spreadsheet['values']:
+            raise ApiError(400, f"Unable to parse range: {a1}", reason='badRequest')
+        rows = spreadsheet['values'][title]
+        end_row = len(rows) if last_row is None else min(len(rows), last_row + 1)
+        values = []
+        for row in rows[first_row:end_row]:
+            cells = row[first_col:] if last_col is None else row[first_col:last_col + 1]
+            while cells and cells[-1] in ('', None):
+                cells = cells[:-1]  # The API trims trailing empty cells
+            if not unformatted:
+                cells = [cell if isinstance(cell, str) else f"{cell:g}" for cell in cells]
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return {'range': f"{quote_sheet_name(title)}!{a1.rsplit('!', 1)[-1]}" if '!' in a1 else a1,
+                'majorDimension': 'ROWS', 'values': values}
+
+    def _write_range(self, spreadsheet_id, a1, values):
+        spreadsheet = self._spreadsheet(spreadsheet_id)
+        title, first_row, first_col, _, _ = parse_a1(a1)
+        if title not in spreadsheet['values']:
+            raise ApiError(400, f"Unable to parse range: {a1}", reason='badRequest')
+        rows = spreadsheet['values'][title]
+        cells = 0
+        for offset, row_values in enumerate(values):
+            self._place_row(rows, first_row + offset, first_col, row_values)
+            cells += len(row_values)
+        self._touch(spreadsheet_id, spreadsheet)
+        return cells
+
+    def _file_resource(self, file_id):
+        metadata = self.files.get(file_id)
+        if metadata is None:
+            raise ApiError(404, f"File not found: {file_id}.", reason='notFound')
+        return metadata
+
+    def _drive(self, method, segments, query, body):
+        if segments == ['files'] and method == 'GET':
+            self._count('drive.files.list')
+            q = query.get('q', [''])[0]
+            wanted = {(_unescape(key), _unescape(value)) for key, value in _APP_PROPERTY.findall(q)}
+            page_size = int(query.get('pageSize', ['100'])[0])
+            with self.lock:
+                files = [
+                    {'id': file_id, 'name': metadata['name'], 'appProperties': dict(metadata['appProperties'])}
+                    for file_id, metadata in self.files.items()
+                    if not metadata['trashed'] and wanted <= set(metadata['appProperties'].items())
+                ]
+            return 200, {}, {'files': files[:page_size]}
+        if len(segments) == 2 and segments[0] == 'files' and method == 'GET':
+            self._count('drive.files.get')
+            file_id = segments[1]
+            with self.lock:
+                if file_id in self.spreadsheets:
+                    spreadsheet = self.spreadsheets[file_id]
+                    return 200, {}, {'id': file_id, 'name': spreadsheet['title'],
+                                     'mimeType': 'application/vnd.google-apps.spreadsheet',
+                                     'modifiedTime': spreadsheet['modifiedTime']}
+                metadata = self._file_resource(file_id)
+                return 200, {}, {'id': file_id, 'name': metadata['name'], 'modifiedTime': metadata['modifiedTime']}
+        if segments == ['changes', 'startPageToken'] and method == 'GET':
+            self._count('drive.changes.getStartPageToken')
+            with self.lock:
+                return 200, {}, {'kind': 'drive#startPageToken', 'startPageToken': str(len(self.changes))}
+        if segments == ['changes'] and method == 'GET':
+            self._count('drive.changes.list')
+            try:
+                start = int(query.get('pageToken', [''])[0])
+            except ValueError:
+                raise ApiError(400, 'Invalid pageToken.', reason='badRequest')
+            page_size = int(query.get('pageSize', ['100'])[0])
+            with self.lock:
+                page = self.changes[start:start + page_size]
+                result = {'kind': 'drive#changeList', 'changes': [
+                    {'kind': 'drive#change', 'changeType': 'file', 'fileId': file_id, 'time': changed_at,
+                     'removed': False}
+                    for file_id, changed_at in page
+                ]}
+                end = start + len(page)
+                if end < len(self.changes):
+                    result['nextPageToken'] = str(end)
+                else:
+                    result['newStartPageToken'] = str(end)
+            return 200, {}, result
+        if len(segments) == 3 and segments[0] == 'files' and segments[2] == 'permissions' and method == 'POST':
+            self._count('drive.permissions.create')
+            permission = json.loads(body or b'{}')
+            with self.lock:
+                metadata = self._file_resource(segments[1])
+                metadata['permissions'].append(permission)
+            return 200, {}, {'id': 'anyoneWithLink' if permission.get('type') == 'anyone' else uuid.uuid4().hex,
+                             'kind': 'drive#permission'}
+        raise ApiError(404, f"No emulated Drive endpoint for {method} {'/'.join(segments)}", reason='notFound')
+
+    def _save_file(self, file_id, metadata, content):
+        """Create (file_id None) or update a Drive file and return its resource."""
+        with self.lock:
+            if file_id is None:
+                file_id = uuid.uuid4().hex[:28]
+                self.files[file_id] = {
+                    'name': metadata.get('name', 'Untitled'), 'mimeType': metadata.get('mimeType'),
+                    'parents': metadata.get('parents', []), 'appProperties': {}, 'permissions': [],
+                    'trashed': False,
+                }
+            stored = self._file_resource(file_id)
+            stored['appProperties'].update(metadata.get('appProperties', {}))
+            if 'name' in metadata:
+                stored['name'] = metadata['name']
+            self._touch(file_id, stored)
+            stored['md5Checksum'] = hashlib.md5(content).hexdigest()
+            self.media[file_id] = bytes(content)
+        return {'id': file_id, 'name': stored['name']}
+
+    def _upload(self, method, segments, query, headers, body):
+        upload_type = query.get('uploadType', [''])[0]
+        file_id = segments[1] if len(segments) == 2 else None
+        method_id = 'drive.files.update' if file_id else 'drive.files.create'
+
+        if 'upload_id' in query:
+            # Chunk of a resumable session; counted against the session's create/update call
+            upload_id = query['upload_id'][0]
+            with self.lock:
+                session = self.sessions.get(upload_id)
+            if session is None:
+                raise ApiError(404, 'Upload session not found.', reason='notFound')
+            target_id, metadata, content = session
+            content_range = headers.get('content-range', '')
+            match = re.match(r'bytes (\d+)-(\d+)/(\d+|\*)', content_range)
+            if match:
+                start, total = int(match.group(1)), match.group(3)
+                del content[start:]
+                content.extend(body)
+                if total == '*' or len(content) < int(total):
+                    return 308, {'Range': f"bytes=0-{len(content) - 1}"}, b''
+            else:
+                content[:] = body
+            with self.lock:
+                self.sessions.pop(upload_id, None)
+            return 200, {}, self._save_file(target_id, metadata, content)
+
+        self._count(method_id)
+        if upload_type == 'resumable':
+            metadata = json.loads(body or b'{}')
+            upload_id = uuid.uuid4().hex
+            with self.lock:
+                if file_id is not None:
+                    self._file_resource(file_id)
+                self.sessions[upload_id] = (file_id, metadata, bytearray())
+            location = f"{self.url}/upload/drive/v3/files{'/' + file_id if file_id else ''}" \
+                       f"?uploadType=resumable&upload_id={upload_id}"
+            return 200, {'Location': location}, b''
+        if upload_type == 'multipart':
+            parts = _split_multipart(body, _boundary(headers.get('content-type')))
+            metadata = json.loads(parts[0][1] or b'{}') if parts else {}
+            content = parts[1][1] if len(parts) > 1 else b''
+            return 200, {}, self._save_file(file_id, metadata, content)
+        if upload_type == 'media':
+            return 200, {}, self._save_file(file_id, {}, body)
+        raise ApiError(400, f"Unsupported uploadType: {upload_type!r}", reason='badRequest')
+
+    def dispatch_batch(self, headers, body):
+        """Answer a multipart/mixed batch request part by part."""
+        self._count('batch')
+        boundary = _boundary(headers.get('content-type'))
+        response_boundary = f"batch_{uuid.uuid4().hex}"
+        chunks = []
+        for part_headers, payload in _split_multipart(body, boundary):
+            request_line, _, rest = payload.decode('utf-8').replace('\r\n', '\n').partition('\n')
+            head, _, inner_body = rest.partition('\n\n')
+            method, target, _ = request_line.split(' ', 2)
+            parts = urlsplit(target)
+            status, extra_headers, result = _call(
+                self, method, parts.path, parse_qs(parts.query), _parse_headers(head), inner_body.encode('utf-8')
+            )
+            content = result if isinstance(result, bytes) else json.dumps(result).encode('utf-8')
+            header_lines = ''.join(f"{name}: {value}\r\n" for name, value in extra_headers.items())
+            content_id = part_headers.get('content-id', '<+0>')
+            chunks.append(
+                f"--{response_boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\nContent-Type: application/json; charset=UTF-8\r\n"
+                f"{header_lines}Content-Length: {len(content)}\r\n\r\n".encode('utf-8') + content + b'\r\n'
+            )
+        chunks.append(f"--{response_boundary}--\r\n".encode('utf-8'))
+        return 200, {'Content-Type': f"multipart/mixed; boundary={response_boundary}"}, b''.join(chunks)
+
+
+_REASONS = {200: 'OK', 308: 'Resume Incomplete', 400: 'Bad Request', 404: 'Not Found',
+            429: 'Too Many Requests', 500: 'Internal Server Error'}
+
+def _call(emulator, method, path, query, headers, body):
+    """Dispatch one call and turn ApiError into an error response."""
+    try:
+        return emulator.dispatch(method, path, query, headers, body)
+    except ApiError as e:
+        return e.status, e.headers, e.body()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep connections open like the real endpoints
+    emulator = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        emulator = self.emulator
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        headers = {name.lower(): value for name, value in self.headers.items()}
+        if emulator.latency:
+            time.sleep(emulator.latency)
+        parts = urlsplit(self.path)
+        try:
+            if parts.path.startswith('/batch'):
+                status, extra_headers, result = emulator.dispatch_batch(headers, body)
+            else:
+                status, extra_headers, result = _call(
+                    emulator, self.command, parts.path, parse_qs(parts.query), headers, body
+                )
+        except Exception as e:
+            status, extra_headers, result = 500, {}, ApiError(500, f"Emulator error: {e}").body()
+
+        content = result if isinstance(result, bytes) else json.dumps(result).encode('utf-8')
+        self.send_response(status, _REASONS.get(status))
+        if 'Content-Type' not in extra_headers:
+            self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        for name, value in extra_headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a synthetic spreadsheet on a local Sheets/Drive emulator.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--tabs', type=int, default=24)
+    parser.add_argument('--companies', type=int, default=125, help="Companies per tab.")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every request.")
+    parser.add_argument('--quota-error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    emulator = ApiEmulator(port=args.port, latency=args.latency, quota_error_rate=args.quota_error_rate)
+    spreadsheet_id = emulator.add_spreadsheet(synthetic_workbook(args.tabs, args.companies), 'synthetic')
+    with emulator:
+        print(f"Emulating Sheets and Drive at {emulator.url} (spreadsheet ID: {spreadsheet_id}).")
+        print(f"Run with RADARSHEETS_API_EMULATOR={emulator.url}. Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,244 @@
+# Asyncio client for the Sheets and Drive endpoints RadarSheets calls.
+# One aiohttp session holds a pool of keep-alive HTTP/1.1 connections, and every
+# coroutine shares one access token that is refreshed once when it expires, so
+# hundreds of requests can be in flight from a single thread. Calls go through the
+# same quota buckets, retries and metrics as the googleapiclient services.
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from urllib.parse import quote, urlsplit
+
+import aiohttp
+import google_auth_httplib2
+import httplib2
+from googleapiclient.errors import HttpError
+
+import google_clients
+from google_clients import get_credentials
+from request_scheduler import scheduler
+from run_metrics import metrics
+from settings import HTTP_TIMEOUT, SCOPES, SERVICE_ACCOUNT_FILE
+from token_cache import is_fresh
+
+SHEETS_URL = 'https://sheets.googleapis.com/v4/spreadsheets'
+DRIVE_URL = 'https://www.googleapis.com/drive/v3'
+DRIVE_UPLOAD_URL = 'https://www.googleapis.com/upload/drive/v3'
+
+# Connections kept open to each API host. Override with RADAR_ASYNC_CONNECTIONS.
+MAX_CONNECTIONS = int(os.environ.get('RADAR_ASYNC_CONNECTIONS', 100))
+KEEPALIVE_SECONDS = 60
+
+
+class SharedToken:
+    """
+    Access token shared by every coroutine and thread using the same credentials.
+    Only one refresh runs at a time; callers arriving meanwhile wait for its result
+    instead of refreshing again.
+    """
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self.lock = threading.Lock()
+
+    def _fresh(self):
+        if not self.credentials.token:
+            return False
+        return self.credentials.expiry is None or is_fresh(self.credentials.expiry)
+
+    def _refresh(self, force):
+        with self.lock:
+            if force or not self._fresh():
+                self.credentials.refresh(google_auth_httplib2.Request(httplib2.Http(timeout=HTTP_TIMEOUT)))
+            return self.credentials.token
+
+    async def get(self, force=False):
+        """Return a valid access token, refreshing it (off the event loop) when needed."""
+        if not force and self._fresh():
+            return self.credentials.token
+        return await asyncio.get_running_loop().run_in_executor(None, self._refresh, force)
+
+
+_tokens = {}
+_tokens_lock = threading.Lock()
+
+def shared_token(service_account_file=SERVICE_ACCOUNT_FILE, scopes=SCOPES):
+    """Return the process-wide SharedToken for a key file and scope set."""
+    key = (service_account_file, tuple(scopes))
+    with _tokens_lock:
+        if key not in _tokens:
+            _tokens[key] = SharedToken(get_credentials(service_account_file, tuple(scopes)))
+        return _tokens[key]
+
+def _http_error(status, headers, content, url):
+    """Build the googleapiclient HttpError for a failed response, so retry rules apply unchanged."""
+    resp = httplib2.Response({name.lower(): value for name, value in headers.items()})
+    resp.status = status
+    resp.reason = ''
+    return HttpError(resp, content, uri=url)
+
+def _multipart_related(metadata, media, mime_type):
+    """Return (body, content type) of a Drive multipart upload."""
+    boundary = f"radar_{uuid.uuid4().hex}"
+    body = b''.join([
+        f"--{boundary}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n".encode('utf-8'),
+        json.dumps(metadata).encode('utf-8'),
+        f"\r\n--{boundary}\r\nContent-Type: {mime_type}\r\n\r\n".encode('utf-8'),
+        media,
+        f"\r\n--{boundary}--\r\n".encode('utf-8'),
+    ])
+    return body, f"multipart/related; boundary={boundary}"
+
+
+class AsyncGoogleClient:
+    """
+    Asyncio client for the Sheets values and batchUpdate calls and the Drive file,
+    upload and permission calls.
+    - service_account_file, scopes: Credentials; ignored when google_clients.API_EMULATOR is set.
+    - max_connections: Size of the keep-alive connection pool per host.
+    Use as an async context manager (or call close()) inside the event loop it runs on.
+    Methods return the decoded JSON response and raise HttpError like execute() does.
+    Drive uploads are single multipart requests, meant for images of a few megabytes.
+    """
+
+    def __init__(self, service_account_file=SERVICE_ACCOUNT_FILE, scopes=SCOPES, max_connections=MAX_CONNECTIONS):
+        self.emulator = google_clients.API_EMULATOR
+        self.token = None if self.emulator else shared_token(service_account_file, scopes)
+        self.max_connections = max_connections
+        self.session = None
+
+    async def __aenter__(self):
+        return self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def open(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections, limit_per_host=self.max_connections,
+                keepalive_timeout=KEEPALIVE_SECONDS
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+                headers={'Accept-Encoding': 'gzip'}
+            )
+        return self
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _url(self, url):
+        if not self.emulator:
+            return url
+        parts = urlsplit(url)
+        return f"{self.emulator.rstrip('/')}{parts.path}"
+
+    async def request(self, method_id, http_method, url, params=None, json_body=None, data=None, headers=None):
+        """
+        Send one API call, paced and retried by the request scheduler and recorded in run_metrics.
+        - method_id: Discovery method ID, e.g. 'drive.files.create'; picks the quota bucket.
+        """
+        url = self._url(url)
+        refreshed = False
+
+        async def attempt():
+            nonlocal refreshed
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                while True:
+                    request_headers = dict(headers or {})
+                    if self.token is not None:
+                        request_headers['Authorization'] = f"Bearer {await self.token.get()}"
+                    async with self.session.request(http_method, url, params=params, json=json_body, data=data,
+                                                    headers=request_headers) as response:
+                        content = await response.read()
+                        status, response_headers = response.status, response.headers
+                    # The connection is back in the pool before a refresh or a second request
+                    if status == 401 and self.token is not None and not refreshed:
+                        # Token revoked or expired early: refresh once and send again
+                        refreshed = True
+                        await self.token.get(force=True)
+                        continue
+                    outcome = 'ok' if status < 400 else status
+                    if status >= 400:
+                        raise _http_error(status, response_headers, content, url)
+                    return json.loads(content) if content else {}
+            except aiohttp.ClientConnectionError as e:
+                raise ConnectionError(f"{method_id}: {e}") from e
+            finally:
+                # One record per attempt, whether or not it needed a token refresh
+                metrics.record_call(method_id, outcome, time.perf_counter() - start)
+
+        return await scheduler.call_async(method_id, attempt)
+
+    # Sheets
+    def _sheets_url(self, spreadsheet_id, suffix=''):
+        return f"{SHEETS_URL}/{quote(spreadsheet_id, safe='')}{suffix}"
+
+    async def values_get(self, spreadsheet_id, range_name, value_render_option='FORMATTED_VALUE'):
+        return await self.request(
+            'sheets.spreadsheets.values.get', 'GET',
+            self._sheets_url(spreadsheet_id, f"/values/{quote(range_name, safe='')}"),
+            params={'valueRenderOption': value_render_option, 'majorDimension': 'ROWS'}
+        )
+
+    async def values_batch_get(self, spreadsheet_id, ranges, value_render_option='FORMATTED_VALUE'):
+        params = [('ranges', range_name) for range_name in ranges]
+        params += [('valueRenderOption', value_render_option), ('majorDimension', 'ROWS')]
+        return await self.request(
+            'sheets.spreadsheets.values.batchGet', 'GET', self._sheets_url(spreadsheet_id, '/values:batchGet'),
+            params=params
+        )
+
+    async def values_update(self, spreadsheet_id, range_name, values, value_input_option='USER_ENTERED'):
+        return await self.request(
+            'sheets.spreadsheets.values.update', 'PUT',
+            self._sheets_url(spreadsheet_id, f"/values/{quote(range_name, safe='')}"),
+            params={'valueInputOption': value_input_option}, json_body={'values': values}
+        )
+
+    async def values_batch_update(self, spreadsheet_id, data, value_input_option='USER_ENTERED'):
+        """data: [{'range': A1 range, 'values': rows}], as for values.batchUpdate."""
+        return await self.request(
+            'sheets.spreadsheets.values.batchUpdate', 'POST', self._sheets_url(spreadsheet_id, '/values:batchUpdate'),
+            json_body={'valueInputOption': value_input_option, 'data': data}
+        )
+
+    async def batch_update(self, spreadsheet_id, requests):
+        return await self.request(
+            'sheets.spreadsheets.batchUpdate', 'POST', self._sheets_url(spreadsheet_id, ':batchUpdate'),
+            json_body={'requests': requests}
+        )
+
+    # Drive
+    async def files_list(self, q, fields='files(id, appProperties)', page_size=10):
+        return await self.request(
+            'drive.files.list', 'GET', f"{DRIVE_URL}/files",
+            params={'q': q, 'spaces': 'drive', 'fields': fields, 'pageSize': page_size}
+        )
+
+    async def files_create(self, metadata, media, mime_type='image/png', fields='id'):
+        body, content_type = _multipart_related(metadata, media, mime_type)
+        return await self.request(
+            'drive.files.create', 'POST', f"{DRIVE_UPLOAD_URL}/files",
+            params={'uploadType': 'multipart', 'fields': fields}, data=body, headers={'Content-Type': content_type}
+        )
+
+    async def files_update(self, file_id, media, metadata=None, mime_type='image/png', fields='id'):
+        body, content_type = _multipart_related(metadata or {}, media, mime_type)
+        return await self.request(
+            'drive.files.update', 'PATCH', f"{DRIVE_UPLOAD_URL}/files/{quote(file_id, safe='')}",
+            params={'uploadType': 'multipart', 'fields': fields}, data=body, headers={'Content-Type': content_type}
+        )
+
+    async def permissions_create(self, file_id, permission=None, fields='id'):
+        return await self.request(
+            'drive.permissions.create', 'POST', f"{DRIVE_URL}/files/{quote(file_id, safe='')}/permissions",
+            params={'fields': fields}, json_body=permission or {'role': 'reader', 'type': 'anyone'}
+        )
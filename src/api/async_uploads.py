@@ -0,0 +1,155 @@
+# Drive uploads on asyncio.
+# Same tagging, hash check and in-place updates as drive_uploads.py, but each upload is
+# a coroutine on one event loop sharing a keep-alive connection pool, so many uploads
+# can be in flight without a thread each.
+import asyncio
+import hashlib
+import os
+import threading
+from concurrent.futures import wait
+
+from async_clients import AsyncGoogleClient
+from drive_uploads import (
+    APP_HASH, CREATED, LOOKUP, RESUMABLE_THRESHOLD, UNCHANGED, UPDATED, UPLOAD_WORKERS, image_metadata, image_query,
+    upload_image_to_drive
+)
+from output_profiles import image_mime_type
+from run_metrics import metrics
+from settings import SCOPES, SERVICE_ACCOUNT_FILE
+
+
+def _read_image(file_path):
+    """Return (bytes, SHA-256 hex digest) of a file."""
+    with open(file_path, 'rb') as f:
+        media = f.read()
+    return media, hashlib.sha256(media).hexdigest()
+
+async def upload_image_async(client, file_path, company_name, sheet_name, spreadsheet_id, existing=LOOKUP,
+                             share=True):
+    """
+    upload_image_to_drive for coroutines; returns (file ID, outcome), (None, None) on error.
+    - client: Open AsyncGoogleClient.
+    - existing, share: See upload_image_to_drive.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        media, content_hash = await loop.run_in_executor(None, _read_image, file_path)
+        if existing is LOOKUP:
+            files = (await client.files_list(image_query(spreadsheet_id, company_name, sheet_name))).get('files', [])
+            existing = files[0] if files else None
+
+        if existing is not None:
+            file_id = existing['id']
+            if existing.get('appProperties', {}).get(APP_HASH) == content_hash:
+                print(f"Image for {company_name} in {sheet_name} is unchanged; reusing Drive file {file_id}")
+                if share:
+                    await client.permissions_create(file_id)
+                return file_id, UNCHANGED
+
+            # Replace the media in place so the URL already in the sheet stays valid
+            mime_type = image_mime_type(file_path)
+            metadata = {'mimeType': mime_type, 'appProperties': {APP_HASH: content_hash}}
+            await client.files_update(file_id, media, metadata=metadata, mime_type=mime_type)
+            metrics.add('upload_bytes', len(media))
+            print(f"Updated Drive file {file_id} for {company_name} in {sheet_name}")
+            if share:
+                await client.permissions_create(file_id)
+            return file_id, UPDATED
+
+        uploaded_file = await client.files_create(
+            image_metadata(file_path, company_name, sheet_name, spreadsheet_id, content_hash), media,
+            mime_type=image_mime_type(file_path)
+        )
+        file_id = uploaded_file.get('id')
+        metrics.add('upload_bytes', len(media))
+
+        # Make the file publicly accessible
+        if share:
+            await client.permissions_create(file_id)
+
+        return file_id, CREATED
+    except Exception as e:
+        print(f"Error uploading image to Drive: {e}")
+        return None, None
+
+
+class AsyncUploadExecutor:
+    """
+    Drop-in replacement for drive_uploads.UploadExecutor that runs uploads as coroutines
+    on an event loop in a background thread.
+    - service_factory: Callable returning a Drive service for the calling thread; only used
+      for files over RESUMABLE_THRESHOLD, which keep the chunked, resumable threaded path.
+    - workers: Number of uploads in flight at once.
+    - service_account_file, scopes: Credentials for the async client.
+    Use as a context manager, or call close() when done.
+    """
+
+    def __init__(self, service_factory, workers=UPLOAD_WORKERS, service_account_file=SERVICE_ACCOUNT_FILE,
+                 scopes=SCOPES):
+        self.service_factory = service_factory
+        self.workers = max(1, workers)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='drive-upload-loop', daemon=True)
+        self.thread.start()
+        self.client = AsyncGoogleClient(service_account_file, scopes, max_connections=self.workers)
+        self.pending = set()
+        self.lock = threading.Lock()
+        asyncio.run_coroutine_threadsafe(self._open(), self.loop).result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    async def _open(self):
+        # The session and semaphore belong to the loop they are created on
+        self.client.open()
+        self.slots = asyncio.Semaphore(self.workers)
+
+    async def _upload(self, file_path, company_name, sheet_name, spreadsheet_id, existing, share):
+        async with self.slots:
+            try:
+                resumable = os.path.getsize(file_path) > RESUMABLE_THRESHOLD
+            except OSError as e:
+                # Same contract as the threaded backend: report the error, return (None, None)
+                print(f"Error uploading image to Drive: {e}")
+                return None, None
+            if resumable:
+                return await self.loop.run_in_executor(
+                    None, lambda: upload_image_to_drive(
+                        self.service_factory(), file_path, company_name, sheet_name, spreadsheet_id, existing, share
+                    )
+                )
+            return await upload_image_async(
+                self.client, file_path, company_name, sheet_name, spreadsheet_id, existing, share
+            )
+
+    def submit(self, file_path, company_name, sheet_name, spreadsheet_id, existing=LOOKUP, share=True):
+        """
+        Queue an upload and return a Future resolving to (file ID, outcome).
+        - existing, share: Passed through to upload_image_to_drive.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._upload(file_path, company_name, sheet_name, spreadsheet_id, existing, share), self.loop
+        )
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        with self.lock:
+            self.pending.discard(future)
+
+    def close(self):
+        """Wait for queued uploads to finish, close the connections and stop the loop."""
+        if self.loop.is_closed():
+            return
+        with self.lock:
+            pending = list(self.pending)
+        wait(pending)
+        asyncio.run_coroutine_threadsafe(self.client.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
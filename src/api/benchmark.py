@@ -0,0 +1,167 @@
+# End-to-end benchmark against the local API emulator.
+# Runs the full read/render/upload/insert pipeline on synthetic workbooks and reports
+# stage timings and API call counts, so performance can be compared between commits.
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import nullcontext
+
+import google_clients
+from api_emulator import ApiEmulator, synthetic_workbook
+from drive_uploads import UPLOAD_BACKEND, UPLOAD_BACKENDS, UPLOAD_WORKERS
+from output_profiles import OUTPUT_PROFILE_NAME, PROFILES, output_profile
+from radar_render import PNG_BACKEND, RENDER_WORKERS, RenderPool
+from run_metrics import metrics
+from workbook_runner import WORKBOOK_WORKERS, make_workbooks, run_workbooks
+
+# Named workloads: workbook size and count plus emulator behaviour.
+SCENARIOS = {
+    'small': dict(tabs=4, companies_per_tab=50),
+    'large': dict(tabs=24, companies_per_tab=125),
+    'latency': dict(tabs=4, companies_per_tab=50, latency=0.05),
+    'quota': dict(tabs=4, companies_per_tab=50, quota_error_rate=0.02),
+    'workbooks': dict(tabs=2, companies_per_tab=25, workbooks=8, latency=0.05),
+}
+
+
+def git_revision():
+    """Return the short commit hash of the working tree, or None outside git."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_scenario(name, render_workers=RENDER_WORKERS, upload_workers=UPLOAD_WORKERS, png_backend=PNG_BACKEND,
+                 html_mode='none', passes=2, workbook_workers=WORKBOOK_WORKERS, upload_backend=UPLOAD_BACKEND,
+                 profile_name=OUTPUT_PROFILE_NAME):
+    """
+    Run one scenario and return a result dict per pass.
+    The first pass starts from an empty Drive; later passes find every image already
+    uploaded, which measures the unchanged-run path.
+    """
+    settings = dict(SCENARIOS[name])
+    tabs, companies_per_tab = settings.pop('tabs'), settings.pop('companies_per_tab')
+    workbook_count = settings.pop('workbooks', 1)
+    results = []
+    output_dir = tempfile.mkdtemp(prefix=f"radar_bench_{name}_")
+    previous_emulator = google_clients.API_EMULATOR
+    try:
+        with ApiEmulator(**settings) as emulator:
+            google_clients.API_EMULATOR = emulator.url
+            spreadsheet_ids = [
+                emulator.add_spreadsheet(synthetic_workbook(tabs, companies_per_tab, seed=index))
+                for index in range(workbook_count)
+            ]
+            workbooks = make_workbooks(spreadsheet_ids, output_dir)
+            if upload_backend == 'async':
+                from async_uploads import AsyncUploadExecutor  # Needs aiohttp
+                uploads = AsyncUploadExecutor(google_clients.get_drive_service, upload_workers)
+            else:
+                uploads = nullcontext()
+            render_pool = RenderPool(render_workers, png_backend=png_backend, profile=output_profile(profile_name))
+            with render_pool, uploads as uploader:
+                for run in range(passes):
+                    emulator.reset_counts()
+                    metrics.reset()
+                    summary = run_workbooks(
+                        workbooks,
+                        google_clients.get_sheets_service,
+                        google_clients.get_drive_service,
+                        render_pool,
+                        html_mode=html_mode,
+                        upload_workers=upload_workers,
+                        workers=workbook_workers,
+                        uploader=uploader,
+                    )
+                    calls = emulator.call_counts()
+                    results.append({
+                        'scenario': name,
+                        'pass': run + 1,
+                        'workbooks': workbook_count,
+                        'companies': summary['counts']['companies'],
+                        'total_seconds': round(summary['total_seconds'], 3),
+                        'companies_per_second': round(
+                            summary['counts']['companies'] / summary['total_seconds'], 1
+                        ) if summary['total_seconds'] else None,
+                        'stage_seconds': {stage: round(seconds, 3) for stage, seconds in summary['stage_seconds'].items()},
+                        'counts': summary['counts'],
+                        'failed': sum(len(companies) for companies in summary['failed_inserts'].values())
+                                  + len(summary['errors']),
+                        'api_calls': sum(count for method, count in calls.items() if method != 'quota_errors'),
+                        'api_calls_by_method': calls,
+                        'retries': sum(metrics.retries.values()),
+                        'upload_bytes': metrics.counters.get('upload_bytes', 0),
+                    })
+    finally:
+        google_clients.API_EMULATOR = previous_emulator
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return results
+
+def print_result(result):
+    print(f"\n== {result['scenario']} (pass {result['pass']}): {result['companies']} companies from "
+          f"{result.get('workbooks', 1)} workbook(s) in {result['total_seconds']}s "
+          f"({result['companies_per_second']}/s), {result['failed']} failed")
+    print(f"   stages (s): {result['stage_seconds']}")
+    print(f"   counts: {result['counts']}")
+    print(f"   API calls: {result['api_calls']} {result['api_calls_by_method']}")
+    print(f"   retries: {result['retries']}, uploaded bytes: {result['upload_bytes']}")
+
+def compare(previous, current):
+    """Print total time and API call changes between two benchmark reports."""
+    old = {(result['scenario'], result['pass']): result for result in previous['results']}
+    print(f"\nComparison with {previous.get('revision') or 'previous run'}:")
+    for result in current['results']:
+        before = old.get((result['scenario'], result['pass']))
+        if before is None:
+            continue
+        change = (result['total_seconds'] - before['total_seconds']) / before['total_seconds'] * 100 \
+            if before['total_seconds'] else 0.0
+        print(f"  {result['scenario']} pass {result['pass']}: {before['total_seconds']}s -> "
+              f"{result['total_seconds']}s ({change:+.1f}%), API calls {before['api_calls']} -> {result['api_calls']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the radar pipeline against the local API emulator.")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable); defaults to all.")
+    parser.add_argument('--passes', type=int, default=2, help="Runs per scenario; runs after the first are unchanged.")
+    parser.add_argument('--render-workers', type=int, default=RENDER_WORKERS)
+    parser.add_argument('--upload-workers', type=int, default=UPLOAD_WORKERS)
+    parser.add_argument('--workbook-workers', type=int, default=WORKBOOK_WORKERS)
+    parser.add_argument('--upload-backend', choices=UPLOAD_BACKENDS, default=UPLOAD_BACKEND)
+    parser.add_argument('--png-backend', default=PNG_BACKEND)
+    parser.add_argument('--output-profile', choices=sorted(PROFILES), default=OUTPUT_PROFILE_NAME)
+    parser.add_argument('--html-mode', default='none')
+    parser.add_argument('--json', help="Write the report to this file.")
+    parser.add_argument('--compare', help="Earlier JSON report to compare against.")
+    args = parser.parse_args()
+
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'settings': {'render_workers': args.render_workers, 'upload_workers': args.upload_workers,
+                     'workbook_workers': args.workbook_workers, 'upload_backend': args.upload_backend,
+                     'png_backend': args.png_backend, 'output_profile': args.output_profile,
+                     'html_mode': args.html_mode},
+        'results': [],
+    }
+    for name in args.scenario or sorted(SCENARIOS):
+        for result in run_scenario(name, args.render_workers, args.upload_workers, args.png_backend,
+                                   args.html_mode, args.passes, args.workbook_workers, args.upload_backend,
+                                   args.output_profile):
+            report['results'].append(result)
+            print_result(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBenchmark report saved: {args.json}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), report)
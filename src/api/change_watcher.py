@@ -0,0 +1,109 @@
+# Watch mode.
+# Polls the Drive changes feed for the watched spreadsheets and, once a burst of edits
+# has settled, calls back with the spreadsheets that changed. The caller then runs an
+# incremental pass, which only re-renders, re-uploads and rewrites the companies whose
+# rows changed.
+import os
+import threading
+import time
+
+# Seconds between changes.list polls. Override with RADAR_WATCH_POLL_SECONDS.
+POLL_SECONDS = float(os.environ.get('RADAR_WATCH_POLL_SECONDS', 5))
+# Quiet time after the last edit before a spreadsheet is regenerated, so a burst of
+# edits triggers one update. Override with RADAR_WATCH_DEBOUNCE_SECONDS.
+DEBOUNCE_SECONDS = float(os.environ.get('RADAR_WATCH_DEBOUNCE_SECONDS', 15))
+# Longest a change waits while edits keep arriving. Override with RADAR_WATCH_MAX_DELAY_SECONDS.
+MAX_DELAY_SECONDS = float(os.environ.get('RADAR_WATCH_MAX_DELAY_SECONDS', 120))
+
+CHANGES_PAGE_SIZE = 1000
+
+
+def start_page_token(drive_service):
+    """Return the changes feed token for 'now'; changes after this call are listed from it."""
+    return drive_service.changes().getStartPageToken(supportsAllDrives=True).execute()['startPageToken']
+
+def list_changed_files(drive_service, page_token):
+    """
+    Return (IDs of the files changed since page_token, token to continue from).
+    Follows nextPageToken until the feed is exhausted.
+    """
+    file_ids = set()
+    while True:
+        result = drive_service.changes().list(
+            pageToken=page_token,
+            pageSize=CHANGES_PAGE_SIZE,
+            spaces='drive',
+            includeItemsFromAllDrives=True,
+            supportsAllDrives=True,
+            fields='nextPageToken,newStartPageToken,changes(fileId,removed)'
+        ).execute()
+        file_ids.update(change['fileId'] for change in result.get('changes', []) if change.get('fileId'))
+        if 'newStartPageToken' in result:
+            return file_ids, result['newStartPageToken']
+        page_token = result['nextPageToken']
+
+
+class ChangeWatcher:
+    """
+    Debounced watcher over the Drive changes feed.
+    - drive_factory: Callable returning a Drive service for the calling thread.
+    - spreadsheet_ids: Spreadsheets to watch; changes to any other file are ignored.
+    - on_change: Called with the set of changed spreadsheet IDs once their edits have
+      settled. Changes that arrive while it runs are picked up by the next poll.
+    - poll_seconds, debounce_seconds, max_delay_seconds: See the module constants.
+    Call start() before the first full run so that no edit made during it is missed,
+    then run() to watch until stop() is called.
+    """
+
+    def __init__(self, drive_factory, spreadsheet_ids, on_change, poll_seconds=POLL_SECONDS,
+                 debounce_seconds=DEBOUNCE_SECONDS, max_delay_seconds=MAX_DELAY_SECONDS):
+        self.drive_factory = drive_factory
+        self.spreadsheet_ids = set(spreadsheet_ids)
+        self.on_change = on_change
+        self.poll_seconds = poll_seconds
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.page_token = None
+        self.pending = {}  # {spreadsheet ID: [first change seen, last change seen]} (monotonic)
+        self.stopped = threading.Event()
+
+    def start(self):
+        """Take the changes feed position to watch from."""
+        self.page_token = start_page_token(self.drive_factory())
+        return self
+
+    def poll(self):
+        """Fetch new changes and add the watched spreadsheets among them to pending."""
+        file_ids, self.page_token = list_changed_files(self.drive_factory(), self.page_token)
+        now = time.monotonic()
+        for spreadsheet_id in file_ids & self.spreadsheet_ids:
+            self.pending.setdefault(spreadsheet_id, [now, now])[1] = now
+
+    def due(self):
+        """Return and clear the pending spreadsheets whose edits have settled (or waited too long)."""
+        now = time.monotonic()
+        ready = {
+            spreadsheet_id for spreadsheet_id, (first, last) in self.pending.items()
+            if now - last >= self.debounce_seconds or now - first >= self.max_delay_seconds
+        }
+        for spreadsheet_id in ready:
+            del self.pending[spreadsheet_id]
+        return ready
+
+    def run(self):
+        """Poll until stop(); failed polls are retried at the next interval."""
+        if self.page_token is None:
+            self.start()
+        print(f"Watching {len(self.spreadsheet_ids)} spreadsheet(s) for changes every {self.poll_seconds:g}s.")
+        while not self.stopped.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error polling the Drive changes feed: {e}")
+            ready = self.due()
+            if ready:
+                self.on_change(ready)
+            self.stopped.wait(self.poll_seconds)
+
+    def stop(self):
+        self.stopped.set()
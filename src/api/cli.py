@@ -0,0 +1,125 @@
+# Unified command line for RadarSheets.
+# One entry point for the full pipeline and the short commands. Only argparse and the
+# standard library load at startup; each command imports what it needs when it runs,
+# so listing tabs or plotting one company does not pay for plotly, googleapiclient or
+# google-auth, and cached access tokens (token_cache.py) skip the token exchange.
+import argparse
+import os
+import runpy
+import sys
+import time
+
+from settings import RADAR_PLOTS_DIR, SCOPES, SERVICE_ACCOUNT_FILE, SPREADSHEET_ID, spreadsheet_id_from
+
+RENDER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'google_sheets_radar_plot.1.py')
+
+
+def _light_service(args):
+    from light_sheets import LightSheetsService
+
+    # The pipeline's scopes, so the short commands and full runs share cached tokens
+    return LightSheetsService(args.credentials, SCOPES)
+
+def command_run(args):
+    """Run the full pipeline; the remaining arguments go to main_script."""
+    import main_script
+
+    main_script.main(args.pipeline_args)
+
+def command_render(args):
+    """Render every plot locally without uploading (google_sheets_radar_plot.1.py)."""
+    runpy.run_path(RENDER_SCRIPT, run_name='__main__')
+
+def command_sheets(args):
+    """List the spreadsheet's tabs with their size."""
+    from sheet_snapshot import SpreadsheetSnapshot
+
+    snapshot = SpreadsheetSnapshot.load_metadata(_light_service(args), spreadsheet_id_from(args.spreadsheet))
+    for properties in snapshot.sheet_properties:
+        grid = properties.get('gridProperties', {})
+        print(f"{properties['title']}\t{grid.get('rowCount', 0)} rows x {grid.get('columnCount', 0)} columns")
+
+def command_company(args):
+    """Plot one company locally from a streamed read of its tab(s)."""
+    from aggregates import SUMMARY_TAB, data_sheet_properties, mean_scores
+    from data_cleaner import CLEAN_DATA, DataCleaner
+    from output_profiles import OUTPUT_PROFILE, image_extension, output_profile
+    from sheet_snapshot import SpreadsheetSnapshot
+    from sheet_stream import stream_company_groups
+
+    service = _light_service(args)
+    spreadsheet_id = spreadsheet_id_from(args.spreadsheet)
+    snapshot = SpreadsheetSnapshot.load_metadata(service, spreadsheet_id)
+    sheet_properties = data_sheet_properties(snapshot.sheet_properties, SUMMARY_TAB)
+    if args.sheet:
+        sheet_properties = [properties for properties in sheet_properties if properties['title'] == args.sheet]
+        if not sheet_properties:
+            print(f"Sheet {args.sheet} not found.")
+            return 1
+
+    cleaner = DataCleaner() if CLEAN_DATA else None
+    stream = stream_company_groups(service, spreadsheet_id, sheet_properties, cleaner=cleaner)
+    group = next((group for group in stream if group.company_name == args.company), None)
+    stream.close()  # Stop reading once the company is complete
+    if group is None or not group.valid_rows:
+        print(f"No valid data for company: {args.company}")
+        return 1
+
+    profile = output_profile(args.output_profile) if args.output_profile else OUTPUT_PROFILE
+    os.makedirs(args.output_dir, exist_ok=True)
+    base = os.path.join(args.output_dir, f"{group.company_name}_{group.sheet_name}_radar")
+    png_path = f"{base}{image_extension(profile)}"
+    if args.png_backend == 'raster' and not args.html:
+        from raster_render import write_radar_png
+
+        write_radar_png(group.valid_rows, group.categories, group.company_name, png_path, profile,
+                        mean_values=mean_scores(group.valid_rows) if args.mean_overlay else None)
+    else:
+        from radar_render import generate_company_radar_plot
+
+        generate_company_radar_plot(group.valid_rows, group.categories, group.company_name,
+                                    f"{base}.html" if args.html else None, png_path, args.png_backend, profile,
+                                    args.mean_overlay)
+    print(f"Radar plot for {group.company_name} in {group.sheet_name} saved: {png_path}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='radarsheets', description="Radar plots for Google Sheets evaluations.")
+    parser.add_argument('--credentials', default=SERVICE_ACCOUNT_FILE, help="Service account key file.")
+    parser.add_argument('--timing', action='store_true', help="Print how long the command took.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Read, render, upload and insert every plot (see main_script.py --help).")
+    run.add_argument('pipeline_args', nargs=argparse.REMAINDER, help="Arguments for main_script.py.")
+    run.set_defaults(handler=command_run)
+
+    render = commands.add_parser('render', help="Render every plot locally without uploading.")
+    render.set_defaults(handler=command_render)
+
+    sheets = commands.add_parser('sheets', help="List the spreadsheet's tabs.")
+    sheets.add_argument('--spreadsheet', default=SPREADSHEET_ID, help="Spreadsheet ID or URL.")
+    sheets.set_defaults(handler=command_sheets)
+
+    company = commands.add_parser('company', help="Plot one company locally.")
+    company.add_argument('company', help="Company name as in column A.")
+    company.add_argument('--sheet', help="Tab to read; by default every tab is read until the company is found.")
+    company.add_argument('--spreadsheet', default=SPREADSHEET_ID, help="Spreadsheet ID or URL.")
+    company.add_argument('--output-dir', default=RADAR_PLOTS_DIR)
+    company.add_argument('--output-profile', help="Image size and encoding (see output_profiles.py); "
+                                                  "defaults to RADAR_OUTPUT_PROFILE or cell.")
+    company.add_argument('--png-backend', choices=('plotly', 'raster'), default='raster',
+                         help="raster (the default here) draws with Pillow and starts fastest.")
+    company.add_argument('--html', action='store_true', help="Also write an interactive HTML plot.")
+    company.add_argument('--mean-overlay', action='store_true', help="Draw the mean scores as a dashed trace.")
+    company.set_defaults(handler=command_company)
+    return parser
+
+def main(argv=None):
+    start = time.perf_counter()
+    args = build_parser().parse_args(argv)
+    result = args.handler(args)
+    if args.timing:
+        print(f"{args.command} took {time.perf_counter() - start:.2f}s")
+    return result or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
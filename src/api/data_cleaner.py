@@ -0,0 +1,218 @@
+# Data cleaning for evaluation tabs.
+# Replaces the dataclean.gs Apps Script pass: the values the reader has already fetched
+# are normalized in bulk (names trimmed, score cells coerced to numbers, and optionally
+# out-of-range scores and duplicate evaluator rows dropped), and every rejected cell is
+# reported with its A1 address without reading the sheet again.
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from sheet_writes import column_letter
+
+# Clean the rows as they are read. Set RADAR_CLEAN_DATA=0 to use the values as the sheet holds them.
+CLEAN_DATA = os.environ.get('RADAR_CLEAN_DATA', '1').lower() not in ('0', 'false', 'no')
+
+# Stricter rules that change which rows are plotted, so they are off by default: reject
+# scores outside SCORE_RANGE (RADAR_CHECK_SCORE_RANGE=1) and keep only the first row of
+# each evaluator and lab within a company (RADAR_DEDUPE_ROWS=1).
+CHECK_SCORE_RANGE = os.environ.get('RADAR_CHECK_SCORE_RANGE', '').lower() in ('1', 'true', 'yes')
+DEDUPE_ROWS = os.environ.get('RADAR_DEDUPE_ROWS', '').lower() in ('1', 'true', 'yes')
+
+SCORE_RANGE = (0, 10)  # The radar plots' radial axis; with CHECK_SCORE_RANGE, scores outside it are rejected
+NAME_COLUMNS = 3       # Company, Evaluator, Lab
+FIRST_SCORE_COLUMN = 3
+MAX_REPORTED = 1000    # Rejections kept for the run report; all of them are counted
+PRINTED_PER_SHEET = 20
+
+# Reasons a cell is rejected
+BLANK = 'blank'
+FORMULA_ERROR = 'formula error'
+NOT_A_NUMBER = 'not a number'
+OUT_OF_RANGE = 'out of range'
+DUPLICATE = 'duplicate evaluator row'
+
+# A cell left out of the plots.
+# - cell: A1 address within the sheet, e.g. 'E12'.
+# - value: The value as read from the sheet.
+Rejection = namedtuple('Rejection', ['sheet_name', 'cell', 'value', 'reason'])
+
+# Characters Sheets data pulls leave in names: non-breaking and zero-width spaces, BOMs
+_INVISIBLE = re.compile('[\u200b\u200c\u200d\u2060\ufeff]')
+_WHITESPACE = re.compile(r'\s+')
+_DECIMAL_COMMA = re.compile(r'^[+-]?\d+,\d+$')
+_KEY_SEPARATOR = '\x1f'
+_SHEET_ERRORS = ('#N/A', '#REF!', '#VALUE!', '#DIV/0!', '#NAME?', '#NUM!', '#NULL!', '#ERROR!')
+
+
+@lru_cache(maxsize=65536, typed=True)
+def clean_text(value):
+    """
+    Return a cell as a trimmed string: Unicode NFKC form, invisible characters removed,
+    runs of whitespace collapsed. Whole numbers lose their '.0'; None becomes ''.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = unicodedata.normalize('NFKC', str(value))
+    return _WHITESPACE.sub(' ', _INVISIBLE.sub('', text)).strip()
+
+@lru_cache(maxsize=65536, typed=True)  # Score columns repeat a few values, so most cells are cache hits
+def coerce_score(value):
+    """Return a score cell as a float, or NaN when it is blank, text or a checkbox."""
+    if isinstance(value, bool):
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = clean_text(value)
+    if _DECIMAL_COMMA.match(text):
+        text = text.replace(',', '.')
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+_clean_text_array = np.frompyfunc(clean_text, 1, 1)
+_coerce_score_array = np.frompyfunc(coerce_score, 1, 1)
+
+def rejection_reason(value):
+    """Return why a score cell that is not a number was rejected."""
+    text = str(value) if isinstance(value, bool) else clean_text(value)
+    if not text:
+        return BLANK
+    if text.upper() in _SHEET_ERRORS:
+        return FORMULA_ERROR
+    return NOT_A_NUMBER
+
+
+class DataCleaner:
+    """
+    Cleans streamed evaluation rows and collects the rejected cells. Safe to share
+    between threads.
+    - check_range: Reject scores outside score_range, (low, high) of a valid score.
+      Otherwise any finite number is accepted.
+    - dedupe: Keep only the first row of each evaluator and lab within a company.
+    """
+
+    def __init__(self, check_range=CHECK_SCORE_RANGE, dedupe=DEDUPE_ROWS, score_range=SCORE_RANGE):
+        self.score_range = score_range if check_range else None
+        self.dedupe_rows = dedupe
+        self.lock = threading.Lock()
+        self.rejections = []      # First MAX_REPORTED rejections, in read order
+        self.counts = Counter()   # {reason: rejected cells}
+        self.seen = {}            # {sheet: {row key}} of the tabs still being read, see dedupe
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def _reject(self, rejections):
+        with self.lock:
+            for rejection in rejections:
+                self.counts[rejection.reason] += 1
+                if len(self.rejections) < MAX_REPORTED:
+                    self.rejections.append(rejection)
+
+    def clean(self, sheet_name, cells, first_row):
+        """
+        Clean a chunk of rows in place and return its score matrix.
+        - cells: Object array (rows x ROW_WIDTH) of raw values; short rows padded with ''.
+          The name columns are replaced by their clean_text form.
+        - first_row: Zero-based tab row of cells[0], for the A1 addresses of rejections.
+        Rejected score cells are NaN in the result, so their rows are left out like any
+        incomplete row. Rows without a company name are ignored rather than reported.
+        """
+        if not len(cells):
+            return np.empty((0, cells.shape[1] - FIRST_SCORE_COLUMN))
+        cells[:, :NAME_COLUMNS] = _clean_text_array(cells[:, :NAME_COLUMNS])
+        raw = cells[:, FIRST_SCORE_COLUMN:]
+        parsed = _coerce_score_array(raw).astype(float)
+        accepted = np.isfinite(parsed)
+        if self.score_range is not None:
+            low, high = self.score_range
+            accepted &= (parsed >= low) & (parsed <= high)
+        scores = np.where(accepted, parsed, np.nan)
+
+        # Only the rejected cells of named rows go through the slower per-cell reason lookup
+        named = cells[:, 0] != ''
+        rows, columns = np.nonzero(~accepted & named[:, None])
+        if rows.size:
+            self._reject(
+                Rejection(sheet_name, f"{column_letter(FIRST_SCORE_COLUMN + column)}{first_row + row + 1}", value,
+                          OUT_OF_RANGE if np.isfinite(score) else rejection_reason(value))
+                for row, column, value, score in zip(rows.tolist(), columns.tolist(), raw[rows, columns].tolist(),
+                                                     parsed[rows, columns].tolist())
+            )
+        return scores
+
+    def dedupe(self, sheet_name, frame):
+        """
+        Return the TabFrame with repeated evaluator rows marked invalid.
+        The first row of each (company, evaluator, lab) is kept, also across chunks of a
+        streamed tab; names are compared without case.
+        """
+        if not self.dedupe_rows:
+            return frame
+        valid_index = np.flatnonzero(frame.valid)
+        if not valid_index.size:
+            return frame
+        # One key string per row, built and sorted as arrays rather than row by row
+        companies = np.asarray(frame.company_names, dtype=str)[frame.company_codes[valid_index]]
+        keys = companies
+        for column in (frame.evaluators, frame.labs):
+            keys = np.char.add(np.char.add(keys, _KEY_SEPARATOR), np.char.lower(column[valid_index].astype(str)))
+        unique, first = np.unique(keys, return_index=True)
+        repeated = np.ones(keys.size, dtype=bool)
+        repeated[first] = False
+        with self.lock:
+            seen = self.seen.setdefault(sheet_name, set())
+            unique = unique.tolist()
+            earlier = np.fromiter((key in seen for key in unique), dtype=bool, count=len(unique))
+            seen.update(unique)
+        repeated[first[earlier]] = True
+        if not repeated.any():
+            return frame
+
+        duplicates = valid_index[repeated]
+        self._reject(
+            Rejection(sheet_name, f"B{row + 1}", f"{evaluator}, {lab}", DUPLICATE)
+            for row, evaluator, lab in zip(frame.row_numbers[duplicates].tolist(),
+                                           frame.evaluators[duplicates].tolist(), frame.labs[duplicates].tolist())
+        )
+        valid = frame.valid.copy()
+        valid[duplicates] = False
+        return frame._replace(valid=valid)
+
+    def finish_sheet(self, sheet_name):
+        """Forget a tab's evaluator rows once it has been read to the end."""
+        with self.lock:
+            self.seen.pop(sheet_name, None)
+
+    def report(self):
+        """Return the rejections as a dict for run summaries."""
+        with self.lock:
+            return {
+                'rejected_cells': sum(self.counts.values()),
+                'reasons': dict(self.counts),
+                'cells': [rejection._asdict() for rejection in self.rejections],
+            }
+
+    def print_report(self):
+        """Print the rejected cells, up to PRINTED_PER_SHEET per sheet."""
+        with self.lock:
+            total = sum(self.counts.values())
+            if not total:
+                return
+            reasons = ', '.join(f"{count} {reason}" for reason, count in self.counts.most_common())
+            print(f"Data cleaning rejected {total} cells ({reasons}):")
+            printed = Counter()
+            for rejection in self.rejections:
+                printed[rejection.sheet_name] += 1
+                if printed[rejection.sheet_name] <= PRINTED_PER_SHEET:
+                    print(f"  {rejection.sheet_name}!{rejection.cell}: {rejection.value!r} ({rejection.reason})")
+            if total > len(self.rejections) or any(count > PRINTED_PER_SHEET for count in printed.values()):
+                print("  ...")
@@ -0,0 +1,128 @@
+# Batched Google Drive calls.
+# Groups up to 100 Drive requests into one multipart HTTP request using the client
+# library's batch support, and maps each item's response or error back to its key.
+from drive_uploads import find_existing_image_request
+from request_scheduler import is_retryable, is_throttled, scheduler
+from run_metrics import metrics
+
+# The Drive API accepts at most 100 calls per batch request.
+BATCH_LIMIT = 100
+
+
+class DriveBatch:
+    """
+    Collects Drive requests and sends them in HTTP batches of up to BATCH_LIMIT calls.
+    - drive_service: Authenticated Drive service.
+    Keys can be any hashable value, e.g. (company, sheet).
+    """
+
+    def __init__(self, drive_service):
+        self.drive_service = drive_service
+        self.requests = []  # [(key, HttpRequest)]
+
+    def add(self, key, request):
+        """Queue an unexecuted request (e.g. drive_service.permissions().create(...)) under key."""
+        self.requests.append((key, request))
+
+    def __len__(self):
+        return len(self.requests)
+
+    def _send(self, chunk):
+        """Send one batch of at most BATCH_LIMIT (key, request) pairs; return (results, errors)."""
+        results = {}
+        errors = {}
+        keys = {str(index): key for index, (key, _) in enumerate(chunk)}
+        methods = {str(index): getattr(request, 'methodId', None) for index, (_, request) in enumerate(chunk)}
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                errors[keys[request_id]] = exception
+            else:
+                results[keys[request_id]] = response
+            outcome = 'ok' if exception is None else getattr(getattr(exception, 'resp', None), 'status', 'error')
+            metrics.record_call(methods[request_id], outcome)
+
+        batch = self.drive_service.new_batch_http_request(callback=callback)
+        for index, (_, request) in enumerate(chunk):
+            batch.add(request, request_id=str(index))
+        # Drive charges every call inside a batch against the quota
+        scheduler.acquire(methods['0'], len(chunk))
+        metrics.add('batch_requests')
+        try:
+            batch.execute()
+        except Exception as e:
+            # The whole round trip failed; report it against every item in the chunk
+            for request_id, key in keys.items():
+                if key not in results and key not in errors:
+                    errors[key] = e
+                    metrics.record_call(methods[request_id], 'error')
+        return results, errors
+
+    def execute(self):
+        """
+        Send all queued requests and clear the queue.
+        Calls that were throttled or hit a 5xx error are sent again in a later batch,
+        after the scheduler's backoff.
+        Returns (results, errors): {key: response} and {key: exception}.
+        """
+        results = {}
+        errors = {}
+        pending = self.requests
+        attempt = 0
+        while pending:
+            retry = []
+            retry_error = None
+            for start in range(0, len(pending), BATCH_LIMIT):
+                chunk = pending[start:start + BATCH_LIMIT]
+                chunk_results, chunk_errors = self._send(chunk)
+                results.update(chunk_results)
+                for key, request in chunk:
+                    error = chunk_errors.get(key)
+                    if error is None:
+                        continue
+                    if is_retryable(error) and attempt < scheduler.max_retries:
+                        retry.append((key, request))
+                        retry_error = error if retry_error is None or is_throttled(error) else retry_error
+                    else:
+                        errors[key] = error
+            if retry:
+                attempt += 1
+                scheduler.backoff(getattr(retry[0][1], 'methodId', None), attempt, retry_error)
+            pending = retry
+        self.requests = []
+        return results, errors
+
+
+def lookup_existing_images(drive_service, spreadsheet_id, keys):
+    """
+    Find the Drive image for many (company, sheet) keys in batched round trips.
+    Returns (found, errors): {key: file dict or None} and {key: exception}.
+    """
+    batch = DriveBatch(drive_service)
+    for company_name, sheet_name in keys:
+        batch.add((company_name, sheet_name),
+                  find_existing_image_request(drive_service, spreadsheet_id, company_name, sheet_name))
+    results, errors = batch.execute()
+    found = {}
+    for key, response in results.items():
+        files = response.get('files', [])
+        found[key] = files[0] if files else None
+    if errors:
+        print(f"Drive lookup failed for {len(errors)} images; they will be looked up individually.")
+    return found, errors
+
+def grant_public_read(drive_service, file_ids):
+    """
+    Make many Drive files publicly readable in batched round trips.
+    - file_ids: Dict of {key: file ID}.
+    Returns {key: exception} for the files that could not be shared.
+    """
+    batch = DriveBatch(drive_service)
+    for key, file_id in file_ids.items():
+        batch.add(key, drive_service.permissions().create(
+            fileId=file_id, body={'role': 'reader', 'type': 'anyone'}, fields='id'
+        ))
+    _, errors = batch.execute()
+    for key, error in errors.items():
+        print(f"Error sharing Drive file for {key}: {error}")
+    return errors
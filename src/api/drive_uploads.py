@@ -0,0 +1,211 @@
+# Google Drive uploads for radar plot images.
+# Each uploaded file is tagged with its (spreadsheet, sheet, company) and a hash of its
+# bytes in appProperties, so later runs can find it, skip identical uploads and
+# update changed images in place without changing their public URL.
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from googleapiclient.http import MediaFileUpload
+
+from output_profiles import image_mime_type
+from run_metrics import metrics
+
+APP_SPREADSHEET = 'radarSpreadsheet'
+APP_SHEET = 'radarSheet'
+APP_COMPANY = 'radarCompany'
+APP_HASH = 'radarHash'
+
+# Number of uploads in flight at once; override with RADAR_UPLOAD_WORKERS.
+UPLOAD_WORKERS = int(os.environ.get('RADAR_UPLOAD_WORKERS', 8))
+
+# Upload backend: 'threads' runs UploadExecutor below, 'async' runs the coroutines in
+# async_uploads.py (needs aiohttp) and can keep many more uploads in flight.
+# Override with RADAR_UPLOAD_BACKEND.
+UPLOAD_BACKENDS = ('threads', 'async')
+UPLOAD_BACKEND = os.environ.get('RADAR_UPLOAD_BACKEND', 'threads')
+
+# Files larger than this are sent as resumable sessions in RESUMABLE_CHUNK_SIZE chunks
+# (a multiple of 256 KB), so a dropped connection only resends the current chunk.
+# Failed chunks are retried by the request scheduler (see request_scheduler.py).
+RESUMABLE_THRESHOLD = 5 * 1024 * 1024
+RESUMABLE_CHUNK_SIZE = 1024 * 1024
+
+# Upload outcomes returned by upload_image_to_drive
+CREATED = 'created'
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+
+# Default for upload_image_to_drive(existing=...): search Drive for the file first
+LOOKUP = object()
+
+
+def file_sha256(file_path):
+    """Return the SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def drive_file_url(file_id):
+    """Return the public URL used in IMAGE formulas for a Drive file."""
+    return f"https://drive.google.com/uc?id={file_id}"
+
+def _query_literal(value):
+    """Escape a string for use inside single quotes in a Drive search query."""
+    return str(value).replace('\\', '\\\\').replace("'", "\\'")
+
+def image_media(file_path):
+    """Return a MediaFileUpload, resumable when the file is larger than RESUMABLE_THRESHOLD."""
+    mime_type = image_mime_type(file_path)
+    if os.path.getsize(file_path) > RESUMABLE_THRESHOLD:
+        return MediaFileUpload(file_path, mimetype=mime_type, resumable=True, chunksize=RESUMABLE_CHUNK_SIZE)
+    return MediaFileUpload(file_path, mimetype=mime_type)
+
+def execute_upload(request):
+    """
+    Execute a files.create/update request and return its response.
+    Resumable requests are sent chunk by chunk; after a transient error the retried
+    chunk continues from the last byte the server acknowledged.
+    """
+    if not request.resumable or not request.resumable.resumable():
+        return request.execute()
+
+    response = None
+    while response is None:
+        _, response = request.next_chunk()
+    return response
+
+def image_query(spreadsheet_id, company_name, sheet_name):
+    """Build the Drive search query matching the image for (company, sheet)."""
+    properties = {APP_SPREADSHEET: spreadsheet_id, APP_SHEET: sheet_name, APP_COMPANY: company_name}
+    clauses = [
+        f"appProperties has {{ key='{key}' and value='{_query_literal(value)}' }}"
+        for key, value in properties.items()
+    ]
+    clauses.append("trashed = false")
+    return " and ".join(clauses)
+
+def image_metadata(file_path, company_name, sheet_name, spreadsheet_id, content_hash):
+    """Return the files.create metadata of a new image, tagged so later runs can find it."""
+    return {
+        'name': os.path.basename(file_path),
+        'mimeType': image_mime_type(file_path),
+        'appProperties': {
+            APP_SPREADSHEET: spreadsheet_id,
+            APP_SHEET: sheet_name,
+            APP_COMPANY: company_name,
+            APP_HASH: content_hash,
+        },
+    }
+
+def find_existing_image_request(drive_service, spreadsheet_id, company_name, sheet_name):
+    """Return the unexecuted files.list request that finds the image for (company, sheet)."""
+    return drive_service.files().list(
+        q=image_query(spreadsheet_id, company_name, sheet_name),
+        spaces='drive',
+        fields='files(id, appProperties)',
+        pageSize=10
+    )
+
+def find_existing_image(drive_service, spreadsheet_id, company_name, sheet_name):
+    """Return the Drive file ({'id', 'appProperties'}) for (company, sheet), or None."""
+    response = find_existing_image_request(drive_service, spreadsheet_id, company_name, sheet_name).execute()
+    files = response.get('files', [])
+    return files[0] if files else None
+
+def share_publicly(drive_service, file_id):
+    """Give anyone with the link read access to a Drive file. Granting it again is harmless."""
+    drive_service.permissions().create(fileId=file_id, body={'role': 'reader', 'type': 'anyone'}).execute()
+
+def upload_image_to_drive(drive_service, file_path, company_name, sheet_name, spreadsheet_id,
+                          existing=LOOKUP, share=True):
+    """
+    Upload a PNG or WebP image to Google Drive and return (file ID, outcome).
+    - existing: The file found by an earlier (e.g. batched) lookup, None when there is no
+      file yet, or LOOKUP to search Drive here.
+    - share: Make the file public. Reused files are shared again too, since sharing may have
+      failed after an earlier run created them. Pass False when permissions are granted in a batch.
+    - outcome: CREATED for a new file, UPDATED when an existing file's media was replaced
+      (its URL does not change), UNCHANGED when the bytes already match. (None, None) on error.
+    """
+    try:
+        content_hash = file_sha256(file_path)
+        if existing is LOOKUP:
+            existing = find_existing_image(drive_service, spreadsheet_id, company_name, sheet_name)
+
+        if existing is not None:
+            file_id = existing['id']
+            if existing.get('appProperties', {}).get(APP_HASH) == content_hash:
+                print(f"Image for {company_name} in {sheet_name} is unchanged; reusing Drive file {file_id}")
+                if share:
+                    share_publicly(drive_service, file_id)
+                return file_id, UNCHANGED
+
+            # Replace the media in place so the URL already in the sheet stays valid
+            execute_upload(drive_service.files().update(
+                fileId=file_id,
+                body={'mimeType': image_mime_type(file_path), 'appProperties': {APP_HASH: content_hash}},
+                media_body=image_media(file_path), fields='id'
+            ))
+            metrics.add('upload_bytes', os.path.getsize(file_path))
+            print(f"Updated Drive file {file_id} for {company_name} in {sheet_name}")
+            if share:
+                share_publicly(drive_service, file_id)
+            return file_id, UPDATED
+
+        # Upload the file
+        uploaded_file = execute_upload(drive_service.files().create(
+            body=image_metadata(file_path, company_name, sheet_name, spreadsheet_id, content_hash),
+            media_body=image_media(file_path), fields='id'
+        ))
+        file_id = uploaded_file.get('id')
+        metrics.add('upload_bytes', os.path.getsize(file_path))
+
+        # Make the file publicly accessible
+        if share:
+            share_publicly(drive_service, file_id)
+
+        return file_id, CREATED
+    except Exception as e:
+        print(f"Error uploading image to Drive: {e}")
+        return None, None
+
+
+class UploadExecutor:
+    """
+    Runs upload_image_to_drive on a pool of threads.
+    - service_factory: Callable returning a Drive service for the calling thread
+      (e.g. google_clients.get_drive_service), since services must not be shared.
+    - workers: Number of uploads in flight at once.
+    Use as a context manager, or call close() when done.
+    """
+
+    def __init__(self, service_factory, workers=UPLOAD_WORKERS):
+        self.service_factory = service_factory
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='drive-upload')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _upload(self, file_path, company_name, sheet_name, spreadsheet_id, existing, share):
+        return upload_image_to_drive(
+            self.service_factory(), file_path, company_name, sheet_name, spreadsheet_id, existing, share
+        )
+
+    def submit(self, file_path, company_name, sheet_name, spreadsheet_id, existing=LOOKUP, share=True):
+        """
+        Queue an upload and return a Future resolving to (file ID, outcome).
+        - existing, share: Passed through to upload_image_to_drive.
+        """
+        return self.executor.submit(
+            self._upload, file_path, company_name, sheet_name, spreadsheet_id, existing, share
+        )
+
+    def close(self):
+        """Wait for queued uploads to finish and stop the threads."""
+        self.executor.shutdown(wait=True)
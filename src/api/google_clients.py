@@ -0,0 +1,151 @@
+# Shared Google API client factory.
+# Credentials are loaded once per (key file, scopes). Each thread gets its own
+# keep-alive authorized transport and its own Sheets/Drive service objects, because
+# httplib2 connections are not safe to share between threads.
+# google-auth and the discovery module are imported on first use, and access tokens are
+# shared with other processes through token_cache.
+import os
+import threading
+import time
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
+
+import httplib2
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+from request_scheduler import scheduler
+from run_metrics import metrics
+from settings import HTTP_TIMEOUT, SCOPES, SERVICE_ACCOUNT_FILE
+from token_cache import cache_key, persist_tokens
+
+# Base URL of a local API emulator (see api_emulator.py), e.g. http://127.0.0.1:8765.
+# When set, every Google API request goes there instead, without credentials.
+API_EMULATOR = os.environ.get('RADARSHEETS_API_EMULATOR')
+
+_thread_state = threading.local()
+
+
+@lru_cache(maxsize=None)
+def get_credentials(service_account_file=SERVICE_ACCOUNT_FILE, scopes=tuple(SCOPES)):
+    """
+    Load service account credentials once per key file and scope set. They start from a
+    cached access token when one is still valid, and store every token they refresh.
+    """
+    from google.oauth2.service_account import Credentials
+
+    if not os.path.exists(service_account_file):
+        raise FileNotFoundError(f"Service account file not found: {os.path.abspath(service_account_file)}")
+    creds = Credentials.from_service_account_file(service_account_file, scopes=list(scopes))
+    print(f"Loaded service account credentials from {os.path.abspath(service_account_file)}")
+    return persist_tokens(creds, cache_key(service_account_file, scopes))
+
+def _thread_cache(name):
+    """Return a dict stored on the current thread, creating it on first use."""
+    cache = getattr(_thread_state, name, None)
+    if cache is None:
+        cache = {}
+        setattr(_thread_state, name, cache)
+    return cache
+
+def _http(timeout=HTTP_TIMEOUT):
+    """Return a keep-alive httplib2.Http that leaves 308 responses to resumable uploads."""
+    http = httplib2.Http(timeout=timeout)
+    # Drive answers resumable upload chunks with 308, which is not a redirect there
+    http.redirect_codes = http.redirect_codes - {308}
+    return http
+
+
+class EmulatorHttp(httplib2.Http):
+    """
+    httplib2.Http that sends every request to a local API emulator.
+    Only the scheme and host of each URL are replaced; Sheets, Drive, upload and batch
+    paths are kept as they are.
+    """
+
+    def __init__(self, base_url, timeout=HTTP_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.redirect_codes = self.redirect_codes - {308}
+        parts = urlsplit(base_url)
+        self.scheme, self.netloc = parts.scheme, parts.netloc
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        parts = urlsplit(uri)
+        uri = urlunsplit((self.scheme, self.netloc, parts.path, parts.query, parts.fragment))
+        return super().request(uri, method, body, headers, *args, **kwargs)
+
+
+class TrackedHttpRequest(HttpRequest):
+    """
+    HttpRequest that is paced and retried by the request scheduler, and records every
+    attempt in run_metrics by method ID, outcome and time.
+    """
+
+    def _tracked(self, send):
+        def attempt():
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = send()
+                outcome = 'ok'
+                return result
+            except HttpError as e:
+                outcome = e.resp.status
+                raise
+            finally:
+                metrics.record_call(self.methodId, outcome, time.perf_counter() - start)
+        return scheduler.call(self.methodId, attempt)
+
+    def execute(self, http=None, num_retries=0):
+        return self._tracked(lambda: super(TrackedHttpRequest, self).execute(http=http, num_retries=num_retries))
+
+    def next_chunk(self, http=None, num_retries=0):
+        # Each chunk of a resumable upload is its own round trip. After a failed chunk the
+        # retry first asks the server how much it received, then resumes from there.
+        return self._tracked(lambda: super(TrackedHttpRequest, self).next_chunk(http=http, num_retries=num_retries))
+
+
+def authorized_http(service_account_file=SERVICE_ACCOUNT_FILE, scopes=SCOPES):
+    """
+    Return the current thread's authorized transport.
+    The underlying httplib2.Http keeps connections open between requests.
+    """
+    key = (service_account_file, tuple(scopes), API_EMULATOR)
+    transports = _thread_cache('transports')
+    if key not in transports:
+        if API_EMULATOR:
+            transports[key] = EmulatorHttp(API_EMULATOR)
+        else:
+            import google_auth_httplib2
+
+            creds = get_credentials(service_account_file, tuple(scopes))
+            transports[key] = google_auth_httplib2.AuthorizedHttp(creds, http=_http())
+    return transports[key]
+
+def get_service(api, version, service_account_file=SERVICE_ACCOUNT_FILE, scopes=SCOPES):
+    """
+    Return a memoized service object for the current thread.
+    - api, version: Service name and version, e.g. ('sheets', 'v4') or ('drive', 'v3').
+    Services are built from the discovery documents bundled with google-api-python-client.
+    """
+    key = (api, version, service_account_file, tuple(scopes), API_EMULATOR)
+    services = _thread_cache('services')
+    if key not in services:
+        from googleapiclient.discovery import build
+
+        services[key] = build(
+            api, version,
+            http=authorized_http(service_account_file, scopes),
+            static_discovery=True,
+            cache_discovery=False,
+            requestBuilder=TrackedHttpRequest
+        )
+    return services[key]
+
+def get_sheets_service(service_account_file=SERVICE_ACCOUNT_FILE, scopes=SCOPES):
+    """Return the current thread's Sheets v4 service."""
+    return get_service('sheets', 'v4', service_account_file, scopes)
+
+def get_drive_service(service_account_file=SERVICE_ACCOUNT_FILE, scopes=SCOPES):
+    """Return the current thread's Drive v3 service."""
+    return get_service('drive', 'v3', service_account_file, scopes)
@@ -1,30 +1,30 @@
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
+from google_clients import get_sheets_service
+from settings import SCOPES, SERVICE_ACCOUNT_FILE, SPREADSHEET_ID
+from sheet_snapshot import SpreadsheetSnapshot
 
 import os
 print("Current working directory:", os.getcwd())
 
-# Define the scope for Google Sheets and Drive
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-
-# This is the specific Google Sheet ID for the current project.
-# Update this line to use a different spreadsheet for other projects.
-SPREADSHEET_ID = '1byKP-xqB3mmTncWTefvyUVMwHjaAlT4XienGR3Lj7tY'
-
 def get_service():
-    """Authenticate and return the Google Sheets service."""
-    creds = Credentials.from_service_account_file('src/api/service_account.json', scopes=SCOPES)
-    return build('sheets', 'v4', credentials=creds)
+    """Return the shared, authenticated Google Sheets service."""
+    return get_sheets_service(SERVICE_ACCOUNT_FILE, SCOPES)
 
-def list_sheets(spreadsheet_id):
-    """List all sheet names in the spreadsheet."""
+def list_sheets(spreadsheet_id, snapshot=None):
+    """List all sheet names in the spreadsheet, from the snapshot when one is given."""
+    if snapshot is not None:
+        return snapshot.sheet_names()
     service = get_service()
     sheet_metadata = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
     sheets = sheet_metadata.get('sheets', [])
     return [sheet['properties']['title'] for sheet in sheets]
 
-def get_sheet_metadata(spreadsheet_id, sheet_name=None):
-    """Retrieve metadata for a spreadsheet or a specific sheet."""
+def get_sheet_metadata(spreadsheet_id, sheet_name=None, snapshot=None):
+    """
+    Retrieve metadata for a spreadsheet or a specific sheet.
+    - snapshot: Optional SpreadsheetSnapshot used for sheet lookups instead of a new request.
+    """
+    if snapshot is not None and sheet_name:
+        return snapshot.properties(sheet_name)
     service = get_service()
     sheet_metadata = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
     if sheet_name:
@@ -33,11 +33,14 @@ def get_sheet_metadata(spreadsheet_id, sheet_name=None):
                 return sheet['properties']
     return sheet_metadata
 
-def read_sheet(spreadsheet_id, sheet_name='Sheet1', range_name=None):
+def read_sheet(spreadsheet_id, sheet_name='Sheet1', range_name=None, snapshot=None):
     """
     Read data from a Google Sheets spreadsheet.
     - If range_name is None, fetches the entire sheet.
+    - If a snapshot is given and range_name is None, the rows come from the snapshot.
     """
+    if snapshot is not None and not range_name:
+        return snapshot.values(sheet_name)
     service = get_service()
     range_to_read = sheet_name if not range_name else f"{sheet_name}!{range_name}"
     result = service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=range_to_read).execute()
@@ -61,11 +64,14 @@ def write_sheet(spreadsheet_id, sheet_name='Sheet1', range_name='A1', values=[])
 
 if __name__ == "__main__":
     # NOTE: The SPREADSHEET_ID is currently set for the project "RadarSheets".
-    # To use this script for another project, replace the value of SPREADSHEET_ID above.
+    # To use this script for another project, change SPREADSHEET_ID in settings.py.
 
     try:
+        # Read metadata and every sheet once
+        snapshot = SpreadsheetSnapshot.load(get_service(), SPREADSHEET_ID, cells=None)
+
         # List all sheets in the spreadsheet
-        sheets = list_sheets(SPREADSHEET_ID)
+        sheets = list_sheets(SPREADSHEET_ID, snapshot)
         print("Sheets in the spreadsheet:", sheets)
 
         # Get metadata for the spreadsheet
@@ -74,7 +80,7 @@ if __name__ == "__main__":
 
         # Read all data from the first sheet
         if sheets:
-            data = read_sheet(SPREADSHEET_ID, sheet_name=sheets[0])
+            data = read_sheet(SPREADSHEET_ID, sheet_name=sheets[0], snapshot=snapshot)
             print(f"Data from sheet '{sheets[0]}':")
             for row in data:
                 print(row)
@@ -1,26 +1,13 @@
 import os
 import plotly.graph_objects as go
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-
-# Google Sheets setup
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-SPREADSHEET_ID = '1byKP-xqB3mmTncWTefvyUVMwHjaAlT4XienGR3Lj7tY'
+from google_clients import get_sheets_service
+from settings import SCOPES, SERVICE_ACCOUNT_FILE, SPREADSHEET_ID
+from sheet_snapshot import SpreadsheetSnapshot
 
 
 def get_service():
-    """Authenticate and return the Google Sheets service."""
-    creds_path = 'C:\\Users\\mattc\\OneDrive\\Desktop\\Code\\RadarSheets\\src\\api\\service_account.json'
-
-    # Debug: Confirm the file path
-    print("Using service account file:", os.path.abspath(creds_path))
-
-    if not os.path.exists(creds_path):
-        raise FileNotFoundError(f"Service account file not found: {os.path.abspath(creds_path)}")
-
-    creds = Credentials.from_service_account_file(creds_path, scopes=SCOPES)
-    print("Authentication successful.")
-    return build('sheets', 'v4', credentials=creds)
+    """Return the shared, authenticated Google Sheets service."""
+    return get_sheets_service(SERVICE_ACCOUNT_FILE, SCOPES)
 
 def read_sheet(spreadsheet_id, sheet_name='Sheet1', range_name=None):
     """Read data from a specific sheet."""
@@ -67,8 +54,10 @@ def generate_company_radar_plot(valid_rows, categories, company_name, output_pat
     fig.write_html(output_path)
     print(f"Radar plot saved: {output_path}")
 
-def list_sheets(spreadsheet_id):
-    """List all sheet names in the spreadsheet."""
+def list_sheets(spreadsheet_id, snapshot=None):
+    """List all sheet names in the spreadsheet, from the snapshot when one is given."""
+    if snapshot is not None:
+        return snapshot.sheet_names()
     service = get_service()
     sheet_metadata = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
     sheets = sheet_metadata.get('sheets', [])
@@ -83,8 +72,9 @@ if __name__ == "__main__":
     else:
         print(f"Output directory exists: {os.path.abspath(output_dir)}")
 
-    # List all sheets in the spreadsheet
-    sheet_names = list_sheets(SPREADSHEET_ID)
+    # Read metadata and every sheet once, then list sheets from the snapshot
+    snapshot = SpreadsheetSnapshot.load(get_service(), SPREADSHEET_ID, cells=None)
+    sheet_names = list_sheets(SPREADSHEET_ID, snapshot)
     print(f"Found sheets: {sheet_names}")
 
     # Keep track of sheets that cannot be processed
@@ -94,7 +84,7 @@ if __name__ == "__main__":
         print(f"Processing sheet: {sheet_name}")
         try:
             # Read data from the current sheet
-            data = read_sheet(SPREADSHEET_ID, sheet_name=sheet_name)
+            data = snapshot.values(sheet_name)
             
             if not data:
                 print(f"No data found in sheet: {sheet_name}")
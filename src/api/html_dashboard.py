@@ -0,0 +1,260 @@
+# Consolidated HTML output for radar plots.
+# Writes one dashboard page (or one page per sheet) that loads plotly.js once and keeps
+# every company's scores as compact JSON. Plots are drawn in the browser only when a
+# company scrolls into view or is picked from the sidebar.
+import json
+import os
+import re
+
+from radar_render import MEAN_LABEL, RADAR_LAYOUT
+
+# HTML output: 'dashboard' (one page), 'sheet' (one page per sheet), 'company' (one
+# self-contained file per company, the old behaviour) or 'none'. Override with RADAR_HTML_MODE.
+HTML_MODES = ('dashboard', 'sheet', 'company', 'none')
+HTML_MODE = os.environ.get('RADAR_HTML_MODE', 'dashboard')
+
+# Where pages load plotly.js from: 'local' writes it once next to the pages (works
+# offline), 'cdn' links the matching release on cdn.plot.ly. Override with RADAR_PLOTLY_JS.
+PLOTLY_JS = os.environ.get('RADAR_PLOTLY_JS', 'local')
+
+DASHBOARD_FILE = 'dashboard.html'
+
+# Characters Windows or POSIX refuse in a file name, plus control characters
+_UNSAFE_FILE_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+
+def plotly_js_name():
+    """Return the file name of the bundled plotly.js release."""
+    import plotly.offline
+
+    return f"plotly-{plotly.offline.get_plotlyjs_version()}.min.js"
+
+def write_plotly_js(output_dir):
+    """Write the bundled plotly.js into output_dir unless this release is already there."""
+    import plotly.offline
+
+    path = os.path.join(output_dir, plotly_js_name())
+    if not os.path.exists(path):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(plotly.offline.get_plotlyjs())
+        os.replace(temp_path, path)
+    return path
+
+def safe_file_name(name):
+    """Return name with characters that cannot appear in a file name replaced by '_'."""
+    return _UNSAFE_FILE_CHARS.sub('_', str(name)).strip(' .') or '_'
+
+def _compact_number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+def _json_script(payload):
+    """Serialize payload for an inline <script> block."""
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).replace('</', '<\\/')
+
+
+class RadarDashboard:
+    """
+    Collects company radar data and writes it as dashboard pages.
+    - output_dir: Directory for the pages (and plotly.js when plotly_js is 'local').
+    - per_sheet: Write one page per sheet instead of a single dashboard.
+    - plotly_js: 'local' or 'cdn'; see PLOTLY_JS.
+    - mean_overlay: Draw each company's mean scores as a dashed trace, as on the images.
+    """
+
+    def __init__(self, output_dir, per_sheet=False, plotly_js=PLOTLY_JS, mean_overlay=False):
+        self.output_dir = output_dir
+        self.per_sheet = per_sheet
+        self.plotly_js = plotly_js
+        self.mean_overlay = mean_overlay
+        self.sheets = {}  # {sheet_name: {'categories': [...], 'companies': [...]}}, in insertion order
+
+    def __len__(self):
+        return sum(len(sheet['companies']) for sheet in self.sheets.values())
+
+    def add(self, sheet_name, company_name, categories, valid_rows):
+        """
+        Add one company's plot.
+        - valid_rows: List of tuples [(Evaluator, Lab, [Scores]), ...].
+        """
+        sheet = self.sheets.setdefault(sheet_name, {'categories': [str(c) for c in categories], 'companies': []})
+        sheet['companies'].append([
+            str(company_name),
+            [[str(evaluator), str(lab), [_compact_number(v) for v in values]] for evaluator, lab, values in valid_rows],
+        ])
+
+    def page_name(self, sheet_name=None):
+        """Return the file name of the page holding sheet_name (or of the single dashboard)."""
+        if not self.per_sheet or sheet_name is None:
+            return DASHBOARD_FILE
+        return self._page_names().get(sheet_name) or f"{safe_file_name(sheet_name)}_dashboard.html"
+
+    def _page_names(self):
+        """Map each sheet to its page file; tabs whose safe names collide get a numeric suffix."""
+        names, used = {}, set()
+        for sheet_name in self.sheets:
+            base = safe_file_name(sheet_name)
+            file_name, n = f"{base}_dashboard.html", 1
+            while file_name.lower() in used:
+                n += 1
+                file_name = f"{base}_{n}_dashboard.html"
+            used.add(file_name.lower())
+            names[sheet_name] = file_name
+        return names
+
+    def _script_tag(self):
+        if self.plotly_js == 'cdn':
+            return f'<script src="https://cdn.plot.ly/{plotly_js_name()}" charset="utf-8"></script>'
+        write_plotly_js(self.output_dir)
+        return f'<script src="{plotly_js_name()}" charset="utf-8"></script>'
+
+    def write(self):
+        """Write every page and return their paths."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        script_tag = self._script_tag()
+        layout = {'radial_range': RADAR_LAYOUT['radial_range'], 'showlegend': RADAR_LAYOUT['showlegend']}
+        if self.mean_overlay:
+            layout['mean_label'] = MEAN_LABEL  # The means are computed in the browser
+        if self.per_sheet:
+            page_names = self._page_names()
+            pages = [(page_names[name], {name: sheet}) for name, sheet in self.sheets.items()]
+            links = [[name, page_names[name]] for name in self.sheets]  # Tab title shown, safe name linked
+        else:
+            pages = [(DASHBOARD_FILE, self.sheets)]
+            links = []
+
+        paths = []
+        for file_name, sheets in pages:
+            payload = {
+                'layout': layout,
+                'pages': links,
+                'sheets': [[name, sheet['categories'], sheet['companies']] for name, sheet in sheets.items()],
+            }
+            html = (PAGE_TEMPLATE
+                    .replace('{{plotly_js}}', script_tag)
+                    .replace('{{data}}', _json_script(payload)))
+            path = os.path.join(self.output_dir, file_name)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+            os.replace(temp_path, path)
+            paths.append(path)
+        print(f"Radar dashboard saved: {', '.join(paths)} ({len(self)} companies)")
+        return paths
+
+
+# Mirrors build_radar_figure: one filled Scatterpolar trace per evaluator, closed loop,
+# fixed radial range, "Radar Plot for <company>" title and, with mean_overlay, a dashed
+# trace of the per-category means.
+PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Radar Plots</title>
+<style>
+  body { margin: 0; font-family: "Open Sans", Arial, sans-serif; color: #2a3f5f; display: flex; }
+  nav { position: sticky; top: 0; height: 100vh; width: 260px; flex: none; overflow-y: auto;
+        border-right: 1px solid #e5ecf6; padding: 8px; box-sizing: border-box; }
+  nav input { width: 100%; box-sizing: border-box; padding: 4px; margin-bottom: 8px; }
+  nav h3 { margin: 12px 0 4px; font-size: 14px; }
+  nav a { display: block; padding: 2px 4px; color: inherit; text-decoration: none; font-size: 13px; }
+  nav a:hover, nav a.active { background: #e5ecf6; }
+  main { flex: 1; padding: 8px; }
+  .plot { height: 500px; max-width: 900px; margin-bottom: 16px; }
+  .pages a { display: inline; margin-right: 8px; text-decoration: underline; }
+</style>
+{{plotly_js}}
+</head>
+<body>
+<nav><div class="pages" id="pages"></div><input id="filter" placeholder="Filter companies"><div id="index"></div></nav>
+<main id="plots"></main>
+<script type="application/json" id="radar-data">{{data}}</script>
+<script>
+(function () {
+  var data = JSON.parse(document.getElementById('radar-data').textContent);
+  var index = document.getElementById('index');
+  var plots = document.getElementById('plots');
+  var cards = [];
+
+  data.pages.forEach(function (page) {
+    var link = document.createElement('a');
+    link.href = encodeURI(page[1]);
+    link.textContent = page[0];
+    document.getElementById('pages').appendChild(link);
+  });
+
+  data.sheets.forEach(function (sheet, s) {
+    var heading = document.createElement('h3');
+    heading.textContent = sheet[0];
+    index.appendChild(heading);
+    sheet[2].forEach(function (company, c) {
+      var card = document.createElement('div');
+      card.className = 'plot';
+      card.id = 'plot-' + s + '-' + c;
+      card.radar = {categories: sheet[1], company: company[0], rows: company[1]};
+      plots.appendChild(card);
+      var link = document.createElement('a');
+      link.href = '#' + card.id;
+      link.textContent = company[0];
+      link.card = card;
+      index.appendChild(link);
+      cards.push([card, link]);
+    });
+  });
+
+  function draw(card) {
+    var spec = card.radar;
+    var theta = spec.categories.concat([spec.categories[0]]);
+    var traces = spec.rows.map(function (row) {
+      return {type: 'scatterpolar', r: row[2].concat([row[2][0]]), theta: theta, fill: 'toself',
+              name: row[0] + ', ' + row[1]};
+    });
+    if (data.layout.mean_label) {
+      var means = spec.categories.map(function (category, i) {
+        return spec.rows.reduce(function (total, row) { return total + row[2][i]; }, 0) / spec.rows.length;
+      });
+      traces.push({type: 'scatterpolar', r: means.concat([means[0]]), theta: theta, mode: 'lines',
+                   line: {color: '#2a3f5f', dash: 'dash', width: 2.5}, name: data.layout.mean_label});
+    }
+    Plotly.newPlot(card, traces, {
+      polar: {radialaxis: {visible: true, range: data.layout.radial_range}},
+      title: {text: 'Radar Plot for ' + spec.company},
+      showlegend: data.layout.showlegend
+    }, {responsive: true});
+    card.drawn = true;
+  }
+
+  // Draw plots near the viewport and free the ones far away from it
+  var observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting && !entry.target.drawn) {
+        draw(entry.target);
+      } else if (!entry.isIntersecting && entry.target.drawn) {
+        Plotly.purge(entry.target);
+        entry.target.drawn = false;
+      }
+    });
+  }, {rootMargin: '1000px 0px'});
+  cards.forEach(function (pair) { observer.observe(pair[0]); });
+
+  index.addEventListener('click', function (event) {
+    var card = event.target.card;
+    if (!card) return;
+    cards.forEach(function (pair) { pair[1].classList.toggle('active', pair[0] === card); });
+    if (!card.drawn) draw(card);
+  });
+
+  document.getElementById('filter').addEventListener('input', function (event) {
+    var text = event.target.value.toLowerCase();
+    cards.forEach(function (pair) {
+      var show = pair[0].radar.company.toLowerCase().indexOf(text) !== -1;
+      pair[0].style.display = show ? '' : 'none';
+      pair[1].style.display = show ? '' : 'none';
+    });
+  });
+})();
+</script>
+</body>
+</html>
+'''
@@ -0,0 +1,138 @@
+# Columnar ingest of evaluation tabs.
+# Turns a tab's rows into NumPy arrays (score matrix, validity mask, company codes and
+# row positions) so parsing, validation and grouping run as bulk array operations.
+from collections import namedtuple
+
+import numpy as np
+
+SCORE_COLUMNS = slice(3, 8)  # Radar plot categories ('Innovate' to 'Risk')
+ROW_WIDTH = 8                # Company, Evaluator, Lab and five scores
+
+# Columnar view of one tab, one entry per data row (header excluded).
+# - categories: Header names of the score columns.
+# - company_names: Distinct company names, in order of first appearance.
+# - company_codes: Index into company_names per row (-1 for incomplete rows).
+# - evaluators, labs: Object arrays of the Evaluator and Lab columns.
+# - scores: float matrix (rows x 5); NaN where a cell is missing or not a number.
+# - valid: True for rows with all five scores present and numeric.
+# - row_numbers: Zero-based position of each row in the tab.
+# - first_rows: Zero-based tab row of each company's first complete row.
+TabFrame = namedtuple('TabFrame', [
+    'categories', 'company_names', 'company_codes', 'evaluators', 'labs', 'scores', 'valid',
+    'row_numbers', 'first_rows'
+])
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+_to_float_array = np.frompyfunc(_to_float, 1, 1)
+
+def parse_scores(cells):
+    """
+    Convert a 2-D object array of cells to floats in bulk.
+    Cells that are blank or not numbers become NaN.
+    """
+    try:
+        return cells.astype(float)
+    except (TypeError, ValueError):
+        pass
+    scores = np.empty(cells.shape, dtype=float)
+    for column in range(cells.shape[1]):
+        try:
+            scores[:, column] = cells[:, column].astype(float)
+        except (TypeError, ValueError):
+            # Column holds blanks or text: convert it cell by cell in one ufunc pass
+            scores[:, column] = _to_float_array(cells[:, column]).astype(float)
+    return scores
+
+# A company's rows from one sheet, ready to render.
+# - target_row: Zero-based row of the company's first evaluation, where the image goes.
+# - valid_rows: List of tuples [(Evaluator, Lab, [Scores]), ...].
+CompanyGroup = namedtuple('CompanyGroup', ['sheet_name', 'company_name', 'target_row', 'categories', 'valid_rows'])
+
+
+def tab_categories(header):
+    """Return the score categories of a header row, or None when it is shorter than ROW_WIDTH."""
+    if not header or len(header) < ROW_WIDTH:
+        return None
+    return list(header[SCORE_COLUMNS])
+
+def ingest_rows(data, categories, first_row, cleaner=None, sheet_name=None):
+    """
+    Build a TabFrame from a run of data rows (no header), e.g. one chunk of a streamed tab.
+    - first_row: Zero-based tab row of data[0]; row_numbers and first_rows are offset by it.
+    - cleaner: Optional DataCleaner (see data_cleaner.py) that normalizes the names,
+      coerces the scores and, when enabled, drops repeated evaluator rows; sheet_name labels
+      its rejections.
+    """
+    count = len(data)
+
+    lengths = np.fromiter((len(row) for row in data), dtype=np.int64, count=count)
+    complete = lengths >= ROW_WIDTH
+    cells = np.empty((count, ROW_WIDTH), dtype=object)
+    cells.fill('')
+    if count:
+        padded = [row[:ROW_WIDTH] if len(row) >= ROW_WIDTH else list(row) + [''] * (ROW_WIDTH - len(row))
+                  for row in data]
+        cells[:, :] = padded
+
+    if cleaner is not None:
+        scores = cleaner.clean(sheet_name, cells, first_row)
+        complete &= cells[:, 0] != ''  # Names are trimmed now, so blank ones are ''
+    else:
+        scores = parse_scores(cells[:, SCORE_COLUMNS]) if count else np.empty((0, 5))
+    valid = complete & np.isfinite(scores).all(axis=1)
+
+    # Company codes in order of first appearance, over complete rows only
+    company_codes = np.full(count, -1, dtype=np.int64)
+    complete_index = np.flatnonzero(complete)
+    company_names = []
+    first_rows = np.empty(0, dtype=np.int64)
+    if complete_index.size:
+        names = cells[complete_index, 0].astype(str)
+        unique, first_seen, inverse = np.unique(names, return_index=True, return_inverse=True)
+        order = np.argsort(first_seen, kind='stable')
+        rank = np.empty_like(order)
+        rank[order] = np.arange(order.size)
+        company_codes[complete_index] = rank[inverse]
+        company_names = unique[order].tolist()
+        first_rows = complete_index[first_seen[order]] + first_row
+
+    frame = TabFrame(
+        categories=categories,
+        company_names=company_names,
+        company_codes=company_codes,
+        evaluators=cells[:, 1],
+        labs=cells[:, 2],
+        scores=scores,
+        valid=valid,
+        row_numbers=np.arange(first_row, first_row + count),
+        first_rows=first_rows,
+    )
+    return cleaner.dedupe(sheet_name, frame) if cleaner is not None else frame
+
+def company_groups(frame):
+    """
+    Yield (company_name, first_row, valid_rows) for every company in a TabFrame.
+    - valid_rows: List of tuples [(Evaluator, Lab, [Scores]), ...]; empty when the company
+      has no row with five numeric scores.
+    """
+    valid_index = np.flatnonzero(frame.valid)
+    codes = frame.company_codes[valid_index]
+    order = np.argsort(codes, kind='stable')  # Keep sheet order within each company
+    valid_index = valid_index[order]
+    codes = codes[order]
+    bounds = np.searchsorted(codes, np.arange(len(frame.company_names) + 1))
+
+    evaluators = frame.evaluators[valid_index].tolist()
+    labs = frame.labs[valid_index].tolist()
+    scores = frame.scores[valid_index].tolist()
+    first_rows = frame.first_rows.tolist()
+    for code, company_name in enumerate(frame.company_names):
+        start, end = bounds[code], bounds[code + 1]
+        valid_rows = list(zip(evaluators[start:end], labs[start:end], scores[start:end]))
+        yield company_name, first_rows[code], valid_rows
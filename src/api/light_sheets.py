@@ -0,0 +1,99 @@
+# Standard-library Sheets reads for short CLI commands.
+# A read-only stand-in for the googleapiclient Sheets service built on urllib, so a
+# command that makes a handful of calls (list the tabs, read one company) starts
+# without importing googleapiclient, httplib2 or google-auth. The access token comes
+# from token_cache; with a warm cache no token exchange is made either.
+import gzip
+import json
+import os
+import urllib.error
+import urllib.request
+from urllib.parse import quote, urlencode
+
+from settings import HTTP_TIMEOUT
+from token_cache import access_token
+
+SHEETS_URL = 'https://sheets.googleapis.com'
+# Same variable as google_clients.API_EMULATOR, read here without importing it
+API_EMULATOR = os.environ.get('RADARSHEETS_API_EMULATOR')
+
+
+class LightSheetsService:
+    """
+    Sheets v4 service for spreadsheets().get() and spreadsheets().values().get() and
+    batchGet(), each returning a request whose execute() returns the decoded JSON.
+    - service_account_file, scopes: Credentials for the access token; unused with an API emulator.
+    - base_url: API root; defaults to the emulator when RADARSHEETS_API_EMULATOR is set.
+    Calls are not paced by the request scheduler, so it is meant for a few requests only.
+    """
+
+    def __init__(self, service_account_file, scopes, base_url=None):
+        self.service_account_file = service_account_file
+        self.scopes = list(scopes)
+        self.emulated = bool(API_EMULATOR) and not base_url  # The emulator needs no credentials
+        self.base_url = (base_url or API_EMULATOR or SHEETS_URL).rstrip('/')
+        self.token = None
+
+    def spreadsheets(self):
+        return _Spreadsheets(self)
+
+    def _headers(self, refresh=False):
+        headers = {'Accept-Encoding': 'gzip'}
+        if self.emulated:
+            return headers
+        if self.token is None or refresh:
+            self.token = access_token(self.service_account_file, self.scopes, refresh=refresh)
+        headers['Authorization'] = f"Bearer {self.token}"
+        return headers
+
+    def get_json(self, path, params):
+        """GET a path under /v4/spreadsheets and return the decoded JSON."""
+        url = f"{self.base_url}/v4/spreadsheets/{path}"
+        query = urlencode({name: value for name, value in params.items() if value is not None}, doseq=True)
+        if query:
+            url = f"{url}?{query}"
+        try:
+            return self._open(url, self._headers())
+        except urllib.error.HTTPError as e:
+            if e.code != 401 or self.emulated:
+                raise
+            # A cached token can be revoked before it expires; exchange a new one once
+            return self._open(url, self._headers(refresh=True))
+
+    def _open(self, url, headers):
+        request = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+            body = response.read()
+            if response.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+        return json.loads(body)
+
+
+class _Request:
+    def __init__(self, service, path, params):
+        self.service, self.path, self.params = service, path, params
+
+    def execute(self):
+        return self.service.get_json(self.path, self.params)
+
+
+class _Spreadsheets:
+    def __init__(self, service):
+        self.service = service
+
+    def get(self, spreadsheetId, **params):
+        return _Request(self.service, quote(spreadsheetId, safe=''), params)
+
+    def values(self):
+        return _Values(self.service)
+
+
+class _Values:
+    def __init__(self, service):
+        self.service = service
+
+    def get(self, spreadsheetId, range, **params):
+        return _Request(self.service, f"{quote(spreadsheetId, safe='')}/values/{quote(range, safe='')}", params)
+
+    def batchGet(self, spreadsheetId, ranges, **params):
+        return _Request(self.service, f"{quote(spreadsheetId, safe='')}/values:batchGet", dict(params, ranges=ranges))
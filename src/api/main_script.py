@@ -1,198 +1,152 @@
-import os
-import subprocess
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-
-# Google API setup
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-SPREADSHEET_ID = '1byKP-xqB3mmTncWTefvyUVMwHjaAlT4XienGR3Lj7tY'
-SERVICE_ACCOUNT_FILE = 'C:\\Users\\mattc\\OneDrive\\Desktop\\Code\\RadarSheets\\src\\api\\service_account.json'
-
-RADAR_PLOT_SCRIPT = 'C:\\Users\\mattc\\OneDrive\\Desktop\\Code\\RadarSheets\\src\\api\\google_sheets_radar_plot.1.py'
-RADAR_PLOTS_DIR = 'C:\\Users\\mattc\\OneDrive\\Desktop\\Code\\RadarSheets\\radar_plots'
-
-def get_google_services():
-    """Authenticate and return the Google Sheets and Drive services."""
-    creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    sheets_service = build('sheets', 'v4', credentials=creds)
-    drive_service = build('drive', 'v3', credentials=creds)
-    return sheets_service, drive_service
-
-def run_radar_plot_script():
-    """Call the radar plot generation script."""
-    print("Running radar plot script...")
-    import sys
-    subprocess.run([sys.executable, RADAR_PLOT_SCRIPT], check=True)
-    print("Radar plot script completed.")
-
-def list_sheets(sheets_service):
-    """List all sheet names in the spreadsheet."""
-    sheet_metadata = sheets_service.spreadsheets().get(spreadsheetId=SPREADSHEET_ID).execute()
-    sheets = sheet_metadata.get('sheets', [])
-    return [sheet['properties']['title'] for sheet in sheets]
-
-def upload_image_to_drive(file_path, drive_service):
-    """Upload a PNG file to Google Drive and return its public URL."""
-    try:
-        file_name = os.path.basename(file_path)
-        file_metadata = {'name': file_name, 'mimeType': 'image/png'}
-        media = MediaFileUpload(file_path, mimetype='image/png')
-
-        # Upload the file
-        uploaded_file = drive_service.files().create(
-            body=file_metadata, media_body=media, fields='id'
-        ).execute()
-        file_id = uploaded_file.get('id')
-
-        # Make the file publicly accessible
-        drive_service.permissions().create(fileId=file_id, body={'role': 'reader', 'type': 'anyone'}).execute()
-
-        # Return the file's public URL
-        file_url = f"https://drive.google.com/uc?id={file_id}"
-        return file_url
-    except Exception as e:
-        print(f"Error uploading image to Drive: {e}")
+import argparse
+from contextlib import nullcontext
+
+from aggregates import DEFAULT_SUMMARY_TAB, MEAN_OVERLAY, SUMMARY_TAB
+from change_watcher import ChangeWatcher
+from data_cleaner import CLEAN_DATA
+from drive_uploads import UPLOAD_BACKEND, UPLOAD_BACKENDS, UPLOAD_WORKERS
+from google_clients import get_drive_service, get_sheets_service
+from output_profiles import OUTPUT_PROFILE_NAME, PROFILES, output_profile
+from radar_render import RENDER_WORKERS, RenderPool
+from render_cache import RenderCache
+from run_journal import JOURNAL_DIR
+from run_metrics import METRICS_PROMETHEUS, METRICS_REPORT, metrics
+from settings import RADAR_PLOTS_DIR, SCOPES, SERVICE_ACCOUNT_FILE, SPREADSHEET_ID
+from state_store import StateStore
+from workbook_runner import WORKBOOK_WORKERS, make_workbooks, print_summary, read_manifest, run_workbooks
+
+# Collect every IMAGE formula and resize into one batched write per run instead of
+# writing each company as soon as its upload finishes.
+BATCH_WRITES = True
+
+def make_uploader(backend):
+    """Return the shared AsyncUploadExecutor for the 'async' upload backend, or None for threads."""
+    if backend != 'async':
         return None
-
-def insert_image_url_to_sheet(sheets_service, sheet_name, row, column, image_url, width=300, height=300):
-    """Insert the URL of the image into the specified cell in Google Sheets with custom size."""
-    try:
-        image_formula = f'=IMAGE("{image_url}", 4, {width}, {height})'
-        sheets_service.spreadsheets().values().update(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f"{sheet_name}!{chr(65 + column)}{row + 1}",
-            valueInputOption="USER_ENTERED",
-            body={"values": [[image_formula]]}
-        ).execute()
-        print(f"Inserted image into {sheet_name} at row {row + 1}, column {column + 1} with size {width}x{height}")
-    except Exception as e:
-        print(f"Error inserting image into sheet {sheet_name}: {e}")
-
-def resize_sheet_cells(sheets_service, sheet_name, row, column, row_height=300, column_width=300):
-    """Resize the row height and column width for better display of the image."""
-    try:
-        sheet_metadata = sheets_service.spreadsheets().get(spreadsheetId=SPREADSHEET_ID).execute()
-        sheet_id = None
-        for sheet in sheet_metadata['sheets']:
-            if sheet['properties']['title'] == sheet_name:
-                sheet_id = sheet['properties']['sheetId']
-                break
-
-        if sheet_id is None:
-            print(f"Sheet {sheet_name} not found.")
-            return
-
-        requests = [
-            {
-                "updateDimensionProperties": {
-                    "range": {
-                        "sheetId": sheet_id,
-                        "dimension": "ROWS",
-                        "startIndex": row,
-                        "endIndex": row + 1
-                    },
-                    "properties": {"pixelSize": row_height},
-                    "fields": "pixelSize"
-                }
-            },
-            {
-                "updateDimensionProperties": {
-                    "range": {
-                        "sheetId": sheet_id,
-                        "dimension": "COLUMNS",
-                        "startIndex": column,
-                        "endIndex": column + 1
-                    },
-                    "properties": {"pixelSize": column_width},
-                    "fields": "pixelSize"
-                }
-            }
-        ]
-
-        sheets_service.spreadsheets().batchUpdate(
-            spreadsheetId=SPREADSHEET_ID,
-            body={"requests": requests}
-        ).execute()
-
-        print(f"Resized row {row + 1} and column {column + 1} in {sheet_name} to {row_height}x{column_width}.")
-    except Exception as e:
-        print(f"Error resizing cells in sheet {sheet_name}: {e}")
-
-if __name__ == "__main__":
-    sheets_service, drive_service = get_google_services()
-
-    # Step 1: Run the radar plot generation script
-    run_radar_plot_script()
-
-    # Step 2: Process all sheets and insert radar plots
-    failed_inserts = []
-    invalid_sheets = []
-
-    sheet_names = list_sheets(sheets_service)
-    print(f"Found sheets: {sheet_names}")
-
-    for sheet_name in sheet_names:
-        print(f"Processing sheet: {sheet_name}")
-        try:
-            sheet_data = sheets_service.spreadsheets().values().get(
-                spreadsheetId=SPREADSHEET_ID, range=f"{sheet_name}!A1:Z").execute()
-            rows = sheet_data.get('values', [])
-
-            if not rows or len(rows[0]) < 8:
-                print(f"Invalid data structure in sheet: {sheet_name}")
-                invalid_sheets.append(sheet_name)
-                continue
-
-            headers = rows[0]  # Assume the first row contains headers
-            categories = headers[3:8]  # Radar plot categories ('Innovate' to 'Risk')
-
-            grouped_data = {}
-            for row in rows[1:]:  # Skip header row
-                if len(row) < 8:
-                    continue
-                company_name = row[0]
-                if company_name not in grouped_data:
-                    grouped_data[company_name] = []
-                grouped_data[company_name].append(row)
-
-            for company_name, company_rows in grouped_data.items():
-                try:
-                    valid_rows = []
-                    for row in company_rows:
-                        try:
-                            values = list(map(float, row[3:8]))  # Extract radar plot values
-                            valid_rows.append((row[1], row[2], values))  # (Evaluator, Lab, Values)
-                        except ValueError:
-                            continue
-
-                    if not valid_rows:
-                        print(f"No valid data for company: {company_name} in sheet {sheet_name}")
-                        continue
-
-                    output_png_path = os.path.join(RADAR_PLOTS_DIR, f"{company_name}_{sheet_name}_radar.png")
-                    # Upload PNG to Drive
-                    image_url = upload_image_to_drive(output_png_path, drive_service)
-                    if not image_url:
-                        failed_inserts.append(company_name)
-                        continue
-
-                    # Insert the image URL into the sheet
-                    insert_image_url_to_sheet(sheets_service, sheet_name, rows.index(company_rows[0]), 10, image_url)  # Column K (index 10)
-                    resize_sheet_cells(sheets_service, sheet_name, rows.index(company_rows[0]), 10, row_height=300, column_width=300)
-
-                except Exception as e:
-                    print(f"Error processing company {company_name} in sheet {sheet_name}: {e}")
-                    failed_inserts.append(company_name)
-        except Exception as e:
-            print(f"Error processing sheet {sheet_name}: {e}")
-            invalid_sheets.append(sheet_name)
-
-    # Step 3: Output summary
-    if failed_inserts:
-        print(f"Failed to insert images for the following companies: {failed_inserts}")
-    if invalid_sheets:
-        print(f"Sheets with invalid data structure: {invalid_sheets}")
-    if not failed_inserts and not invalid_sheets:
+    from async_uploads import AsyncUploadExecutor  # Needs aiohttp, so only imported when chosen
+    return AsyncUploadExecutor(
+        lambda: get_drive_service(SERVICE_ACCOUNT_FILE, SCOPES), UPLOAD_WORKERS, SERVICE_ACCOUNT_FILE, SCOPES
+    )
+
+def run_and_report(workbooks, state, render_pool, args, incremental, resume=False, uploader=None):
+    """Run one pass over the workbooks, write the requested reports and print the summary."""
+    metrics.reset()
+    metrics.start(spreadsheet_id=','.join(workbook.spreadsheet_id for workbook in workbooks))
+
+    # Read, render, upload and insert every spreadsheet in one process; the workbooks
+    # share the render pool, upload threads and API quota
+    summary = run_workbooks(
+        workbooks,
+        lambda: get_sheets_service(SERVICE_ACCOUNT_FILE, SCOPES),
+        lambda: get_drive_service(SERVICE_ACCOUNT_FILE, SCOPES),
+        render_pool,
+        state=state,
+        incremental=incremental,
+        batch_writes=BATCH_WRITES,
+        upload_workers=UPLOAD_WORKERS,
+        workers=args.workbook_workers,
+        journal_dir=JOURNAL_DIR,
+        resume=resume,
+        uploader=uploader,
+        summary_tab=args.summary_tab,
+        mean_overlay=args.mean_overlay,
+        clean_data=args.clean_data,
+    )
+
+    metrics.finish()
+    if args.report:
+        metrics.write_json(args.report, extra={'summary': summary})
+    if args.prometheus:
+        metrics.write_prometheus(args.prometheus)
+    if args.profile:
+        metrics.write_profile(args.profile)
+
+    print_summary(summary)
+    print(f"Stage timings (s): {summary['stage_seconds']}")
+    report = metrics.report()
+    print(f"API calls: {report['api_calls_total']} {report['api_calls']}; retries: {report['retries']}; "
+          f"uploaded {report['counters'].get('upload_bytes', 0)} bytes")
+
+    # Output summary
+    for name, error in summary['errors'].items():
+        print(f"Run of {name} stopped early: {error}")
+    for name, companies in summary['failed_inserts'].items():
+        print(f"Failed to insert images in {name} for the following companies: {companies}")
+    for name, sheets in summary['invalid_sheets'].items():
+        print(f"Sheets with invalid data structure in {name}: {sheets}")
+    for name, rejections in summary['rejected_cells'].items():
+        cells = ', '.join(f"{rejection['sheet_name']}!{rejection['cell']}" for rejection in rejections[:10])
+        print(f"Cells left out of the plots by data cleaning in {name}: {cells}{' ...' if len(rejections) > 10 else ''}")
+    if not summary['errors'] and not summary['failed_inserts'] and not summary['invalid_sheets']:
         print("All radar plots inserted into Google Sheets successfully.")
+    return summary
+
+def main(argv=None):
+    """Parse the command line (sys.argv when argv is None) and run the pipeline."""
+    parser = argparse.ArgumentParser(description="Generate radar plots and insert them into Google Sheets.")
+    parser.add_argument('--spreadsheet', action='append',
+                        help="Spreadsheet ID or URL to process (repeatable); defaults to SPREADSHEET_ID.")
+    parser.add_argument('--manifest',
+                        help="File listing the spreadsheets to process (JSON, or one ID or URL per line).")
+    parser.add_argument('--workbook-workers', type=int, default=WORKBOOK_WORKERS,
+                        help="Spreadsheets processed at once.")
+    parser.add_argument('--upload-backend', choices=UPLOAD_BACKENDS, default=UPLOAD_BACKEND,
+                        help="Upload images on threads or as asyncio coroutines over pooled connections.")
+    parser.add_argument('--output-profile', choices=sorted(PROFILES), default=OUTPUT_PROFILE_NAME,
+                        help="Image size and encoding: cell (PNG at cell size), hidpi (2x PNG), webp or hidpi-webp.")
+    parser.add_argument('--summary-tab', nargs='?', const=DEFAULT_SUMMARY_TAB, default=SUMMARY_TAB,
+                        help=f"Write per-company and per-lab score aggregates to this tab ('{DEFAULT_SUMMARY_TAB}' "
+                             f"when no title is given). Off by default.")
+    parser.add_argument('--mean-overlay', action='store_true', default=MEAN_OVERLAY,
+                        help="Draw each company's mean scores as a dashed trace over its radar plot.")
+    parser.add_argument('--no-clean-data', dest='clean_data', action='store_false', default=CLEAN_DATA,
+                        help="Use the values as the sheet holds them instead of trimming names and "
+                             "coercing scores (see data_cleaner.py for the optional stricter rules).")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only re-render, re-upload and rewrite companies whose rows changed since the last run.")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted run, skipping the steps its journal shows as completed.")
+    parser.add_argument('--watch', action='store_true',
+                        help="After the first run, keep running and update the plots whenever a spreadsheet changes.")
+    parser.add_argument('--report', default=METRICS_REPORT,
+                        help="Write a JSON run report (stage and per-company timings, API calls) to this file.")
+    parser.add_argument('--prometheus', default=METRICS_PROMETHEUS,
+                        help="Write the run metrics as a Prometheus textfile to this path.")
+    parser.add_argument('--profile', help="Profile every pipeline stage with cProfile and save the stats here.")
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help="Trace memory allocations and add the peak and top allocation sites to the report.")
+    args = parser.parse_args(argv)
+
+    # With several spreadsheets, each one writes its plots to its own subdirectory
+    entries = (read_manifest(args.manifest) if args.manifest else []) + (args.spreadsheet or [])
+    workbooks = make_workbooks(entries or [SPREADSHEET_ID], RADAR_PLOTS_DIR)
+
+    metrics.profile = bool(args.profile)
+    metrics.trace_memory = args.tracemalloc
+
+    uploads = make_uploader(args.upload_backend) or nullcontext()
+    render_pool = RenderPool(RENDER_WORKERS, cache=RenderCache(), profile=output_profile(args.output_profile))
+    with StateStore() as state, render_pool, uploads as uploader:
+        watcher = None
+        if args.watch:
+            watcher = ChangeWatcher(
+                lambda: get_drive_service(SERVICE_ACCOUNT_FILE, SCOPES),
+                [workbook.spreadsheet_id for workbook in workbooks],
+                # Each settled burst of edits gets an incremental pass over just those spreadsheets
+                lambda changed: run_and_report(
+                    [workbook for workbook in workbooks if workbook.spreadsheet_id in changed],
+                    state, render_pool, args, incremental=True, uploader=uploader
+                ),
+            )
+            watcher.start()  # Before the first run, so edits made during it are caught
+
+        run_and_report(workbooks, state, render_pool, args, args.incremental, args.resume, uploader)
+
+        if watcher is not None:
+            try:
+                watcher.run()
+            except KeyboardInterrupt:
+                print("Stopped watching.")
 
+if __name__ == "__main__":
+    main()
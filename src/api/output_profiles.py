@@ -0,0 +1,76 @@
+# Output profiles for radar plot images.
+# A profile fixes the size a plot is shown at in the sheet, the pixel density it is
+# rendered at and how it is encoded. Plots are drawn at the size Sheets displays them
+# rather than plotly's 700x500 canvas, and the IMAGE formula and row/column sizes come
+# from the same profile.
+import io
+import os
+from collections import namedtuple
+
+from PIL import Image
+
+# Size in pixels of the IMAGE formula and the row/column holding it. Override with RADAR_IMAGE_SIZE.
+DISPLAY_SIZE = int(os.environ.get('RADAR_IMAGE_SIZE', 300))
+
+# - display_size: Width and height the image is shown at in the sheet.
+# - scale: Pixels rendered per display pixel; 2 keeps plots sharp on HiDPI screens.
+# - image_format: 'png' or 'webp'.
+# - colors: PNG palette size; plots use a handful of flat colors plus anti-aliasing,
+#   so a 256-color palette is indistinguishable from truecolor. None keeps RGB.
+OutputProfile = namedtuple('OutputProfile', ['name', 'display_size', 'scale', 'image_format', 'colors'])
+
+PROFILES = {
+    'cell': OutputProfile('cell', DISPLAY_SIZE, 1, 'png', 256),
+    'hidpi': OutputProfile('hidpi', DISPLAY_SIZE, 2, 'png', 256),
+    'webp': OutputProfile('webp', DISPLAY_SIZE, 1, 'webp', None),
+    'hidpi-webp': OutputProfile('hidpi-webp', DISPLAY_SIZE, 2, 'webp', None),
+}
+
+# Profile used when none is given. Override with RADAR_OUTPUT_PROFILE.
+OUTPUT_PROFILE_NAME = os.environ.get('RADAR_OUTPUT_PROFILE', 'cell')
+
+WEBP_QUALITY = 90  # Lossy WebP quality; flat plot colors show no artifacts at this level
+WEBP_METHOD = 6    # Slowest, smallest WebP encoder setting
+
+MIME_TYPES = {'.png': 'image/png', '.webp': 'image/webp'}
+
+
+def output_profile(name):
+    """Return the OutputProfile called name, or raise ValueError."""
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown output profile {name!r}; expected one of {tuple(PROFILES)}") from None
+
+OUTPUT_PROFILE = output_profile(OUTPUT_PROFILE_NAME)
+
+def pixel_size(profile):
+    """Return the rendered (width, height) of a profile's images."""
+    size = profile.display_size * profile.scale
+    return size, size
+
+def image_extension(profile):
+    return f".{profile.image_format}"
+
+def image_mime_type(file_path):
+    """Return the MIME type of an image file by extension (image/png when unknown)."""
+    return MIME_TYPES.get(os.path.splitext(file_path)[1].lower(), 'image/png')
+
+def save_image(image, path, profile):
+    """
+    Encode a PIL image as the profile's format and write it to path.
+    PNGs are palette-quantized (without dithering, so flat areas stay flat) and written
+    with maximum deflate; WebP uses the slowest, smallest encoder setting.
+    """
+    image = image.convert('RGB')
+    if profile.image_format == 'webp':
+        image.save(path, format='WEBP', quality=WEBP_QUALITY, method=WEBP_METHOD)
+        return
+    if profile.colors:
+        image = image.quantize(colors=profile.colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+    image.save(path, format='PNG', optimize=True, compress_level=9)
+
+def save_image_bytes(data, path, profile):
+    """Re-encode image bytes (e.g. a plotly PNG export) with save_image."""
+    with Image.open(io.BytesIO(data)) as image:
+        save_image(image, path, profile)
@@ -0,0 +1,551 @@
+# In-process radar plot pipeline.
+# Stages (read, group, render, upload, write) run concurrently and hand work to each
+# other through bounded queues, so uploads start as soon as the first plot is rendered
+# and the spreadsheet is read only once.
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+
+from aggregates import MEAN_OVERLAY, SUMMARY_TAB, ScoreCollector, data_sheet_properties, summary_fingerprint, \
+    write_summary_tab
+from data_cleaner import CLEAN_DATA, DataCleaner
+from drive_batch import BATCH_LIMIT, grant_public_read, lookup_existing_images
+from drive_uploads import CREATED, LOOKUP, UPLOAD_WORKERS, UploadExecutor, drive_file_url
+from html_dashboard import HTML_MODE, HTML_MODES, RadarDashboard
+from output_profiles import OUTPUT_PROFILE, image_extension
+from radar_render import RENDER_WORKERS, RenderJob, RenderPool
+from run_journal import RENDERED, RESIZED, SHARED, UPLOADED, WRITTEN
+from run_metrics import metrics as default_metrics
+from sheet_snapshot import SpreadsheetSnapshot
+from sheet_stream import PAGE_ROWS, stream_company_groups
+from sheet_writes import SheetWriteBatch
+from state_store import group_fingerprint, target_cell
+
+IMAGE_COLUMN = 10   # Column K
+QUEUE_SIZE = 64     # Items each stage may hold before the previous stage waits
+POLL_SECONDS = 0.05
+
+_DONE = object()  # End-of-stream marker passed between stages
+
+
+class RadarPipeline:
+    """
+    Streams a spreadsheet's tabs and renders, uploads and inserts every company's radar plot
+    while the remaining rows are still being read.
+    - sheets_service: Sheets service used by the write stage on the calling thread.
+    - sheets_factory: Callable returning a Sheets service for the calling thread, used by
+      the read stage. Without it the read stage shares sheets_service, which is only safe
+      with batch_writes (nothing is written until reading is done).
+    - drive_factory: Callable returning a Drive service for the calling thread.
+    - spreadsheet_id: Spreadsheet to process.
+    - output_dir: Directory for the rendered image and HTML files.
+    - page_rows: Rows per streamed read request (see sheet_stream.PAGE_ROWS).
+    - render_pool: RenderPool to render on; one is created (and closed) when not given.
+    - profile: OutputProfile of the images; its display size also sets the IMAGE formula
+      size and the row/column sizes. Defaults to the render pool's profile.
+    - uploader: UploadExecutor to upload on, e.g. one shared by several pipelines; one with
+      upload_workers threads is created (and closed) when not given.
+    - batch_writes: Send all formulas and resizes in one batched write at the end,
+      instead of writing each company as its upload finishes.
+    - html_mode: One of HTML_MODES. The dashboard modes include every company, also the
+      ones an incremental run skips.
+    - state: Optional StateStore that records each published group's fingerprint,
+      Drive file ID and target cell, and which Drive files were made public.
+    - incremental: Skip groups whose fingerprint and target cell match the state store.
+    - journal: Optional RunJournal. Every completed step is appended to it, and steps it
+      reports as completed by an interrupted earlier run (see RunJournal's resume) are
+      skipped: no render, no Drive lookup or upload, no second formula write or resize.
+    - metrics: RunMetrics that receives stage and per-company timings (the process-wide
+      run_metrics.metrics by default).
+    - summary_tab: Tab that receives the per-company and per-lab aggregates of every tab
+      (see aggregates.py) after the images are written; it is never read as data. An
+      empty string (the default) turns it off.
+    - mean_overlay: Draw each company's mean scores over its radar plot.
+    - clean_data: Clean the rows as they are read (see data_cleaner.py): trim names, coerce
+      scores and, when enabled there, check their range and drop repeated evaluator rows.
+      Rejected cells are listed in the summary.
+    """
+
+    def __init__(self, sheets_service, drive_factory, spreadsheet_id, output_dir,
+                 render_pool=None, render_workers=RENDER_WORKERS, upload_workers=UPLOAD_WORKERS,
+                 batch_writes=True, html_mode=HTML_MODE, state=None, incremental=False,
+                 metrics=None, sheets_factory=None, page_rows=PAGE_ROWS, uploader=None, journal=None,
+                 profile=None, summary_tab=SUMMARY_TAB, mean_overlay=MEAN_OVERLAY,
+                 clean_data=CLEAN_DATA):
+        if html_mode not in HTML_MODES:
+            raise ValueError(f"Unknown HTML mode {html_mode!r}; expected one of {HTML_MODES}")
+        self.sheets_service = sheets_service
+        self.sheets_factory = sheets_factory
+        self.page_rows = page_rows
+        self.drive_factory = drive_factory
+        self.spreadsheet_id = spreadsheet_id
+        self.output_dir = output_dir
+        self.render_pool = render_pool
+        self.profile = profile or (render_pool.profile if render_pool is not None else OUTPUT_PROFILE)
+        self.render_workers = render_workers
+        self.upload_workers = upload_workers
+        self.uploader = uploader
+        self.batch_writes = batch_writes
+        self.html_mode = html_mode
+        self.state = state
+        self.incremental = incremental and state is not None
+        self.journal = journal
+        self.metrics = metrics or default_metrics
+        self.summary_tab = summary_tab
+        self.mean_overlay = mean_overlay
+        # Every group's scores, also of the groups an incremental run skips
+        self.scores = ScoreCollector() if summary_tab else None
+        self.cleaner = DataCleaner() if clean_data else None
+
+        self.render_queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.upload_queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.write_queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.snapshot = None
+        self.error = None
+        self.lookups = {}  # {(company, sheet): Future of its batch's {key: file} lookup}
+        self.failed_inserts = []
+        self.invalid_sheets = []
+        self.stage_seconds = {}
+        self.fingerprints = {}  # {(company, sheet): fingerprint}
+        self.resumed = {}       # {(company, sheet): {step: journal record}} from an interrupted run
+        self.counts = {'companies': 0, 'skipped': 0, 'resumed': 0, 'rendered': 0, 'uploaded': 0, 'unchanged': 0,
+                       'written': 0, 'summary_rows': 0, 'rejected_cells': 0}
+
+    def _stage_done(self, stage, start):
+        """Record a stage's wall time since start in stage_seconds and the run metrics."""
+        seconds = time.perf_counter() - start
+        self.stage_seconds[stage] = seconds
+        self.metrics.add_stage_time(stage, seconds)
+
+    def _timed(self, stage, target):
+        """Wrap a stage function so its wall time is recorded (and profiled, when enabled)."""
+        def run():
+            start = time.perf_counter()
+            try:
+                self.metrics.run_profiled(target)
+            finally:
+                self._stage_done(stage, start)
+        return run
+
+    # Read and group stages
+    def _read_and_group(self):
+        try:
+            self._load_groups()
+        except Exception as e:
+            print(f"Error reading spreadsheet {self.spreadsheet_id}: {e}")
+            self.error = e
+        finally:
+            self.render_queue.put(_DONE)
+
+    def _load_groups(self):
+        start = time.perf_counter()
+        sheets_service = self.sheets_factory() if self.sheets_factory else self.sheets_service
+        self.snapshot = SpreadsheetSnapshot.load_metadata(sheets_service, self.spreadsheet_id)
+        sheet_properties = data_sheet_properties(self.snapshot.sheet_properties, self.summary_tab)
+        stream = stream_company_groups(sheets_service, self.spreadsheet_id, sheet_properties,
+                                       page_rows=self.page_rows, invalid_sheets=self.invalid_sheets,
+                                       cleaner=self.cleaner)
+        read_seconds = time.perf_counter() - start
+        group_seconds = 0.0
+
+        dashboard = None
+        if self.html_mode in ('dashboard', 'sheet'):
+            dashboard = RadarDashboard(self.output_dir, per_sheet=self.html_mode == 'sheet',
+                                        mean_overlay=self.mean_overlay)
+        pending = []  # Groups waiting for their batched Drive lookup
+        sheets_seen = set()
+        while True:
+            start = time.perf_counter()
+            group = next(stream, None)
+            read_seconds += time.perf_counter() - start
+            if group is None:
+                break
+
+            start = time.perf_counter()
+            if group.sheet_name not in sheets_seen:
+                sheets_seen.add(group.sheet_name)
+                print(f"Processing sheet: {group.sheet_name}")
+            if not group.valid_rows:
+                print(f"No valid data for company: {group.company_name} in sheet {group.sheet_name}")
+                group_seconds += time.perf_counter() - start
+                continue
+            if dashboard is not None:
+                dashboard.add(group.sheet_name, group.company_name, group.categories, group.valid_rows)
+            if self.scores is not None:
+                self.scores.add(group)
+            fingerprint = group_fingerprint(group.categories, group.valid_rows, self.profile, self.mean_overlay)
+            self.fingerprints[(group.company_name, group.sheet_name)] = fingerprint
+            self.counts['companies'] += 1
+            if self.incremental and self.state.is_current(
+                    self.spreadsheet_id, group.sheet_name, group.company_name,
+                    fingerprint, target_cell(group.target_row, IMAGE_COLUMN)):
+                self.counts['skipped'] += 1
+                group_seconds += time.perf_counter() - start
+                continue
+            if self.journal is not None and self._resume_group(group):
+                group_seconds += time.perf_counter() - start
+                continue
+            pending.append(group)
+            group_seconds += time.perf_counter() - start
+            if len(pending) >= BATCH_LIMIT:
+                self._queue_groups(pending)
+                pending = []
+        self._queue_groups(pending)
+
+        for sheet_name in self.invalid_sheets:
+            print(f"Invalid data structure in sheet: {sheet_name}")
+        if self.cleaner is not None:
+            self.cleaner.print_report()
+            self.counts['rejected_cells'] = len(self.cleaner)
+        if self.incremental:
+            print(f"Incremental run: {self.counts['companies'] - self.counts['skipped']} changed groups, "
+                  f"{self.counts['skipped']} unchanged.")
+        if self.resumed:
+            print(f"Resumed run: {len(self.resumed)} companies continue from their last completed step, "
+                  f"{self.counts['resumed']} were already finished.")
+        self.stage_seconds['read'] = read_seconds
+        self.metrics.add_stage_time('read', read_seconds)
+        self.stage_seconds['group'] = group_seconds
+        self.metrics.add_stage_time('group', group_seconds)
+
+        if dashboard is not None:
+            start = time.perf_counter()
+            try:
+                dashboard.write()
+            except Exception as e:
+                print(f"Error writing radar dashboard: {e}")
+            self._stage_done('html', start)
+
+    def _resume_group(self, group):
+        """
+        Load the group's completed steps from the journal. Returns True when every step is
+        done, in which case the group is only recorded in the state store.
+        """
+        key = (group.company_name, group.sheet_name)
+        steps = self.journal.completed(group.sheet_name, group.company_name, self.fingerprints[key],
+                                       target_cell(group.target_row, IMAGE_COLUMN))
+        if not steps:
+            return False
+        uploaded = steps.get(UPLOADED)
+        if uploaded and WRITTEN in steps and RESIZED in steps and \
+                (SHARED in steps or not self._needs_share(uploaded['file_id'], uploaded['status'])):
+            self.counts['resumed'] += 1
+            self._record(group, uploaded['file_id'])
+            return True
+        self.resumed[key] = steps
+        return False
+
+    def _journal(self, step, group, **details):
+        """Append a completed step of the group to the journal, if there is one."""
+        if self.journal is None:
+            return
+        self.journal.record(step, group.sheet_name, group.company_name,
+                            self.fingerprints[(group.company_name, group.sheet_name)],
+                            target_cell(group.target_row, IMAGE_COLUMN), **details)
+
+    def _queue_groups(self, groups):
+        """Start one batched Drive lookup for the groups, then hand them to the render stage."""
+        if not groups:
+            return
+        # Groups the journal shows as uploaded already know their Drive file
+        keys = [
+            (group.company_name, group.sheet_name) for group in groups
+            if UPLOADED not in self.resumed.get((group.company_name, group.sheet_name), {})
+        ]
+        if keys:
+            lookup = self.lookup_executor.submit(
+                lambda: lookup_existing_images(self.drive_factory(), self.spreadsheet_id, keys)[0]
+            )
+            for key in keys:
+                self.lookups[key] = lookup
+        for group in groups:
+            self.render_queue.put(group)
+
+    # Render stage
+    def _render_job(self, group):
+        base = os.path.join(self.output_dir, f"{group.company_name}_{group.sheet_name}_radar")
+        return RenderJob(
+            group.company_name, group.sheet_name, group.valid_rows, group.categories,
+            f"{base}.html" if self.html_mode == 'company' else None, f"{base}{image_extension(self.profile)}",
+            profile=self.profile, mean_overlay=self.mean_overlay
+        )
+
+    def _render(self):
+        in_flight = {}
+        input_done = False
+        try:
+            while not input_done or in_flight:
+                # Keep the pool busy without pulling the whole queue into memory
+                while not input_done and len(in_flight) < self.render_pool.workers * 2:
+                    try:
+                        group = self.render_queue.get(timeout=POLL_SECONDS if in_flight else None)
+                    except queue.Empty:
+                        break
+                    if group is _DONE:
+                        input_done = True
+                        break
+                    job = self._render_job(group)
+                    steps = self.resumed.get((group.company_name, group.sheet_name), {})
+                    if UPLOADED in steps or (RENDERED in steps and os.path.exists(job.output_png_path)):
+                        # Rendered (or even uploaded) by the interrupted run
+                        self.upload_queue.put((group, job.output_png_path))
+                        continue
+                    try:
+                        in_flight[self.render_pool.submit(job)] = (group, time.perf_counter())
+                    except Exception as e:
+                        print(f"Error generating radar plot for company {group.company_name}: {e}")
+                        self.failed_inserts.append(group.company_name)
+
+                if in_flight:
+                    done, _ = wait(in_flight, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        group, submitted = in_flight.pop(future)
+                        self.metrics.record_item('render', self.spreadsheet_id, group.sheet_name,
+                                                 group.company_name, time.perf_counter() - submitted)
+                        if future.exception() is not None:
+                            print(f"Error generating radar plot for company {group.company_name}: {future.exception()}")
+                            self.failed_inserts.append(group.company_name)
+                            continue
+                        self.counts['rendered'] += 1
+                        png_path = future.result().output_png_path
+                        self._journal(RENDERED, group, png=png_path)
+                        self.upload_queue.put((group, png_path))
+        finally:
+            self.upload_queue.put(_DONE)
+
+    def _record(self, group, file_id):
+        """Remember a published group in the state store."""
+        if self.state is None:
+            return
+        self.state.record_group(
+            self.spreadsheet_id, group.sheet_name, group.company_name,
+            self.fingerprints[(group.company_name, group.sheet_name)], file_id,
+            target_cell(group.target_row, IMAGE_COLUMN)
+        )
+
+    def _needs_write(self, group, upload_status):
+        """Return True when the sheet needs a new IMAGE formula for this upload."""
+        if upload_status == CREATED:
+            return True
+        if self.state is None:
+            # Same Drive file, so the IMAGE formula already in the sheet is still valid
+            return False
+        # The formula is still valid only if it is in the cell we wrote last time
+        stored = self.state.group(self.spreadsheet_id, group.sheet_name, group.company_name)
+        return stored is None or stored[2] != target_cell(group.target_row, IMAGE_COLUMN)
+
+    def _needs_share(self, file_id, upload_status):
+        """
+        Return True when the Drive file may not be public yet: it is new, or no run has
+        recorded sharing it (e.g. sharing failed and its group was forgotten).
+        """
+        if upload_status == CREATED:
+            return True
+        return self.state is not None and not self.state.is_shared(file_id)
+
+    # Upload stage
+    def _upload(self):
+        in_flight = {}
+        input_done = False
+        try:
+            # A shared uploader stays open for the other pipelines using it
+            uploads = nullcontext(self.uploader) if self.uploader is not None \
+                else UploadExecutor(self.drive_factory, workers=self.upload_workers)
+            with uploads as uploader:
+                while not input_done or in_flight:
+                    while not input_done and len(in_flight) < self.upload_workers * 2:
+                        try:
+                            item = self.upload_queue.get(timeout=POLL_SECONDS if in_flight else None)
+                        except queue.Empty:
+                            break
+                        if item is _DONE:
+                            input_done = True
+                            break
+                        group, png_path = item
+                        key = (group.company_name, group.sheet_name)
+                        uploaded = self.resumed.get(key, {}).get(UPLOADED)
+                        if uploaded:
+                            self._route_upload(group, uploaded['file_id'], uploaded['status'])
+                            continue
+                        try:
+                            existing_images = self.lookups.pop(key).result()
+                        except Exception as e:
+                            print(f"Batched Drive lookup failed; searching per upload: {e}")
+                            existing_images = {}
+                        # Keys whose lookup failed fall back to a search inside their upload
+                        existing = existing_images.get(key, LOOKUP)
+                        future = uploader.submit(png_path, group.company_name, group.sheet_name,
+                                                 self.spreadsheet_id, existing=existing, share=False)
+                        in_flight[future] = (group, time.perf_counter())
+
+                    if in_flight:
+                        done, _ = wait(in_flight, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            group, submitted = in_flight.pop(future)
+                            self.metrics.record_item('upload', self.spreadsheet_id, group.sheet_name,
+                                                     group.company_name, time.perf_counter() - submitted)
+                            try:
+                                file_id, upload_status = future.result()
+                            except Exception as e:
+                                print(f"Error uploading image to Drive: {e}")
+                                file_id, upload_status = None, None
+                            if not file_id:
+                                self.failed_inserts.append(group.company_name)
+                                continue
+                            if upload_status == CREATED:
+                                self.counts['uploaded'] += 1
+                            else:
+                                self.counts['unchanged'] += 1
+                            self._journal(UPLOADED, group, file_id=file_id, status=upload_status)
+                            self._route_upload(group, file_id, upload_status)
+        finally:
+            self.write_queue.put(_DONE)
+
+    def _route_upload(self, group, file_id, upload_status):
+        """Queue an uploaded group for the write stage, or record it when its formula is current and public."""
+        write = self._needs_write(group, upload_status)
+        share = self._needs_share(file_id, upload_status)
+        if not write and not share:
+            self._record(group, file_id)
+            return
+        self.write_queue.put((group, file_id, write, share))
+
+    # Write stage (runs on the calling thread, which owns sheets_service)
+    def _write(self):
+        write_batch = SheetWriteBatch(self.spreadsheet_id)
+        unshared_files = {}  # {(company, sheet): file ID} still to be made public
+        unshared_groups = {}  # {(company, sheet): group} of unshared_files
+        public_files = []  # File IDs the journal shows as shared, not yet in the state store
+        share_only = []  # [(group, file ID)] whose formula is current but whose file may be private
+        batched = []  # [(group, file ID)] waiting for the next flush
+        while True:
+            item = self.write_queue.get()
+            if item is _DONE:
+                break
+            group, file_id, write, share = item
+            key = (group.company_name, group.sheet_name)
+            steps = self.resumed.get(key, {})
+            if share and SHARED in steps:
+                public_files.append(file_id)
+            elif share:
+                unshared_files[key] = file_id
+                unshared_groups[key] = group
+            if not write:
+                share_only.append((group, file_id))
+                continue
+            if WRITTEN not in steps:
+                write_batch.add_image(group.sheet_name, group.target_row, IMAGE_COLUMN, drive_file_url(file_id),
+                                      width=self.profile.display_size, height=self.profile.display_size)
+            if RESIZED not in steps:
+                write_batch.add_resize(group.sheet_name, group.target_row, IMAGE_COLUMN,
+                                       row_height=self.profile.display_size,
+                                       column_width=self.profile.display_size)
+            batched.append((group, file_id))
+            if not self.batch_writes:
+                self._flush(write_batch, batched)
+                batched = []
+
+        # Make all new (or not yet public) images public in batched permission calls
+        share_errors = grant_public_read(self.drive_factory(), unshared_files) if unshared_files else {}
+        for company_name, sheet_name in share_errors:
+            self.failed_inserts.append(company_name)
+        for key, group in unshared_groups.items():
+            if key not in share_errors:
+                self._journal(SHARED, group)
+                public_files.append(unshared_files[key])
+        if self.state is not None and public_files:
+            self.state.record_shared(public_files)
+
+        self._flush(write_batch, batched)
+        for group, file_id in share_only:
+            if (group.company_name, group.sheet_name) not in share_errors:
+                self._record(group, file_id)
+
+        # Groups whose images are not public yet are published again next time
+        if self.state is not None:
+            for company_name, sheet_name in share_errors:
+                self.state.forget_group(self.spreadsheet_id, sheet_name, company_name)
+
+    def _flush(self, write_batch, batched):
+        """Send the formulas, then the resizes, journaling each; resumed groups may need neither."""
+        try:
+            if write_batch.flush_values(self.sheets_service):
+                for group, _ in batched:
+                    self._journal(WRITTEN, group)
+            # Without a snapshot flush_resizes fetches the sheet IDs itself
+            sheet_ids = self.snapshot.sheet_ids() if self.snapshot is not None else None
+            if write_batch.flush_resizes(self.sheets_service, sheet_ids):
+                for group, _ in batched:
+                    self._journal(RESIZED, group)
+            self.counts['written'] += len(batched)
+            for group, file_id in batched:
+                self._record(group, file_id)
+        except Exception as e:
+            print(f"Error writing images to the spreadsheet: {e}")
+            self.failed_inserts.extend(group.company_name for group, _ in batched)
+
+    # Aggregate stage (runs on the calling thread once every image is written)
+    def _write_summary(self):
+        """
+        Write the run's aggregates to the summary tab. Skipped when reading failed (the
+        aggregates would be partial) and when the state store shows the same summary is
+        already there, so a watch run is not triggered again by its own write.
+        """
+        if self.scores is None or self.error is not None or not len(self.scores):
+            return
+        rows = self.scores.summary_rows()
+        fingerprint = summary_fingerprint(rows)
+        tab_exists = any(properties['title'] == self.summary_tab for properties in self.snapshot.sheet_properties)
+        if tab_exists and self.state is not None and \
+                self.state.summary_fingerprint(self.spreadsheet_id, self.summary_tab) == fingerprint:
+            print(f"The {self.summary_tab} tab is up to date.")
+            return
+        try:
+            write_summary_tab(self.sheets_service, self.spreadsheet_id, self.snapshot.sheet_properties, rows,
+                              self.summary_tab)
+        except Exception as e:
+            print(f"Error writing the {self.summary_tab} tab: {e}")
+            return
+        self.counts['summary_rows'] = len(rows) - 1
+        if self.state is not None:
+            self.state.record_summary(self.spreadsheet_id, self.summary_tab, fingerprint)
+
+    def run(self):
+        """Run every stage to completion and return a summary dict."""
+        start = time.perf_counter()
+        own_pool = self.render_pool is None
+        if own_pool:
+            self.render_pool = RenderPool(self.render_workers, profile=self.profile)
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        self.lookup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='drive-lookup')
+        threads = [
+            threading.Thread(target=self._read_and_group, name='read'),
+            threading.Thread(target=self._timed('render', self._render), name='render'),
+            threading.Thread(target=self._timed('upload', self._upload), name='upload'),
+        ]
+        try:
+            for thread in threads:
+                thread.start()
+            self._timed('write', self._write)()
+            for thread in threads:
+                thread.join()
+            self._timed('aggregate', self._write_summary)()
+        finally:
+            self.lookup_executor.shutdown()
+            if own_pool:
+                self.render_pool.close()
+
+        return {
+            'spreadsheet_id': self.spreadsheet_id,
+            'error': str(self.error) if self.error else None,
+            'failed_inserts': self.failed_inserts,
+            'invalid_sheets': self.invalid_sheets,
+            'rejected_cells': self.cleaner.report()['cells'] if self.cleaner is not None else [],
+            'counts': dict(self.counts),
+            'stage_seconds': dict(self.stage_seconds),
+            'total_seconds': time.perf_counter() - start,
+        }
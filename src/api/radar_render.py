@@ -0,0 +1,341 @@
+# Radar plot rendering engine.
+# Renders (company, sheet) jobs on a pool of worker processes. Each worker imports
+# plotly and starts its image export backend once, then reuses it for every job.
+# plotly is only imported for the plotly PNG backend and HTML output, so raster runs
+# never load it.
+import atexit
+import os
+import shutil
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from importlib.metadata import version
+
+from aggregates import mean_scores
+from output_profiles import OUTPUT_PROFILE, save_image_bytes
+from raster_render import MEAN_LABEL, RASTER_VERSION, write_radar_png
+from render_cache import render_key
+
+# Default number of render processes; override with the RADAR_RENDER_WORKERS environment variable.
+RENDER_WORKERS = int(os.environ.get('RADAR_RENDER_WORKERS', os.cpu_count() or 1))
+
+# Layout settings shared by every radar plot; part of the render cache key.
+RADAR_LAYOUT = dict(radial_range=[0, 10], showlegend=True)
+
+# Canvases narrower than this times their height (e.g. a square sheet cell) get the
+# legend below the chart, so it does not take half the width.
+LEGEND_BELOW_RATIO = 1.2
+
+# PNG backend: 'plotly' exports through Kaleido, 'raster' draws directly with Pillow
+# (see raster_render.py). HTML output always uses plotly. Override with RADAR_PNG_BACKEND.
+PNG_BACKENDS = ('plotly', 'raster')
+PNG_BACKEND = os.environ.get('RADAR_PNG_BACKEND', 'plotly')
+
+# Bump the trailing number whenever build_radar_figure changes how plots look.
+RENDERER_VERSION = f"plotly-{version('plotly')}/2"
+
+# One radar plot to render.
+# - valid_rows: List of tuples [(Evaluator, Lab, [Scores]), ...].
+# - output_html_path / output_png_path: Output files; either may be None to skip that format.
+#   The image is PNG or WebP, as the profile says.
+# - png_backend: One of PNG_BACKENDS; None uses the pool's backend.
+# - profile: OutputProfile for the image; None uses the pool's profile.
+# - mean_overlay: Draw the company's mean scores over the evaluator traces.
+RenderJob = namedtuple('RenderJob', [
+    'company_name', 'sheet_name', 'valid_rows', 'categories', 'output_html_path', 'output_png_path',
+    'png_backend', 'profile', 'mean_overlay'
+], defaults=(None, None, False))
+
+
+def build_radar_figure(valid_rows, categories, company_name, mean_overlay=False):
+    """
+    Build the radar plot figure for a single company with multiple evaluators.
+    - valid_rows: List of tuples [(Evaluator, Lab, [Scores]), ...].
+    - categories: List of category names for radar plot (e.g., ['Innovate', 'Impact', 'Savings']).
+    - company_name: Name of the company.
+    - mean_overlay: Add the per-category mean of all evaluators as a dashed, unfilled trace.
+    """
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    categories_loop = categories + [categories[0]]  # Repeat the first category to close the chart
+
+    for evaluator_name, lab_name, values in valid_rows:
+        # Add evaluator trace, closing the radar chart loop
+        fig.add_trace(go.Scatterpolar(
+            r=list(values) + [values[0]],
+            theta=categories_loop,
+            fill='toself',
+            name=f"{evaluator_name}, {lab_name}"  # Append lab name to evaluator in legend
+        ))
+
+    if mean_overlay:
+        means = mean_scores(valid_rows)
+        fig.add_trace(go.Scatterpolar(
+            r=means + [means[0]],
+            theta=categories_loop,
+            mode='lines',
+            line=dict(color='#2a3f5f', dash='dash', width=2.5),
+            name=MEAN_LABEL
+        ))
+
+    # Update layout for the radar plot
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=RADAR_LAYOUT['radial_range']  # Adjust range in RADAR_LAYOUT
+            )
+        ),
+        title=f"Radar Plot for {company_name}",
+        showlegend=RADAR_LAYOUT['showlegend']
+    )
+    return fig
+
+def renderer_version(png_backend):
+    """Return the version string for the render cache key of a PNG backend."""
+    if png_backend == 'raster':
+        return f"{RENDERER_VERSION}+raster-{RASTER_VERSION}"
+    return RENDERER_VERSION
+
+def fit_figure_to_canvas(fig, width, height):
+    """Lay a figure out for a small export canvas; on square canvases the legend goes below the chart."""
+    if width < height * LEGEND_BELOW_RATIO:
+        fig.update_layout(legend=dict(orientation='h', x=0, y=-0.05, yanchor='top'))
+    fig.update_layout(width=width, height=height, margin=dict(l=30, r=30, t=50, b=30))
+    return fig
+
+def generate_company_radar_plot(valid_rows, categories, company_name, output_html_path, output_png_path,
+                                png_backend=None, profile=None, mean_overlay=False):
+    """
+    Generates a radar plot for a single company with multiple evaluators and saves as HTML and PNG.
+    - valid_rows: List of tuples [(Evaluator, Lab, [Scores]), ...].
+    - categories: List of category names for radar plot (e.g., ['Innovate', 'Impact', 'Savings']).
+    - company_name: Name of the company.
+    - output_html_path: Path to save the radar plot HTML file.
+    - output_png_path: Path to save the radar plot image (PNG, or WebP with a WebP profile).
+    - png_backend: One of PNG_BACKENDS; defaults to PNG_BACKEND.
+    - profile: OutputProfile setting the image's size and encoding; defaults to OUTPUT_PROFILE.
+    - mean_overlay: Draw the mean of all evaluators' scores over their traces.
+    """
+    png_backend = png_backend or PNG_BACKEND
+    profile = profile or OUTPUT_PROFILE
+
+    # Save the plot as an HTML file
+    if output_html_path:
+        fig = build_radar_figure(valid_rows, categories, company_name, mean_overlay)
+        fig.write_html(output_html_path)
+        print(f"Radar plot HTML saved: {output_html_path}")
+
+    # Save the plot as a PNG file
+    if output_png_path:
+        if png_backend == 'raster':
+            write_radar_png(valid_rows, categories, company_name, output_png_path, profile,
+                            radial_range=tuple(RADAR_LAYOUT['radial_range']),
+                            showlegend=RADAR_LAYOUT['showlegend'],
+                            mean_values=mean_scores(valid_rows) if mean_overlay else None)
+        else:
+            if not output_html_path:
+                fig = build_radar_figure(valid_rows, categories, company_name, mean_overlay)
+            # Export at display size (times the profile's scale), then quantize and recompress
+            size = profile.display_size
+            fit_figure_to_canvas(fig, size, size)
+            save_image_bytes(fig.to_image(format='png', width=size, height=size, scale=profile.scale),
+                             output_png_path, profile)
+        print(f"Radar plot image saved: {output_png_path}")
+
+def render_job(job):
+    """Render one RenderJob and return it."""
+    generate_company_radar_plot(
+        job.valid_rows, job.categories, job.company_name, job.output_html_path, job.output_png_path,
+        job.png_backend, job.profile, job.mean_overlay
+    )
+    return job
+
+def job_outputs(job):
+    """Return [(extension, path)] for the outputs a job asks for."""
+    image_extension = os.path.splitext(job.output_png_path or '')[1].lstrip('.').lower() or 'png'
+    outputs = [('html', job.output_html_path), (image_extension, job.output_png_path)]
+    return [(extension, path) for extension, path in outputs if path]
+
+def job_cache_key(job):
+    """Return the render cache key for a job."""
+    layout = dict(RADAR_LAYOUT, profile=list(job.profile or OUTPUT_PROFILE))
+    if job.mean_overlay:
+        layout['mean_overlay'] = True  # Only when set, so plots without it keep their cache keys
+    return render_key(job.valid_rows, job.categories, job.company_name, layout,
+                      renderer_version(job.png_backend or PNG_BACKEND))
+
+def _init_worker(png_backend=None):
+    """Start the image export backend once per worker process and keep it running."""
+    if (png_backend or PNG_BACKEND) == 'raster':
+        return  # Pillow needs no warm-up
+    try:
+        import kaleido
+        # Kaleido 1.x starts a browser per write_image call unless a sync server is running
+        if hasattr(kaleido, 'start_sync_server'):
+            kaleido.start_sync_server(silence_warnings=True)
+            atexit.register(kaleido.stop_sync_server, silence_warnings=True)
+    except ImportError:
+        pass
+    try:
+        import plotly.graph_objects as go
+
+        # A first tiny export starts the backend before real jobs arrive
+        go.Figure().to_image(format='png', width=10, height=10)
+    except Exception as e:
+        print(f"Image export backend warm-up failed in worker {os.getpid()}: {e}")
+
+
+def _completed(result=None, error=None):
+    """Return a Future that is already resolved."""
+    future = Future()
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+    return future
+
+
+class RenderPool:
+    """
+    Persistent pool of render worker processes.
+    - workers: Number of processes. With 1 worker, jobs render in the calling process.
+    - cache: Optional RenderCache. Jobs whose inputs were rendered before are served from
+      it, and jobs with identical inputs that are in flight together are rendered only once.
+    - png_backend: PNG backend for jobs that do not set one; defaults to PNG_BACKEND.
+    - profile: OutputProfile for jobs that do not set one; defaults to OUTPUT_PROFILE.
+    Use as a context manager, or call close() when done.
+    """
+
+    def __init__(self, workers=None, cache=None, png_backend=None, profile=None):
+        self.workers = max(1, workers or RENDER_WORKERS)
+        self.cache = cache
+        self.png_backend = png_backend or PNG_BACKEND
+        self.profile = profile or OUTPUT_PROFILE
+        if self.png_backend not in PNG_BACKENDS:
+            raise ValueError(f"Unknown PNG backend {self.png_backend!r}; expected one of {PNG_BACKENDS}")
+        self.executor = None
+        self.warm = False
+        self.rendered = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}  # {(cache key, output extensions): Future}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _ensure_started(self):
+        if self.workers > 1 and self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self.png_backend,)
+            )
+            print(f"Started render pool with {self.workers} workers.")
+        elif self.workers == 1 and not self.warm:
+            _init_worker(self.png_backend)
+            self.warm = True
+
+    def _render(self, job):
+        """Render a job on the pool (or inline with one worker) and return its Future."""
+        self._ensure_started()
+        if self.executor is not None:
+            return self.executor.submit(render_job, job)
+        try:
+            return _completed(render_job(job))
+        except Exception as e:
+            return _completed(error=e)
+
+    def submit(self, job):
+        """Queue a RenderJob and return a Future resolving to the job."""
+        if job.png_backend is None:
+            job = job._replace(png_backend=self.png_backend)
+        if job.profile is None:
+            job = job._replace(profile=self.profile)
+        if self.cache is None:
+            with self._lock:
+                self.rendered += 1
+            return self._render(job)
+
+        key = job_cache_key(job)
+        outputs = job_outputs(job)
+        flight_key = (key, tuple(ext for ext, _ in outputs))
+        with self._lock:
+            primary = self._in_flight.get(flight_key)
+            if primary is None:
+                if all(self.cache.contains(key, ext) for ext, _ in outputs):
+                    for ext, path in outputs:
+                        self.cache.fetch(key, ext, path)
+                    self.reused += 1
+                    return _completed(job)
+                for _, path in outputs:
+                    if os.path.lexists(path):
+                        os.remove(path)  # Never write through a link into the cache
+                self.rendered += 1
+                # Published before rendering starts; it resolves only once the outputs are
+                # in the cache, so duplicates never fetch an entry that is not there yet
+                primary = self._in_flight[flight_key] = Future()
+                rendering = True
+            else:
+                self.reused += 1
+                rendering = False
+        if rendering:
+            # Outside the lock: inline renders are already done, so _store runs right here
+            self._render(job).add_done_callback(lambda future: self._store(flight_key, job, future, primary))
+            return primary
+
+        # Same inputs as a render already in flight: take its outputs from the cache
+        duplicate = Future()
+
+        def copy_outputs(future):
+            if future.exception() is not None:
+                duplicate.set_exception(future.exception())
+                return
+            try:
+                rendered = dict(job_outputs(future.result()))
+                for ext, path in outputs:
+                    if not self.cache.fetch(key, ext, path):
+                        # Not cached (the store failed): copy the primary job's file instead
+                        shutil.copyfile(rendered[ext], path)
+                duplicate.set_result(job)
+            except Exception as e:
+                duplicate.set_exception(e)
+
+        primary.add_done_callback(copy_outputs)
+        return duplicate
+
+    def _store(self, flight_key, job, future, primary):
+        """Copy a finished render into the cache, stop tracking it as in flight and resolve primary."""
+        try:
+            if future.exception() is None:
+                for ext, path in job_outputs(job):
+                    self.cache.store(flight_key[0], ext, path)
+        except Exception as e:
+            print(f"Error storing radar plot for {job.company_name} in the render cache: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.pop(flight_key, None)
+            if future.exception() is not None:
+                primary.set_exception(future.exception())
+            else:
+                primary.set_result(future.result())
+
+    def render_all(self, jobs):
+        """
+        Render every job and yield (job, error) pairs as they finish.
+        - error: None on success, otherwise the exception raised while rendering.
+        """
+        futures = {self.submit(job): job for job in jobs}
+        for future in as_completed(futures):
+            yield futures[future], future.exception()
+
+    def close(self):
+        """Shut down the worker processes and trim the render cache."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.cache is not None:
+            print(f"Rendered {self.rendered} radar plots, reused {self.reused} from the render cache.")
+            self.cache.evict()
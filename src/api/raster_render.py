@@ -0,0 +1,189 @@
+# Native raster backend for radar plot PNGs.
+# Draws the same chart as build_radar_figure (0-10 radial axis, one filled trace per
+# evaluator/lab, legend) straight to a PNG with Pillow, without plotly or Kaleido.
+import math
+
+from PIL import Image, ImageDraw, ImageFont
+
+from output_profiles import OUTPUT_PROFILE, pixel_size, save_image
+
+RASTER_VERSION = 2  # Bump whenever the drawing code changes how plots look
+
+# Plotly's default look, so both backends produce matching charts
+COLORWAY = ['#636efa', '#EF553B', '#00cc96', '#ab63fa', '#FFA15A',
+            '#19d3f3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
+BACKGROUND = (255, 255, 255)
+POLAR_BACKGROUND = (229, 236, 246)
+GRID_COLOR = (255, 255, 255)
+TEXT_COLOR = (42, 63, 95)
+FILL_ALPHA = 128
+MEAN_COLOR = (42, 63, 95)  # Dashed mean trace, in the text color so it reads over every fill
+MEAN_LABEL = 'Mean'
+SUPERSAMPLE = 2  # Draw at 2x and downsample for anti-aliased edges
+LEGEND_BELOW_RATIO = 1.2  # Canvases narrower than this times their height get the legend below
+
+_fonts = {}
+
+
+def _font(size):
+    """Return a TrueType font of the given pixel size, falling back to Pillow's default."""
+    if size not in _fonts:
+        for name in ('DejaVuSans.ttf', 'arial.ttf', 'Arial.ttf'):
+            try:
+                _fonts[size] = ImageFont.truetype(name, size)
+                break
+            except OSError:
+                continue
+        else:
+            try:
+                _fonts[size] = ImageFont.load_default(size)
+            except TypeError:  # Pillow < 10.1 has a single fixed-size bitmap font
+                _fonts[size] = ImageFont.load_default()
+    return _fonts[size]
+
+def _hex_to_rgb(color):
+    color = color.lstrip('#')
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+def _text_size(draw, text, font):
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    return right - left, bottom - top
+
+def _dashed_line(draw, points, fill, width, dash):
+    """Draw a dashed polyline through points with dashes and gaps dash pixels long."""
+    offset = 0.0  # Position along the line, so dashes continue across corners
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        length = math.hypot(x1 - x0, y1 - y0)
+        position = 0.0
+        while position < length:
+            step = min(dash - offset % dash, length - position)
+            if (offset // dash) % 2 == 0:
+                start, end = position / length, (position + step) / length
+                draw.line([(x0 + (x1 - x0) * start, y0 + (y1 - y0) * start),
+                           (x0 + (x1 - x0) * end, y0 + (y1 - y0) * end)], fill=fill, width=width)
+            position += step
+            offset += step
+
+def draw_radar_image(valid_rows, categories, company_name, width=700, height=500, radial_range=(0, 10),
+                     showlegend=True, mean_values=None):
+    """
+    Draw a radar plot for a single company and return it as an RGB PIL image.
+    - valid_rows: List of tuples [(Evaluator, Lab, [Scores]), ...].
+    - categories: List of category names for radar plot (e.g., ['Innovate', 'Impact', 'Savings']).
+    - company_name: Name of the company.
+    - width, height: Output size in pixels (plotly's default canvas is 700x500).
+    - mean_values: Per-category mean scores to draw as a dashed, unfilled trace on top; None for none.
+    """
+    scale = SUPERSAMPLE
+    w, h = width * scale, height * scale
+    image = Image.new('RGBA', (w, h), BACKGROUND + (255,))
+    draw = ImageDraw.Draw(image)
+    unit = min(width, height) / 500 * scale  # Fonts and margins follow the canvas size
+
+    title_font = _font(max(8, round(17 * unit)))
+    label_font = _font(max(6, round(12 * unit)))
+
+    # Title, top left like plotly
+    draw.text((round(20 * unit), round(15 * unit)), f"Radar Plot for {company_name}", fill=TEXT_COLOR,
+              font=title_font)
+
+    # Legend on the right, or below the chart on square canvases such as a sheet cell
+    legend_width = legend_height = 0
+    labels = [f"{evaluator_name}, {lab_name}" for evaluator_name, lab_name, _ in valid_rows]
+    if mean_values is not None:
+        labels.append(MEAN_LABEL)
+    if showlegend and labels:
+        line_height = round(20 * unit)
+        if width < height * LEGEND_BELOW_RATIO:
+            legend_height = len(labels) * line_height + round(10 * unit)
+            legend_x = round(20 * unit)
+            legend_y = h - legend_height
+        else:
+            legend_width = max(_text_size(draw, label, label_font)[0] for label in labels) + round(50 * unit)
+            legend_x = w - legend_width
+            legend_y = round(80 * unit)
+        for index, label in enumerate(labels):
+            y = legend_y + index * line_height
+            if index == len(valid_rows):  # The mean trace, always last
+                swatch = [(legend_x, y + round(9 * unit)), (legend_x + round(30 * unit), y + round(9 * unit))]
+                _dashed_line(draw, swatch, MEAN_COLOR, max(1, round(2 * unit)), round(6 * unit))
+                draw.text((legend_x + round(38 * unit), y), label, fill=TEXT_COLOR, font=label_font)
+                continue
+            color = _hex_to_rgb(COLORWAY[index % len(COLORWAY)])
+            swatch = [legend_x, y + round(4 * unit), legend_x + round(30 * unit), y + round(14 * unit)]
+            draw.rectangle(swatch, fill=color + (FILL_ALPHA,), outline=color, width=max(1, round(unit)))
+            draw.text((legend_x + round(38 * unit), y), label, fill=TEXT_COLOR, font=label_font)
+
+    # Polar area: centered in the space left of or above the legend, below the title
+    top = round(80 * unit)
+    area_width = w - legend_width
+    area_bottom = h - legend_height
+    radius = max(10, min(area_width - round(160 * unit), area_bottom - top - round(60 * unit)) / 2)
+    cx = area_width / 2
+    cy = top + (area_bottom - top - round(30 * unit)) / 2
+
+    count = len(categories)
+    low, high = radial_range
+
+    def point(angle_index, value):
+        # Category 0 points east and categories run counterclockwise, as in plotly
+        angle = 2 * math.pi * angle_index / count
+        r = radius * (min(max(value, low), high) - low) / ((high - low) or 1)
+        return cx + r * math.cos(angle), cy - r * math.sin(angle)
+
+    draw.ellipse([cx - radius, cy - radius, cx + radius, cy + radius], fill=POLAR_BACKGROUND)
+    grid_width = max(1, round(unit))
+    ticks = [low + (high - low) * step / 5 for step in range(1, 6)]
+    for tick in ticks:
+        r = radius * (tick - low) / ((high - low) or 1)
+        draw.ellipse([cx - r, cy - r, cx + r, cy + r], outline=GRID_COLOR, width=grid_width)
+    for index in range(count):
+        draw.line([(cx, cy), point(index, high)], fill=GRID_COLOR, width=grid_width)
+
+    # Radial tick labels along the first spoke, category labels outside the circle
+    for tick in [low] + ticks:
+        x, y = point(0, tick)
+        text = f"{tick:g}"
+        tw, th = _text_size(draw, text, label_font)
+        draw.text((x - tw / 2, y + round(4 * unit)), text, fill=TEXT_COLOR, font=label_font)
+    for index, category in enumerate(categories):
+        angle = 2 * math.pi * index / count
+        x = cx + (radius + round(12 * unit)) * math.cos(angle)
+        y = cy - (radius + round(12 * unit)) * math.sin(angle)
+        tw, th = _text_size(draw, str(category), label_font)
+        # Anchor the label on the side facing away from the center
+        x -= tw * (1 - math.cos(angle)) / 2
+        y -= th * (1 + math.sin(angle)) / 2
+        draw.text((x, y), str(category), fill=TEXT_COLOR, font=label_font)
+
+    # Filled traces, each composited with transparency so overlaps stay visible
+    for index, (_, _, values) in enumerate(valid_rows):
+        color = _hex_to_rgb(COLORWAY[index % len(COLORWAY)])
+        line_width = max(1, round(2 * unit))
+        polygon = [point(i, float(value)) for i, value in enumerate(values[:count])]
+        # Only the trace's bounding box is composited, not the whole canvas
+        left = max(0, int(min(x for x, _ in polygon)) - line_width)
+        top_edge = max(0, int(min(y for _, y in polygon)) - line_width)
+        right = min(w, int(max(x for x, _ in polygon)) + line_width + 2)
+        bottom = min(h, int(max(y for _, y in polygon)) + line_width + 2)
+        shifted = [(x - left, y - top_edge) for x, y in polygon]
+        overlay = Image.new('RGBA', (right - left, bottom - top_edge), (0, 0, 0, 0))
+        overlay_draw = ImageDraw.Draw(overlay)
+        overlay_draw.polygon(shifted, fill=color + (FILL_ALPHA,))
+        overlay_draw.line(shifted + [shifted[0]], fill=color + (255,), width=line_width, joint='curve')
+        image.alpha_composite(overlay, dest=(left, top_edge))
+
+    if mean_values is not None:
+        polygon = [point(i, float(value)) for i, value in enumerate(mean_values[:count])]
+        _dashed_line(draw, polygon + [polygon[0]], MEAN_COLOR, max(1, round(2.5 * unit)), round(8 * unit))
+
+    return image.convert('RGB').resize((width, height), Image.LANCZOS)
+
+def write_radar_png(valid_rows, categories, company_name, output_png_path, profile=OUTPUT_PROFILE, **layout):
+    """
+    Draw a radar plot at the profile's pixel size and save it in the profile's format.
+    Extra keyword arguments go to draw_radar_image.
+    """
+    width, height = pixel_size(profile)
+    image = draw_radar_image(valid_rows, categories, company_name, width=width, height=height, **layout)
+    save_image(image, output_png_path, profile)
@@ -0,0 +1,120 @@
+# Content-addressed cache of rendered radar plots.
+# Each output is stored under a hash of everything that affects how it looks, so
+# unchanged and duplicate plots are linked or copied from the cache instead of rendered.
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+RENDER_CACHE_DIR = os.environ.get(
+    'RADAR_RENDER_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'radarsheets', 'renders')
+)
+RENDER_CACHE_MAX_BYTES = int(os.environ.get('RADAR_RENDER_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+
+def render_key(valid_rows, categories, company_name, layout, renderer_version):
+    """
+    Hash the inputs of a radar plot into a cache key.
+    - valid_rows: List of tuples [(Evaluator, Lab, [Scores]), ...].
+    - categories: List of category names.
+    - company_name: Name of the company (it appears in the plot title).
+    - layout: Dict of layout settings used by the renderer.
+    - renderer_version: String that changes whenever the rendering code or library changes.
+    """
+    payload = {
+        'rows': [[str(evaluator), str(lab), [float(v) for v in values]] for evaluator, lab, values in valid_rows],
+        'categories': [str(category) for category in categories],
+        'company': str(company_name),
+        'layout': layout,
+        'renderer': renderer_version,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def _materialize(source, dest):
+    """Hard-link source to dest, falling back to a copy (e.g. across drives)."""
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        os.link(source, dest)
+    except OSError:
+        shutil.copyfile(source, dest)
+
+
+class RenderCache:
+    """
+    On-disk cache of rendered files keyed by render_key(), with size-bounded LRU eviction.
+    - directory: Cache directory, created on first use.
+    - max_bytes: Total size above which the least recently used entries are removed.
+    """
+
+    def __init__(self, directory=RENDER_CACHE_DIR, max_bytes=RENDER_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, key, extension):
+        """Return the cache file path for a key and extension such as 'png'."""
+        return os.path.join(self.directory, key[:2], f"{key}.{extension}")
+
+    def contains(self, key, extension):
+        """Return True when an entry exists for key and extension."""
+        return os.path.exists(self.path(key, extension))
+
+    def fetch(self, key, extension, dest):
+        """
+        Place the cached file for key at dest.
+        Returns True on a hit, False when the entry is missing.
+        """
+        cached_path = self.path(key, extension)
+        try:
+            os.utime(cached_path)  # Mark as recently used
+        except FileNotFoundError:
+            return False
+        _materialize(cached_path, dest)
+        return True
+
+    def store(self, key, extension, source):
+        """Copy a freshly rendered file into the cache. Call evict() once a batch is stored."""
+        cached_path = self.path(key, extension)
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cached_path), suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(source, temp_path)
+            os.chmod(temp_path, 0o644)  # mkstemp creates owner-only files
+            os.replace(temp_path, cached_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                file_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, file_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            print(f"Evicted {removed} entries from render cache {self.directory}")
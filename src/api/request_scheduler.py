@@ -0,0 +1,230 @@
+# Quota-aware scheduling of Google API calls.
+# Sheets reads, Sheets writes and Drive calls each draw from their own token bucket,
+# sized to the published per-user quotas, so every thread shares one request budget.
+# Throttled (429, Drive's 403 rate limit) and 5xx responses are retried after the
+# server's Retry-After or an exponential backoff, and pause the whole bucket meanwhile.
+# Blocking calls (googleapiclient) and coroutines (async_clients) share the same buckets.
+import asyncio
+import os
+import random
+import socket
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+
+from run_metrics import metrics
+
+# Requests per minute per bucket; the defaults are the published per-user quotas
+# (Sheets: 60 reads and 60 writes per minute; Drive: 12,000 queries per minute).
+SHEETS_READS_PER_MINUTE = float(os.environ.get('RADAR_SHEETS_READS_PER_MINUTE', 60))
+SHEETS_WRITES_PER_MINUTE = float(os.environ.get('RADAR_SHEETS_WRITES_PER_MINUTE', 60))
+DRIVE_REQUESTS_PER_MINUTE = float(os.environ.get('RADAR_DRIVE_REQUESTS_PER_MINUTE', 12000))
+
+# Share of a minute's quota that may be sent at once before pacing starts
+BURST_FRACTION = 0.1
+
+MAX_RETRIES = int(os.environ.get('RADAR_MAX_RETRIES', 8))
+MAX_BACKOFF = 64  # seconds
+
+SHEETS_READ = 'sheets_read'
+SHEETS_WRITE = 'sheets_write'
+DRIVE = 'drive'
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+# Sheets methods that only read; every other Sheets method counts as a write
+_SHEETS_READ_METHODS = {
+    'sheets.spreadsheets.get',
+    'sheets.spreadsheets.getByDataFilter',
+    'sheets.spreadsheets.values.get',
+    'sheets.spreadsheets.values.batchGet',
+    'sheets.spreadsheets.values.batchGetByDataFilter',
+    'sheets.spreadsheets.developerMetadata.get',
+    'sheets.spreadsheets.developerMetadata.search',
+}
+
+
+def bucket_for(method_id):
+    """Return the bucket name for a discovery method ID such as 'drive.files.list'."""
+    if method_id and method_id.startswith('sheets.'):
+        return SHEETS_READ if method_id in _SHEETS_READ_METHODS else SHEETS_WRITE
+    return DRIVE
+
+def _error_reason(error):
+    try:
+        return error.error_details[0].get('reason')
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return None
+
+def is_retryable(error):
+    """Return True for throttling, 5xx and dropped-connection errors."""
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        return status in RETRY_STATUSES or (status == 403 and _error_reason(error) in RATE_LIMIT_REASONS)
+    return isinstance(error, (ConnectionError, socket.timeout, TimeoutError))
+
+def is_throttled(error):
+    """Return True when the server asked us to slow down (as opposed to failing)."""
+    return isinstance(error, HttpError) and (
+        error.resp.status == 429 or (error.resp.status == 403 and _error_reason(error) in RATE_LIMIT_REASONS)
+    )
+
+def retry_after(error):
+    """Return the Retry-After delay in seconds of an HttpError, or None."""
+    resp = getattr(error, 'resp', None)
+    value = resp.get('retry-after') if resp is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None  # An HTTP date; fall back to exponential backoff
+
+def backoff_delay(attempt, error=None):
+    """Seconds to wait before retry number attempt (1-based): Retry-After, else 2^n plus jitter."""
+    delay = retry_after(error) if error is not None else None
+    if delay is None:
+        delay = min(MAX_BACKOFF, 2 ** (attempt - 1) + random.random())
+    return delay
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at rate_per_minute, holding at most burst tokens.
+    - burst: Defaults to BURST_FRACTION of a minute's quota (at least 1).
+    """
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1.0, rate_per_minute * BURST_FRACTION))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Spend tokens if the bucket allows it now and return 0; otherwise return the
+        seconds to wait before trying again.
+        Requests larger than the bucket (e.g. a 100-call batch) wait for a full bucket
+        and leave it in debt, so the average rate still holds.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            needed = min(tokens, self.capacity)
+            wait = max(self.paused_until - now, 0.0)
+            if not wait:
+                if self.tokens >= needed:
+                    self.tokens -= tokens
+                    return 0.0
+                wait = (needed - self.tokens) / self.rate
+            return wait
+
+    def acquire(self, tokens=1):
+        """Block until tokens can be spent and return the seconds waited."""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, tokens=1):
+        """acquire() for coroutines: waits without blocking the event loop."""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds):
+        """Stop handing out tokens for seconds (after a throttling response)."""
+        with self.lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+
+
+class RequestScheduler:
+    """
+    Paces and retries Google API calls across threads.
+    - rates: {bucket name: requests per minute}; defaults to the published quotas.
+    - max_retries: Retries per call after a retryable error.
+    """
+
+    def __init__(self, rates=None, max_retries=MAX_RETRIES):
+        rates = rates or {
+            SHEETS_READ: SHEETS_READS_PER_MINUTE,
+            SHEETS_WRITE: SHEETS_WRITES_PER_MINUTE,
+            DRIVE: DRIVE_REQUESTS_PER_MINUTE,
+        }
+        self.buckets = {name: TokenBucket(rate) for name, rate in rates.items()}
+        self.max_retries = max_retries
+
+    def acquire(self, method_id, tokens=1):
+        """Wait for quota for tokens calls of method_id."""
+        waited = self.buckets[bucket_for(method_id)].acquire(tokens)
+        if waited:
+            metrics.add('throttle_seconds', waited)
+
+    async def acquire_async(self, method_id, tokens=1):
+        """acquire() for coroutines."""
+        waited = await self.buckets[bucket_for(method_id)].acquire_async(tokens)
+        if waited:
+            metrics.add('throttle_seconds', waited)
+
+    def _retry_delay(self, method_id, attempt, error):
+        """Record a retry and return its delay; throttling pauses the method's whole bucket."""
+        delay = backoff_delay(attempt, error)
+        metrics.record_retry(method_id)
+        if is_throttled(error):
+            self.buckets[bucket_for(method_id)].pause(delay)
+        print(f"{method_id} failed ({getattr(getattr(error, 'resp', None), 'status', error)}); "
+              f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def backoff(self, method_id, attempt, error):
+        """Record a retry and wait before it."""
+        time.sleep(self._retry_delay(method_id, attempt, error))
+
+    def call(self, method_id, send):
+        """
+        Run send() for method_id within quota, retrying retryable errors.
+        Raises the last error when it is not retryable or retries run out.
+        """
+        attempt = 0
+        while True:
+            self.acquire(method_id)
+            try:
+                return send()
+            except Exception as e:
+                attempt += 1
+                if not is_retryable(e) or attempt > self.max_retries:
+                    raise
+                self.backoff(method_id, attempt, e)
+
+    async def call_async(self, method_id, send):
+        """call() for coroutines: send is a coroutine function, awaited once per attempt."""
+        attempt = 0
+        while True:
+            await self.acquire_async(method_id)
+            try:
+                return await send()
+            except Exception as e:
+                attempt += 1
+                if not is_retryable(e) or attempt > self.max_retries:
+                    raise
+                await asyncio.sleep(self._retry_delay(method_id, attempt, e))
+
+
+# Process-wide scheduler shared by every thread's API clients.
+scheduler = RequestScheduler()
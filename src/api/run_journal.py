@@ -0,0 +1,134 @@
+# Append-only journal of completed run steps.
+# Each (sheet, company) step a run finishes (rendered, uploaded, shared, formula
+# written, resized) is appended as one JSON line, so a run that dies halfway can be
+# resumed without rendering, uploading or writing the finished steps again.
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+# One journal file per spreadsheet. Override with RADAR_JOURNAL_DIR.
+JOURNAL_DIR = os.environ.get(
+    'RADAR_JOURNAL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'journals')
+)
+
+RENDERED = 'rendered'
+UPLOADED = 'uploaded'
+SHARED = 'shared'
+WRITTEN = 'written'
+RESIZED = 'resized'
+STEPS = (RENDERED, UPLOADED, SHARED, WRITTEN, RESIZED)
+
+# Steps tied to the target cell; they must be redone when the company's row moved
+CELL_STEPS = (WRITTEN, RESIZED)
+
+RUN_STARTED = 'run_started'
+RUN_FINISHED = 'run_finished'
+
+
+def journal_path(spreadsheet_id, directory=JOURNAL_DIR):
+    return os.path.join(directory, f"{spreadsheet_id}.jsonl")
+
+def read_journal(path):
+    """
+    Return the records of a journal file, oldest first ([] when it does not exist).
+    A line cut short by a crash mid-write is ignored.
+    """
+    records = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
+
+def unfinished_steps(records):
+    """
+    Return {(sheet, company): {step: record}} for the steps recorded since the last run
+    that finished cleanly. Later records of a step replace earlier ones.
+    """
+    steps = {}
+    for record in records:
+        if record.get('event') == RUN_FINISHED and record.get('clean'):
+            steps = {}
+        elif record.get('step') in STEPS:
+            steps.setdefault((record['sheet'], record['company']), {})[record['step']] = record
+    return steps
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class RunJournal:
+    """
+    Step journal of one spreadsheet's run. Safe to share between pipeline threads.
+    - spreadsheet_id: Spreadsheet the run processes; names the journal file.
+    - resume: Keep the steps of the previous run if it did not finish cleanly, so
+      completed() reports them. Otherwise the journal starts empty.
+    - directory: Directory for the journal files.
+    Every record is flushed as soon as it is written; call finish() at the end of a run.
+    """
+
+    def __init__(self, spreadsheet_id, resume=False, directory=JOURNAL_DIR):
+        self.spreadsheet_id = spreadsheet_id
+        self.path = journal_path(spreadsheet_id, directory)
+        self.lock = threading.Lock()
+        self.steps = unfinished_steps(read_journal(self.path)) if resume else {}
+        if resume:
+            if self.steps:
+                print(f"Resuming {spreadsheet_id}: {len(self.steps)} companies have completed steps.")
+            else:
+                print(f"Nothing to resume for {spreadsheet_id}; the last run finished cleanly.")
+        os.makedirs(directory, exist_ok=True)
+        # Append to an interrupted run's journal; start a fresh file otherwise
+        self.file = open(self.path, 'a' if self.steps else 'w', encoding='utf-8')
+        self._append({'event': RUN_STARTED, 'resume': resume})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _append(self, record):
+        record['time'] = _now()
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def record(self, step, sheet_name, company_name, fingerprint, cell, **details):
+        """
+        Append a completed step.
+        - fingerprint, cell: The group's row fingerprint and target cell, which decide
+          whether the step still holds when the run is resumed.
+        - details: Step data such as file_id and status for UPLOADED.
+        """
+        self._append({'step': step, 'sheet': sheet_name, 'company': company_name,
+                      'fingerprint': fingerprint, 'cell': cell, **details})
+
+    def completed(self, sheet_name, company_name, fingerprint, cell):
+        """
+        Return {step: record} of the previous run's steps that still hold for the group:
+        its rows must be unchanged, and for WRITTEN and RESIZED its target cell too.
+        """
+        steps = self.steps.get((sheet_name, company_name), {})
+        return {
+            step: record for step, record in steps.items()
+            if record.get('fingerprint') == fingerprint and (step not in CELL_STEPS or record.get('cell') == cell)
+        }
+
+    def finish(self, clean):
+        """Mark the end of the run; a clean finish means the next --resume has nothing to do."""
+        self._append({'event': RUN_FINISHED, 'clean': bool(clean)})
+        self.close()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                os.fsync(self.file.fileno())
+                self.file.close()
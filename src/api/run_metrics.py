@@ -0,0 +1,273 @@
+# Run instrumentation.
+# Records wall time per pipeline stage and per (spreadsheet, sheet, company), Google API calls by
+# method and outcome, retries and uploaded bytes, plus optional cProfile and
+# tracemalloc captures. Reports are written as JSON and as a Prometheus textfile.
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+# Default report paths; main_script's --report/--prometheus flags override them.
+METRICS_REPORT = os.environ.get('RADAR_METRICS_REPORT')
+METRICS_PROMETHEUS = os.environ.get('RADAR_METRICS_PROMETHEUS')
+
+PROFILE_TOP = 25       # Functions listed in the JSON report from a cProfile capture
+TRACEMALLOC_TOP = 15   # Allocation sites listed from a tracemalloc snapshot
+PROMETHEUS_PREFIX = 'radarsheets'
+
+
+def _write_atomic(path, text):
+    """Write text to path through a temporary file, so readers never see half a report."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_label_value(value)}"' for name, value in labels.items()) + '}'
+
+
+class RunMetrics:
+    """
+    Thread-safe counters and timers for one run.
+    - profile: Capture a cProfile of every instrumented stage thread.
+    - trace_memory: Track allocations with tracemalloc between start() and finish().
+    """
+
+    def __init__(self, profile=False, trace_memory=False):
+        self.lock = threading.Lock()
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.reset()
+
+    def reset(self):
+        """Clear everything recorded so far."""
+        with self.lock:
+            self.started_at = None
+            self.start_time = None
+            self.total_seconds = None
+            self.stage_seconds = {}
+            self.item_seconds = defaultdict(dict)  # {stage: {(spreadsheet, sheet, company): seconds}}
+            self.api_calls = Counter()             # {(method ID, outcome): calls}
+            self.api_seconds = Counter()           # {method ID: seconds}
+            self.retries = Counter()               # {method ID: retries}
+            self.counters = Counter()              # Free-form totals, e.g. upload_bytes
+            self.labels = {}
+            self.profiles = []
+            self.memory = None
+
+    # Run lifecycle
+    def start(self, **labels):
+        """Mark the start of a run; labels (e.g. spreadsheet_id) are copied into reports."""
+        with self.lock:
+            self.started_at = time.time()
+            self.start_time = time.perf_counter()
+            self.labels.update(labels)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def finish(self):
+        """Mark the end of a run and take the tracemalloc snapshot, if enabled."""
+        if self.start_time is not None:
+            self.total_seconds = time.perf_counter() - self.start_time
+        if self.trace_memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.memory = {
+                'current_bytes': current,
+                'peak_bytes': peak,
+                'top': [
+                    {'location': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+                    for stat in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]
+                ],
+            }
+
+    # Recording
+    @contextmanager
+    def stage(self, name):
+        """Time a block and add it to the stage's wall time."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.perf_counter() - start)
+
+    def add_stage_time(self, name, seconds):
+        with self.lock:
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+
+    def run_profiled(self, target):
+        """Run target(), under cProfile when profiling is enabled (one profile per call)."""
+        if not self.profile:
+            return target()
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(target)
+        finally:
+            with self.lock:
+                self.profiles.append(profiler)
+
+    def record_item(self, stage, spreadsheet_id, sheet_name, company_name, seconds):
+        """
+        Record the wall time one (sheet, company) spent in a stage. The spreadsheet is part
+        of the key, so workbooks with the same tab and company names keep their own timings.
+        """
+        with self.lock:
+            self.item_seconds[stage][(spreadsheet_id, sheet_name, company_name)] = seconds
+
+    def record_call(self, method_id, outcome, seconds=0.0):
+        """
+        Count one Google API call.
+        - method_id: Discovery method ID, e.g. 'drive.files.list'.
+        - outcome: 'ok', an HTTP status code for errors, or 'error' for transport failures.
+        """
+        with self.lock:
+            self.api_calls[(method_id, str(outcome))] += 1
+            self.api_seconds[method_id] += seconds
+
+    def record_retry(self, method_id):
+        with self.lock:
+            self.retries[method_id] += 1
+
+    def add(self, counter, amount=1):
+        """Add to a free-form counter such as 'upload_bytes'."""
+        with self.lock:
+            self.counters[counter] += amount
+
+    # Reports
+    def _merged_profile(self):
+        """Return one pstats.Stats for every captured profile, or None."""
+        if not self.profiles:
+            return None
+        stats = pstats.Stats(self.profiles[0], stream=io.StringIO())
+        for profiler in self.profiles[1:]:
+            stats.add(profiler)
+        return stats
+
+    def _profile_summary(self):
+        stats = self._merged_profile()
+        if stats is None:
+            return None
+        top = []
+        for (file_name, line, function), (_, calls, own, cumulative, _) in sorted(
+                stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]:
+            top.append({'function': f"{file_name}:{line}({function})", 'calls': calls,
+                        'own_seconds': round(own, 6), 'cumulative_seconds': round(cumulative, 6)})
+        return top
+
+    def write_profile(self, path):
+        """Write the merged cProfile data of every stage as a pstats file (for snakeviz, pstats)."""
+        stats = self._merged_profile()
+        if stats is None:
+            return None
+        stats.dump_stats(path)
+        print(f"Profile saved: {path}")
+        return path
+
+    def report(self):
+        """Return everything recorded as a JSON-serializable dict."""
+        with self.lock:
+            items = {}
+            for stage, timings in self.item_seconds.items():
+                values = sorted(timings.values())
+                slowest = sorted(timings.items(), key=lambda item: item[1], reverse=True)[:10]
+                items[stage] = {
+                    'count': len(values),
+                    'total_seconds': round(sum(values), 6),
+                    'max_seconds': round(values[-1], 6) if values else 0.0,
+                    'p50_seconds': round(values[len(values) // 2], 6) if values else 0.0,
+                    'p95_seconds': round(values[min(len(values) - 1, int(len(values) * 0.95))], 6) if values else 0.0,
+                    'slowest': [{'spreadsheet': spreadsheet_id, 'sheet': sheet, 'company': company,
+                                 'seconds': round(seconds, 6)}
+                                for (spreadsheet_id, sheet, company), seconds in slowest],
+                }
+            calls = defaultdict(dict)
+            for (method_id, outcome), count in sorted(self.api_calls.items()):
+                calls[method_id][outcome] = count
+            report = {
+                'labels': dict(self.labels),
+                'started_at': self.started_at,
+                'total_seconds': self.total_seconds,
+                'stage_seconds': {name: round(seconds, 6) for name, seconds in self.stage_seconds.items()},
+                'items': items,
+                'api_calls': dict(calls),
+                'api_calls_total': sum(self.api_calls.values()),
+                'api_seconds': {method_id: round(seconds, 6) for method_id, seconds in self.api_seconds.items()},
+                'retries': dict(self.retries),
+                'counters': dict(self.counters),
+            }
+        profile = self._profile_summary()
+        if profile is not None:
+            report['profile_top'] = profile
+        if self.memory is not None:
+            report['memory'] = self.memory
+        return report
+
+    def write_json(self, path, extra=None):
+        """Write the JSON run report; extra (e.g. the pipeline summary) is merged in."""
+        report = self.report()
+        if extra:
+            report.update(extra)
+        _write_atomic(path, json.dumps(report, indent=2, default=str))
+        print(f"Run report saved: {path}")
+        return path
+
+    def prometheus_text(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        report = self.report()
+        labels = {name: value for name, value in report['labels'].items() if value is not None}
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} {kind}")
+            for sample_labels, value in samples:
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}{_labels(**labels, **sample_labels)} {value}")
+
+        metric('run_timestamp_seconds', 'gauge', 'Unix time the run started.',
+               [({}, report['started_at'] or 0)])
+        metric('run_duration_seconds', 'gauge', 'Wall time of the whole run.',
+               [({}, round(report['total_seconds'] or 0.0, 6))])
+        metric('stage_seconds', 'gauge', 'Wall time per pipeline stage.',
+               [({'stage': stage}, seconds) for stage, seconds in report['stage_seconds'].items()])
+        metric('items_total', 'gauge', 'Companies processed per stage.',
+               [({'stage': stage}, item['count']) for stage, item in report['items'].items()])
+        metric('item_seconds_max', 'gauge', 'Slowest company per stage.',
+               [({'stage': stage}, item['max_seconds']) for stage, item in report['items'].items()])
+        metric('item_seconds_p95', 'gauge', '95th percentile time per company and stage.',
+               [({'stage': stage}, item['p95_seconds']) for stage, item in report['items'].items()])
+        metric('api_requests_total', 'counter', 'Google API calls by method and outcome.',
+               [({'api': method_id.split('.', 1)[0], 'method': method_id, 'outcome': outcome}, count)
+                for method_id, outcomes in report['api_calls'].items() for outcome, count in outcomes.items()])
+        metric('api_retries_total', 'counter', 'Retried Google API calls by method.',
+               [({'method': method_id}, count) for method_id, count in report['retries'].items()])
+        metric('upload_bytes_total', 'counter', 'Bytes uploaded to Drive.',
+               [({}, report['counters'].get('upload_bytes', 0))])
+        if 'memory' in report:
+            metric('memory_peak_bytes', 'gauge', 'Peak traced Python memory.',
+                   [({}, report['memory']['peak_bytes'])])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write a Prometheus textfile (for node_exporter's textfile collector)."""
+        _write_atomic(path, self.prometheus_text())
+        print(f"Prometheus metrics saved: {path}")
+        return path
+
+
+# Process-wide metrics used by the API clients, uploads and pipeline.
+metrics = RunMetrics()
@@ -0,0 +1,19 @@
+# Run configuration shared by the entry points.
+# Imports only the standard library, so the CLI can read it without loading the Google
+# client libraries, plotly or NumPy.
+import re
+
+# Google API setup
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+SPREADSHEET_ID = '1byKP-xqB3mmTncWTefvyUVMwHjaAlT4XienGR3Lj7tY'
+SERVICE_ACCOUNT_FILE = 'C:\\Users\\mattc\\OneDrive\\Desktop\\Code\\RadarSheets\\src\\api\\service_account.json'
+RADAR_PLOTS_DIR = 'C:\\Users\\mattc\\OneDrive\\Desktop\\Code\\RadarSheets\\radar_plots'
+HTTP_TIMEOUT = 120  # seconds, for every Google API and token request
+
+_SPREADSHEET_URL = re.compile(r'/spreadsheets/d/([A-Za-z0-9_-]+)')
+
+
+def spreadsheet_id_from(value):
+    """Return the spreadsheet ID of an ID or a docs.google.com spreadsheet URL."""
+    match = _SPREADSHEET_URL.search(value)
+    return match.group(1) if match else value.strip()
@@ -0,0 +1,76 @@
+# In-memory snapshot of a spreadsheet.
+# One field-masked spreadsheets.get for the sheet metadata and one values.batchGet
+# for every tab, so the rest of a run reads from memory instead of the API.
+from sheet_writes import a1_range, quote_sheet_name
+
+SHEET_FIELDS = 'sheets.properties(sheetId,title,index,gridProperties)'
+
+
+class SpreadsheetSnapshot:
+    """
+    Sheet metadata and cell values for every tab of one spreadsheet.
+    - spreadsheet_id: ID of the spreadsheet the snapshot was taken from.
+    - sheet_properties: List of sheet property dicts, in tab order.
+    - sheet_values: Dict of {sheet title: list of rows}.
+    """
+
+    def __init__(self, spreadsheet_id, sheet_properties, sheet_values):
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_properties = sheet_properties
+        self.sheet_values = sheet_values
+
+    @classmethod
+    def load_metadata(cls, sheets_service, spreadsheet_id):
+        """Fetch only the sheet metadata (one API call); values() is empty for every tab."""
+        sheet_metadata = sheets_service.spreadsheets().get(
+            spreadsheetId=spreadsheet_id, fields=SHEET_FIELDS
+        ).execute()
+        return cls(spreadsheet_id, [sheet['properties'] for sheet in sheet_metadata.get('sheets', [])], {})
+
+    @classmethod
+    def load(cls, sheets_service, spreadsheet_id, cells='A1:Z'):
+        """
+        Fetch metadata and values for every tab in two API calls.
+        - cells: A1 cell range read from each tab, or None for the whole tab.
+        """
+        sheet_metadata = sheets_service.spreadsheets().get(
+            spreadsheetId=spreadsheet_id, fields=SHEET_FIELDS
+        ).execute()
+        sheet_properties = [sheet['properties'] for sheet in sheet_metadata.get('sheets', [])]
+        titles = [properties['title'] for properties in sheet_properties]
+
+        sheet_values = {}
+        if titles:
+            ranges = [a1_range(title, cells) if cells else quote_sheet_name(title) for title in titles]
+            result = sheets_service.spreadsheets().values().batchGet(
+                spreadsheetId=spreadsheet_id, ranges=ranges
+            ).execute()
+            # valueRanges come back in the same order as the requested ranges
+            for title, value_range in zip(titles, result.get('valueRanges', [])):
+                sheet_values[title] = value_range.get('values', [])
+
+        print(f"Loaded snapshot of {len(titles)} sheets from spreadsheet {spreadsheet_id}.")
+        return cls(spreadsheet_id, sheet_properties, sheet_values)
+
+    def sheet_names(self):
+        """Return all sheet titles in tab order."""
+        return [properties['title'] for properties in self.sheet_properties]
+
+    def sheet_ids(self):
+        """Return a dict of {sheet title: sheetId}."""
+        return {properties['title']: properties['sheetId'] for properties in self.sheet_properties}
+
+    def sheet_id(self, sheet_name):
+        """Return the sheetId for a title, or None when the sheet does not exist."""
+        return self.sheet_ids().get(sheet_name)
+
+    def properties(self, sheet_name):
+        """Return the properties dict for a title, or None when the sheet does not exist."""
+        for properties in self.sheet_properties:
+            if properties['title'] == sheet_name:
+                return properties
+        return None
+
+    def values(self, sheet_name):
+        """Return the rows read for a sheet (empty list when the sheet has no data)."""
+        return self.sheet_values.get(sheet_name, [])
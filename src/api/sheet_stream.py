@@ -0,0 +1,124 @@
+# Streaming reader for evaluation tabs.
+# Reads only columns A-H as unformatted values, in row-chunked values.batchGet pages
+# that cover several tabs at once, and yields each company's group as soon as the
+# pages have passed the company's last row. Memory stays bounded by one page plus
+# the companies still open, however many rows a tab holds.
+import os
+
+from data_cleaner import clean_text
+from ingest import ROW_WIDTH, CompanyGroup, company_groups, ingest_rows, tab_categories
+from sheet_writes import a1_range, column_letter
+
+# Rows fetched per values.batchGet, shared between the tabs still being read.
+# Override with RADAR_READ_PAGE_ROWS.
+PAGE_ROWS = int(os.environ.get('RADAR_READ_PAGE_ROWS', 10000))
+MIN_CHUNK_ROWS = 100  # Smallest per-tab chunk when many tabs share a page
+
+FIRST_COLUMN = 'A'
+LAST_COLUMN = column_letter(ROW_WIDTH - 1)  # H
+
+
+def batch_get(sheets_service, spreadsheet_id, ranges):
+    """Fetch ranges as unformatted values (numbers stay numbers) and return their rows."""
+    result = sheets_service.spreadsheets().values().batchGet(
+        spreadsheetId=spreadsheet_id,
+        ranges=ranges,
+        valueRenderOption='UNFORMATTED_VALUE',
+        majorDimension='ROWS'
+    ).execute()
+    # valueRanges come back in the same order as the requested ranges
+    return [value_range.get('values', []) for value_range in result.get('valueRanges', [])]
+
+def iter_pages(sheets_service, spreadsheet_id, row_counts, first_column, last_column, page_rows=PAGE_ROWS,
+               skip=None):
+    """
+    Yield pages of [(title, start_row, end_row, rows)], one values.batchGet each.
+    - row_counts: Dict of {title: rows to read}, in tab order.
+    - page_rows: Rows per page, split evenly between the tabs not finished yet.
+    - skip: Optional set of titles to stop reading; checked before every page.
+    start_row and end_row are the zero-based, half-open rows requested; rows can be
+    shorter because the API trims trailing empty rows.
+    """
+    starts = {title: 0 for title in row_counts}
+    while True:
+        titles = [title for title, start in starts.items()
+                  if start < row_counts[title] and not (skip and title in skip)]
+        if not titles:
+            return
+        chunk_rows = max(MIN_CHUNK_ROWS, page_rows // len(titles))
+        spans = [(title, starts[title], min(starts[title] + chunk_rows, row_counts[title])) for title in titles]
+        ranges = [a1_range(title, f"{first_column}{start + 1}:{last_column}{end}") for title, start, end in spans]
+        page = batch_get(sheets_service, spreadsheet_id, ranges)
+        for title, _, end in spans:
+            starts[title] = end
+        yield [(title, start, end, rows) for (title, start, end), rows in zip(spans, page)]
+
+def company_last_rows(sheets_service, spreadsheet_id, row_counts, page_rows=PAGE_ROWS, clean_names=False):
+    """
+    Read column A only and return {title: {company name: zero-based last row}}.
+    Column A is one cell per row, so its pages hold ROW_WIDTH times as many rows.
+    - clean_names: Key the companies by their clean_text names, as a DataCleaner stores them.
+    """
+    last_rows = {title: {} for title in row_counts}
+    for page in iter_pages(sheets_service, spreadsheet_id, row_counts, FIRST_COLUMN, FIRST_COLUMN,
+                           page_rows * ROW_WIDTH):
+        for title, start, _, rows in page:
+            companies = last_rows[title]
+            for offset, row in enumerate(rows, start):
+                if not offset or not row:
+                    continue
+                name = clean_text(row[0]) if clean_names else row[0]
+                if name not in ('', None):
+                    companies[str(name)] = offset
+    return last_rows
+
+def stream_company_groups(sheets_service, spreadsheet_id, sheet_properties, page_rows=PAGE_ROWS,
+                          invalid_sheets=None, cleaner=None):
+    """
+    Yield a CompanyGroup for every company of every tab, reading the tabs in pages.
+    - sheet_properties: List of sheet property dicts (title, gridProperties), in tab order.
+    - invalid_sheets: Optional list; titles whose header is not the expected layout are appended.
+    - cleaner: Optional DataCleaner applied to every page as it arrives (see data_cleaner.py).
+    Groups with no valid rows are yielded too (valid_rows is empty). A group is yielded
+    once every row up to the company's last name in column A has been read, so the
+    first groups are ready long before the last page arrives. Rows after a tab's last
+    company name are not read.
+    """
+    grid_rows = {
+        properties['title']: properties.get('gridProperties', {}).get('rowCount', 0)
+        for properties in sheet_properties
+    }
+    last_rows = company_last_rows(sheets_service, spreadsheet_id, grid_rows, page_rows, cleaner is not None)
+    # Header plus every row up to the last company name
+    row_counts = {title: max(companies.values(), default=0) + 1 for title, companies in last_rows.items()}
+
+    categories = {}   # {title: categories}, set once the header is read
+    open_groups = {}  # {title: {company: [first_row, valid_rows]}}, in order of first appearance
+    skipped = set()
+    for page in iter_pages(sheets_service, spreadsheet_id, row_counts, FIRST_COLUMN, LAST_COLUMN, page_rows,
+                           skip=skipped):
+        for title, start, end, rows in page:
+            if start == 0:
+                categories[title] = tab_categories(rows[0] if rows else None)
+                if categories[title] is None:
+                    if invalid_sheets is not None:
+                        invalid_sheets.append(title)
+                    skipped.add(title)
+                    continue
+                rows = rows[1:]
+                start = 1
+
+            groups = open_groups.setdefault(title, {})
+            frame = ingest_rows(rows, categories[title], first_row=start, cleaner=cleaner, sheet_name=title)
+            for company_name, first_row, valid_rows in company_groups(frame):
+                group = groups.setdefault(company_name, [first_row, []])
+                group[1].extend(valid_rows)
+
+            # Companies whose last row has been read are complete
+            finished = end >= row_counts[title]
+            if finished and cleaner is not None:
+                cleaner.finish_sheet(title)
+            company_ends = last_rows[title]
+            for company_name in [name for name in groups if finished or company_ends.get(name, -1) < end]:
+                first_row, valid_rows = groups.pop(company_name)
+                yield CompanyGroup(title, company_name, first_row, categories[title], valid_rows)
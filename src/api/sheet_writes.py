@@ -0,0 +1,135 @@
+# Write accumulator for Google Sheets.
+# Collects IMAGE formulas and row/column resizes during a run and sends them as
+# one values.batchUpdate plus one spreadsheets.batchUpdate per spreadsheet.
+
+
+def column_letter(column):
+    """Convert a zero-based column index to its A1 letter (0 -> A, 26 -> AA)."""
+    letters = ''
+    column += 1
+    while column > 0:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def quote_sheet_name(sheet_name):
+    """Quote a sheet title for A1 notation so spaces and apostrophes are safe."""
+    return "'{}'".format(sheet_name.replace("'", "''"))
+
+def a1_range(sheet_name, cells):
+    """Build an A1 range such as 'Sheet 1'!K2."""
+    return f"{quote_sheet_name(sheet_name)}!{cells}"
+
+def merge_indices(indices):
+    """
+    Merge zero-based indices into half-open (start, end) ranges.
+    - indices: Iterable of row or column indices, in any order, duplicates allowed.
+    """
+    ranges = []
+    for index in sorted(set(indices)):
+        if ranges and ranges[-1][1] == index:
+            ranges[-1][1] = index + 1
+        else:
+            ranges.append([index, index + 1])
+    return [tuple(r) for r in ranges]
+
+
+class SheetWriteBatch:
+    """
+    Accumulates IMAGE formula inserts and cell resizes for one spreadsheet.
+    Nothing is sent until flush_values() and flush_resizes() are called; the pipeline
+    journals the formulas and the resizes as separate steps.
+    """
+
+    def __init__(self, spreadsheet_id):
+        self.spreadsheet_id = spreadsheet_id
+        self.value_updates = []  # [(sheet_name, row, column, formula)]
+        self.dimensions = {}     # {(sheet_name, 'ROWS'|'COLUMNS', pixel_size): set(indices)}
+
+    def add_image(self, sheet_name, row, column, image_url, width=300, height=300):
+        """Queue an IMAGE formula for the cell at (row, column), both zero-based."""
+        image_formula = f'=IMAGE("{image_url}", 4, {width}, {height})'
+        self.value_updates.append((sheet_name, row, column, image_formula))
+
+    def add_resize(self, sheet_name, row, column, row_height=300, column_width=300):
+        """Queue a row height and column width change for the cell at (row, column)."""
+        self.dimensions.setdefault((sheet_name, 'ROWS', row_height), set()).add(row)
+        self.dimensions.setdefault((sheet_name, 'COLUMNS', column_width), set()).add(column)
+
+    def __len__(self):
+        return len(self.value_updates) + len(self.dimensions)
+
+    def value_data(self):
+        """Return the data list for a values.batchUpdate request."""
+        return [
+            {"range": a1_range(sheet_name, f"{column_letter(column)}{row + 1}"), "values": [[formula]]}
+            for sheet_name, row, column, formula in self.value_updates
+        ]
+
+    def dimension_requests(self, sheet_ids):
+        """
+        Build updateDimensionProperties requests, merging adjacent rows/columns into ranges.
+        - sheet_ids: Dict of {sheet title: sheetId}.
+        """
+        requests = []
+        for (sheet_name, dimension, pixel_size), indices in sorted(self.dimensions.items()):
+            sheet_id = sheet_ids.get(sheet_name)
+            if sheet_id is None:
+                print(f"Sheet {sheet_name} not found.")
+                continue
+            for start, end in merge_indices(indices):
+                requests.append({
+                    "updateDimensionProperties": {
+                        "range": {
+                            "sheetId": sheet_id,
+                            "dimension": dimension,
+                            "startIndex": start,
+                            "endIndex": end
+                        },
+                        "properties": {"pixelSize": pixel_size},
+                        "fields": "pixelSize"
+                    }
+                })
+        return requests
+
+    def flush_values(self, sheets_service):
+        """Send the queued IMAGE formulas in one values.batchUpdate. Returns the requests sent."""
+        if not self.value_updates:
+            return 0
+        sheets_service.spreadsheets().values().batchUpdate(
+            spreadsheetId=self.spreadsheet_id,
+            body={"valueInputOption": "USER_ENTERED", "data": self.value_data()}
+        ).execute()
+        print(f"Inserted {len(self.value_updates)} images in one batch write.")
+        self.value_updates = []
+        return 1
+
+    def flush_resizes(self, sheets_service, sheet_ids=None):
+        """
+        Send the queued resizes in one spreadsheets.batchUpdate. Returns the requests sent.
+        - sheet_ids: Optional dict of {sheet title: sheetId}. Fetched with a field-masked
+          spreadsheets.get when not provided.
+        """
+        if not self.dimensions:
+            return 0
+        calls = 0
+        if sheet_ids is None:
+            sheet_metadata = sheets_service.spreadsheets().get(
+                spreadsheetId=self.spreadsheet_id, fields='sheets.properties(sheetId,title)'
+            ).execute()
+            calls += 1
+            sheet_ids = {
+                sheet['properties']['title']: sheet['properties']['sheetId']
+                for sheet in sheet_metadata.get('sheets', [])
+            }
+        requests = self.dimension_requests(sheet_ids)
+        if requests:
+            sheets_service.spreadsheets().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={"requests": requests}
+            ).execute()
+            calls += 1
+            print(f"Applied {len(requests)} row/column resizes in one batch update.")
+        self.dimensions = {}
+        return calls
+
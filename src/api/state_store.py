@@ -0,0 +1,202 @@
+# Local SQLite store of what earlier runs published.
+# Keeps a fingerprint of each (sheet, company) group's rows together with its Drive
+# file ID and target cell, plus the spreadsheet's Drive modifiedTime, so incremental
+# runs only redo the groups that changed, and the Drive files already made public.
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from sheet_writes import column_letter
+
+STATE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'radarsheets_state.db')
+
+
+def group_fingerprint(categories, valid_rows, profile=None, mean_overlay=False):
+    """
+    Hash a group's categories and (Evaluator, Lab, Values) rows.
+    - profile: OutputProfile the image is published with, so switching profiles republishes it.
+    - mean_overlay: Whether the image shows the mean trace; only hashed when set.
+    """
+    payload = {
+        'categories': [str(category) for category in categories],
+        'rows': [[str(evaluator), str(lab), [float(v) for v in values]] for evaluator, lab, values in valid_rows],
+    }
+    if profile is not None:
+        payload['profile'] = list(profile)
+    if mean_overlay:
+        payload['mean_overlay'] = True
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def settings_fingerprint(profile=None, mean_overlay=False, clean_data=True, summary_tab=''):
+    """
+    Hash the run settings that change what a run publishes, so an incremental run with
+    new settings is not skipped just because the spreadsheet itself is unchanged.
+    """
+    payload = {
+        'profile': list(profile) if profile is not None else None,
+        'mean_overlay': bool(mean_overlay),
+        'clean_data': bool(clean_data),
+        'summary_tab': summary_tab or '',
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def target_cell(row, column):
+    """Return the A1 cell (e.g. 'K2') for a zero-based row and column."""
+    return f"{column_letter(column)}{row + 1}"
+
+def spreadsheet_modified_time(drive_service, spreadsheet_id):
+    """Return the spreadsheet's Drive modifiedTime (an RFC 3339 string)."""
+    return drive_service.files().get(
+        fileId=spreadsheet_id, fields='modifiedTime', supportsAllDrives=True
+    ).execute().get('modifiedTime')
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class StateStore:
+    """
+    SQLite-backed record of published groups. Safe to share between pipeline threads.
+    - path: Database file, created on first use.
+    """
+
+    def __init__(self, path=STATE_DB):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS groups (
+                    spreadsheet_id TEXT NOT NULL,
+                    sheet_name TEXT NOT NULL,
+                    company_name TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    file_id TEXT,
+                    target_cell TEXT,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (spreadsheet_id, sheet_name, company_name)
+                )''')
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS spreadsheets (
+                    spreadsheet_id TEXT PRIMARY KEY,
+                    modified_time TEXT,
+                    checked_at TEXT NOT NULL,
+                    settings TEXT
+                )''')
+            columns = [row[1] for row in self.connection.execute('PRAGMA table_info(spreadsheets)')]
+            if 'settings' not in columns:
+                # Databases from before run settings were recorded
+                self.connection.execute('ALTER TABLE spreadsheets ADD COLUMN settings TEXT')
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS shared_files (
+                    file_id TEXT PRIMARY KEY,
+                    shared_at TEXT NOT NULL
+                )''')
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS summaries (
+                    spreadsheet_id TEXT NOT NULL,
+                    summary_tab TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (spreadsheet_id, summary_tab)
+                )''')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def group(self, spreadsheet_id, sheet_name, company_name):
+        """Return the stored (fingerprint, file_id, target_cell) for a group, or None."""
+        with self.lock:
+            return self.connection.execute(
+                'SELECT fingerprint, file_id, target_cell FROM groups '
+                'WHERE spreadsheet_id = ? AND sheet_name = ? AND company_name = ?',
+                (spreadsheet_id, sheet_name, company_name)
+            ).fetchone()
+
+    def is_current(self, spreadsheet_id, sheet_name, company_name, fingerprint, cell):
+        """Return True when the group was published with this fingerprint at this cell."""
+        stored = self.group(spreadsheet_id, sheet_name, company_name)
+        return stored is not None and stored[0] == fingerprint and stored[2] == cell
+
+    def record_group(self, spreadsheet_id, sheet_name, company_name, fingerprint, file_id, cell):
+        """Store the fingerprint, Drive file ID and target cell of a published group."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO groups '
+                '(spreadsheet_id, sheet_name, company_name, fingerprint, file_id, target_cell, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (spreadsheet_id, sheet_name, company_name, fingerprint, file_id, cell, _now())
+            )
+
+    def forget_group(self, spreadsheet_id, sheet_name, company_name):
+        """Drop a group so the next incremental run publishes it again."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM groups WHERE spreadsheet_id = ? AND sheet_name = ? AND company_name = ?',
+                (spreadsheet_id, sheet_name, company_name)
+            )
+
+    def is_shared(self, file_id):
+        """Return True when a Drive file was made public by an earlier run."""
+        with self.lock:
+            return self.connection.execute(
+                'SELECT 1 FROM shared_files WHERE file_id = ?', (file_id,)
+            ).fetchone() is not None
+
+    def record_shared(self, file_ids):
+        """Store that Drive files were made public. Kept when their group is forgotten."""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO shared_files (file_id, shared_at) VALUES (?, ?)',
+                [(file_id, _now()) for file_id in file_ids]
+            )
+
+    def modified_time(self, spreadsheet_id):
+        """Return the recorded (Drive modifiedTime, settings fingerprint) of a spreadsheet, or (None, None)."""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT modified_time, settings FROM spreadsheets WHERE spreadsheet_id = ?', (spreadsheet_id,)
+            ).fetchone()
+        return tuple(row) if row else (None, None)
+
+    def is_unchanged(self, spreadsheet_id, modified_time, settings):
+        """Return True when the last clean run started from this modifiedTime with these settings."""
+        return bool(modified_time) and self.modified_time(spreadsheet_id) == (modified_time, settings)
+
+    def record_modified_time(self, spreadsheet_id, modified_time, settings=None):
+        """Store the Drive modifiedTime a run started from and the fingerprint of its settings."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO spreadsheets (spreadsheet_id, modified_time, checked_at, settings) '
+                'VALUES (?, ?, ?, ?)',
+                (spreadsheet_id, modified_time, _now(), settings)
+            )
+
+    def summary_fingerprint(self, spreadsheet_id, summary_tab):
+        """Return the fingerprint of the summary last written to a spreadsheet's summary tab, or None."""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT fingerprint FROM summaries WHERE spreadsheet_id = ? AND summary_tab = ?',
+                (spreadsheet_id, summary_tab)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_summary(self, spreadsheet_id, summary_tab, fingerprint):
+        """Store the fingerprint of the summary just written."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO summaries (spreadsheet_id, summary_tab, fingerprint, updated_at) '
+                'VALUES (?, ?, ?, ?)',
+                (spreadsheet_id, summary_tab, fingerprint, _now())
+            )
+
+    def close(self):
+        self.connection.close()
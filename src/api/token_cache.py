@@ -0,0 +1,127 @@
+# Persisted OAuth access tokens.
+# A service account's access token is valid for an hour. The ones still valid are kept
+# in a small local file, so short runs and every process of a longer one reuse them
+# instead of signing a new assertion and exchanging it with oauth2.googleapis.com.
+# Only the standard library is imported here; google-auth is loaded on a cache miss.
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+from settings import HTTP_TIMEOUT
+
+# Token file, readable by the current user only. Override with RADAR_TOKEN_CACHE;
+# an empty value turns the cache off.
+TOKEN_CACHE = os.environ.get(
+    'RADAR_TOKEN_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'radarsheets', 'tokens.json')
+)
+TOKEN_REFRESH_MARGIN = 300  # Treat a token as expired this many seconds early
+
+_lock = threading.Lock()
+
+
+def _utcnow():
+    """Return the current time as naive UTC, the form google-auth stores expiry in."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def is_fresh(expiry, margin=TOKEN_REFRESH_MARGIN):
+    """Return True when a token expiring at expiry (naive UTC) is good for more than margin seconds."""
+    return expiry is not None and (expiry - _utcnow()).total_seconds() > margin
+
+def cache_key(service_account_file, scopes):
+    """
+    Return the cache key of a key file and scope set. The file's modification time is
+    part of it, so a replaced or rotated key never reuses the old key's tokens.
+    """
+    path = os.path.abspath(service_account_file)
+    try:
+        modified = os.stat(path).st_mtime_ns
+    except OSError:
+        modified = None
+    payload = json.dumps([path, modified, sorted(scopes)], separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+        return entries if isinstance(entries, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def load_token(key, path=TOKEN_CACHE):
+    """Return the cached (token, expiry) for a key while it is still fresh, or None."""
+    if not path:
+        return None
+    with _lock:
+        entry = _read(path).get(key)
+    if not entry:
+        return None
+    try:
+        expiry = datetime.fromisoformat(entry['expiry'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (entry['token'], expiry) if is_fresh(expiry) else None
+
+def save_token(key, token, expiry, path=TOKEN_CACHE):
+    """Store a token and drop expired entries. The file is replaced atomically, mode 0600."""
+    if not path or not token or expiry is None:
+        return
+    with _lock:
+        entries = {
+            entry_key: entry for entry_key, entry in _read(path).items()
+            if isinstance(entry, dict) and entry.get('expiry', '') > _utcnow().isoformat()
+        }
+        entries[key] = {'token': token, 'expiry': expiry.isoformat()}
+        directory = os.path.dirname(os.path.abspath(path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tokens-')  # Created with mode 0600
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Could not write the token cache {path}: {e}")
+
+def persist_tokens(credentials, key, path=TOKEN_CACHE):
+    """
+    Seed google-auth credentials with a cached token and store every token they refresh.
+    Returns the credentials.
+    """
+    if not path:
+        return credentials
+    cached = load_token(key, path)
+    if cached is not None:
+        credentials.token, credentials.expiry = cached
+    refresh = credentials.refresh
+
+    def refresh_and_store(request):
+        refresh(request)
+        save_token(key, credentials.token, credentials.expiry, path)
+
+    credentials.refresh = refresh_and_store
+    return credentials
+
+def access_token(service_account_file, scopes, path=TOKEN_CACHE, refresh=False):
+    """
+    Return a valid access token for a service account, from the cache when possible.
+    Only a cache miss imports google-auth and makes the token exchange.
+    - refresh: Skip the cached token, e.g. after the API rejected it; the new one is cached.
+    """
+    key = cache_key(service_account_file, scopes)
+    cached = None if refresh else load_token(key, path)
+    if cached is not None:
+        return cached[0]
+
+    import google_auth_httplib2
+    import httplib2
+    from google.oauth2.service_account import Credentials
+
+    if not os.path.exists(service_account_file):
+        raise FileNotFoundError(f"Service account file not found: {os.path.abspath(service_account_file)}")
+    credentials = Credentials.from_service_account_file(service_account_file, scopes=list(scopes))
+    credentials.refresh(google_auth_httplib2.Request(httplib2.Http(timeout=HTTP_TIMEOUT)))
+    save_token(key, credentials.token, credentials.expiry, path)
+    return credentials.token
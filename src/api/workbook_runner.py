@@ -0,0 +1,226 @@
+# Fan-out runner for several spreadsheets.
+# Runs one RadarPipeline per workbook on a small thread pool. Every pipeline shares the
+# render pool, upload threads, state store and the process-wide quota scheduler, so
+# adding workbooks fills idle API capacity instead of adding whole runs end to end.
+import json
+import os
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from aggregates import MEAN_OVERLAY, SUMMARY_TAB
+from data_cleaner import CLEAN_DATA
+from drive_uploads import UPLOAD_WORKERS, UploadExecutor
+from html_dashboard import HTML_MODE
+from output_profiles import OUTPUT_PROFILE
+from pipeline import RadarPipeline
+from run_journal import RunJournal
+from settings import spreadsheet_id_from
+from state_store import settings_fingerprint, spreadsheet_modified_time
+
+# Workbooks processed at once. The quota buckets pace their API calls together, so more
+# workers only help while some workbooks are rendering or waiting on uploads.
+# Override with RADAR_WORKBOOK_WORKERS.
+WORKBOOK_WORKERS = int(os.environ.get('RADAR_WORKBOOK_WORKERS', 4))
+
+Workbook = namedtuple('Workbook', ['spreadsheet_id', 'name', 'output_dir'])
+
+
+def make_workbooks(entries, output_dir):
+    """
+    Build Workbooks from IDs, URLs or manifest dicts.
+    - entries: Strings, or dicts with spreadsheet_id and optional name and output_dir.
+    - output_dir: Base output directory. With one workbook it is used as is; with several,
+      each workbook writes to output_dir/<name> unless it sets its own output_dir.
+    """
+    workbooks = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {'spreadsheet_id': entry}
+        spreadsheet_id = spreadsheet_id_from(entry['spreadsheet_id'])
+        workbooks.append(Workbook(spreadsheet_id, entry.get('name') or spreadsheet_id, entry.get('output_dir')))
+
+    seen = set()
+    for workbook in workbooks:
+        if workbook.spreadsheet_id in seen:
+            raise ValueError(f"Spreadsheet {workbook.spreadsheet_id} is listed more than once")
+        seen.add(workbook.spreadsheet_id)
+
+    if len(workbooks) == 1:
+        return [workbooks[0]._replace(output_dir=workbooks[0].output_dir or output_dir)]
+    return [
+        workbook._replace(output_dir=workbook.output_dir or os.path.join(output_dir, workbook.name))
+        for workbook in workbooks
+    ]
+
+def read_manifest(path):
+    """
+    Read a workbook manifest and return its entries for make_workbooks.
+    - path: A .json file holding a list (or {"workbooks": [...]}) of IDs or dicts with
+      spreadsheet_id, name and output_dir; any other file lists one ID or URL per line,
+      optionally followed by a name. Blank lines and lines starting with # are ignored.
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith('.json'):
+            entries = json.load(f)
+            if isinstance(entries, dict):
+                entries = entries['workbooks']
+        else:
+            entries = []
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                spreadsheet_id, _, name = line.partition(' ')
+                entries.append({'spreadsheet_id': spreadsheet_id, 'name': name.strip() or None})
+    return entries
+
+def _workbook_summary(workbook, error=None, unchanged=False):
+    """Return the summary of a workbook that did not run its pipeline."""
+    return {
+        'spreadsheet_id': workbook.spreadsheet_id,
+        'name': workbook.name,
+        'unchanged': unchanged,
+        'error': str(error) if error else None,
+        'failed_inserts': [],
+        'invalid_sheets': [],
+        'rejected_cells': [],
+        'counts': {},
+        'stage_seconds': {},
+        'total_seconds': 0.0,
+    }
+
+def run_workbook(workbook, sheets_factory, drive_factory, render_pool, uploader=None, state=None,
+                 incremental=False, batch_writes=True, html_mode=HTML_MODE, upload_workers=UPLOAD_WORKERS,
+                 journal_dir=None, resume=False, summary_tab=SUMMARY_TAB, mean_overlay=MEAN_OVERLAY,
+                 clean_data=CLEAN_DATA):
+    """
+    Run the pipeline for one workbook and return its summary.
+    With a state store, an incremental run of a spreadsheet whose Drive modifiedTime and
+    run settings (output profile, mean overlay, cleaning, summary tab) have not changed
+    since the last clean incremental run is skipped without reading it.
+    - journal_dir: Directory for the workbook's step journal; no journal is kept when None.
+    - resume: Skip the steps the journal shows an interrupted earlier run completed.
+    - summary_tab, mean_overlay: Aggregate settings, see RadarPipeline.
+    - clean_data: Clean the rows as they are read, see RadarPipeline.
+    """
+    modified_time = None
+    profile = render_pool.profile if render_pool is not None else OUTPUT_PROFILE  # As RadarPipeline picks it
+    settings = settings_fingerprint(profile, mean_overlay, clean_data, summary_tab)
+    # Only incremental runs use (and record) the modifiedTime, so others skip the files.get
+    if state is not None and incremental:
+        modified_time = spreadsheet_modified_time(drive_factory(), workbook.spreadsheet_id)
+        if state.is_unchanged(workbook.spreadsheet_id, modified_time, settings):
+            print(f"Spreadsheet {workbook.name} unchanged since {modified_time}; nothing to do.")
+            return _workbook_summary(workbook, unchanged=True)
+
+    journal = RunJournal(workbook.spreadsheet_id, resume=resume, directory=journal_dir) if journal_dir else None
+    pipeline = RadarPipeline(
+        sheets_factory(),
+        drive_factory,
+        workbook.spreadsheet_id,
+        workbook.output_dir,
+        render_pool=render_pool,
+        upload_workers=upload_workers,
+        batch_writes=batch_writes,
+        html_mode=html_mode,
+        state=state,
+        incremental=incremental,
+        sheets_factory=sheets_factory,
+        uploader=uploader,
+        journal=journal,
+        summary_tab=summary_tab,
+        mean_overlay=mean_overlay,
+        clean_data=clean_data,
+    )
+    try:
+        summary = pipeline.run()
+    except BaseException:
+        if journal is not None:
+            journal.close()  # Left unfinished, so the next --resume continues from it
+        raise
+    summary['name'] = workbook.name
+    summary['unchanged'] = False
+
+    # Record the modifiedTime this run started from. Our own writes change it, so the
+    # next incremental run does one cheap fingerprint pass before it can skip entirely.
+    clean = not summary['error'] and not summary['failed_inserts']
+    if state is not None and incremental and clean:
+        state.record_modified_time(workbook.spreadsheet_id, modified_time, settings)
+    if journal is not None:
+        journal.finish(clean)
+    return summary
+
+def combine_summaries(summaries, total_seconds):
+    """
+    Merge per-workbook summaries into one run summary.
+    Counts and stage seconds are summed over workbooks (stages overlap, so the stage
+    seconds are busy time, not wall time); total_seconds is the wall time of the run.
+    """
+    counts = Counter()
+    stage_seconds = Counter()
+    for summary in summaries:
+        counts.update(summary['counts'])
+        stage_seconds.update(summary['stage_seconds'])
+    return {
+        'workbooks': summaries,
+        'unchanged_workbooks': [summary['name'] for summary in summaries if summary['unchanged']],
+        'errors': {summary['name']: summary['error'] for summary in summaries if summary['error']},
+        'failed_inserts': {summary['name']: summary['failed_inserts'] for summary in summaries
+                           if summary['failed_inserts']},
+        'invalid_sheets': {summary['name']: summary['invalid_sheets'] for summary in summaries
+                           if summary['invalid_sheets']},
+        'rejected_cells': {summary['name']: summary['rejected_cells'] for summary in summaries
+                           if summary['rejected_cells']},
+        'counts': dict(counts),
+        'stage_seconds': dict(stage_seconds),
+        'total_seconds': total_seconds,
+    }
+
+def run_workbooks(workbooks, sheets_factory, drive_factory, render_pool, state=None, incremental=False,
+                  batch_writes=True, html_mode=HTML_MODE, upload_workers=UPLOAD_WORKERS,
+                  workers=WORKBOOK_WORKERS, journal_dir=None, resume=False, uploader=None,
+                  summary_tab=SUMMARY_TAB, mean_overlay=MEAN_OVERLAY, clean_data=CLEAN_DATA):
+    """
+    Process several workbooks concurrently and return the combined summary.
+    - sheets_factory, drive_factory: Callables returning the calling thread's services.
+    - render_pool: RenderPool shared by every workbook.
+    - upload_workers: Upload threads shared by every workbook.
+    - workers: Workbooks processed at once.
+    - journal_dir, resume: Step journal settings, see run_workbook.
+    - uploader: Upload executor to share, e.g. an AsyncUploadExecutor; by default an
+      UploadExecutor with upload_workers threads is used for the duration of the call.
+    - summary_tab, mean_overlay: Aggregate settings, see RadarPipeline.
+    - clean_data: Clean the rows as they are read, see RadarPipeline.
+    A workbook that fails is reported in the summary's errors; the others still run.
+    """
+    start = time.perf_counter()
+
+    def run(workbook):
+        try:
+            return run_workbook(workbook, sheets_factory, drive_factory, render_pool, uploader, state,
+                                incremental, batch_writes, html_mode, upload_workers, journal_dir, resume,
+                                summary_tab, mean_overlay, clean_data)
+        except Exception as e:
+            print(f"Error processing spreadsheet {workbook.name}: {e}")
+            return _workbook_summary(workbook, error=e)
+
+    uploads = nullcontext(uploader) if uploader is not None else UploadExecutor(drive_factory, workers=upload_workers)
+    with uploads as uploader, \
+            ThreadPoolExecutor(max_workers=max(1, min(workers, len(workbooks))),
+                               thread_name_prefix='workbook') as executor:
+        summaries = list(executor.map(run, workbooks))
+    return combine_summaries(summaries, time.perf_counter() - start)
+
+def print_summary(summary):
+    """Print the per-workbook results and totals of a combined summary."""
+    for workbook in summary['workbooks']:
+        if workbook['unchanged']:
+            status = 'unchanged'
+        elif workbook['error']:
+            status = f"stopped early: {workbook['error']}"
+        else:
+            status = f"{workbook['counts'].get('companies', 0)} companies in {workbook['total_seconds']:.1f}s"
+        print(f"  {workbook['name']}: {status}")
+    print(f"Processed {len(summary['workbooks'])} spreadsheets in {summary['total_seconds']:.1f}s: {summary['counts']}")
@@ -0,0 +1,26 @@
+# Shared fixtures for the RadarSheets tests.
+# The modules in src/api import each other by bare name, so that directory goes on
+# sys.path. Tests that call the Google APIs run against the local ApiEmulator, so the
+# published quotas are lifted and images are drawn with the raster backend.
+import os
+import sys
+
+import pytest
+
+for name in ('RADAR_SHEETS_READS_PER_MINUTE', 'RADAR_SHEETS_WRITES_PER_MINUTE', 'RADAR_DRIVE_REQUESTS_PER_MINUTE'):
+    os.environ.setdefault(name, '600000')
+os.environ.setdefault('RADAR_PNG_BACKEND', 'raster')
+os.environ.setdefault('RADAR_RENDER_WORKERS', '1')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'api'))
+
+import google_clients  # noqa: E402
+from api_emulator import ApiEmulator  # noqa: E402
+
+
+@pytest.fixture
+def emulator(monkeypatch):
+    """A running ApiEmulator that google_clients and async_clients send every call to."""
+    with ApiEmulator() as api:
+        monkeypatch.setattr(google_clients, 'API_EMULATOR', api.url)
+        yield api
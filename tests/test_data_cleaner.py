@@ -0,0 +1,78 @@
+import math
+
+from data_cleaner import (BLANK, DUPLICATE, FORMULA_ERROR, NOT_A_NUMBER, OUT_OF_RANGE, DataCleaner, clean_text,
+                          coerce_score)
+from ingest import company_groups, ingest_rows
+
+CATEGORIES = ['Innovate', 'Impact', 'Savings', 'Scalability', 'Risk']
+
+
+def test_clean_text():
+    assert clean_text('  Acme\u200b   Corp\n') == 'Acme Corp'
+    assert clean_text('\uff21cme') == 'Acme'  # Full-width letters (NFKC)
+    assert clean_text(12.0) == '12'
+    assert clean_text(None) == ''
+
+def test_coerce_score():
+    assert coerce_score(7) == 7.0
+    assert coerce_score(' 7.5 ') == 7.5
+    assert coerce_score('7,5') == 7.5
+    assert math.isnan(coerce_score(True))
+    assert math.isnan(coerce_score(''))
+    assert math.isnan(coerce_score('#N/A'))
+
+def test_rejected_cells_are_reported_with_their_address():
+    cleaner = DataCleaner()
+    rows = [
+        [' Acme ', 'Ann', 'NREL', 1, '2', '3,5', 4, 5],
+        ['Acme', 'Bob', 'ORNL', '', 2, 3, 4, 5],
+        ['Acme', 'Cy', 'PNNL', '#REF!', 2, 3, 4, 5],
+        ['Acme', 'Di', 'ANL', 1, 'tbd', 3, 4, 5],
+        ['', '', '', 'notes', '', '', '', ''],  # No company: ignored, not reported
+    ]
+    groups = list(company_groups(ingest_rows(rows, CATEGORIES, first_row=1, cleaner=cleaner, sheet_name='Tab')))
+
+    assert groups == [('Acme', 1, [('Ann', 'NREL', [1.0, 2.0, 3.5, 4.0, 5.0])])]
+    report = cleaner.report()
+    assert report['rejected_cells'] == 3
+    assert report['reasons'] == {BLANK: 1, FORMULA_ERROR: 1, NOT_A_NUMBER: 1}
+    assert [(cell['cell'], cell['reason']) for cell in report['cells']] == [
+        ('D3', BLANK), ('D4', FORMULA_ERROR), ('E5', NOT_A_NUMBER)
+    ]
+
+def test_score_range_check_is_opt_in():
+    rows = [['Acme', 'Ann', 'NREL', 11, 2, 3, 4, -1]]
+    lenient = DataCleaner(check_range=False)
+    ingest_rows(rows, CATEGORIES, first_row=1, cleaner=lenient, sheet_name='Tab')
+    assert len(lenient) == 0
+
+    strict = DataCleaner(check_range=True)
+    frame = ingest_rows(rows, CATEGORIES, first_row=1, cleaner=strict, sheet_name='Tab')
+    assert not frame.valid.any()
+    assert [(cell['cell'], cell['reason']) for cell in strict.report()['cells']] == [
+        ('D2', OUT_OF_RANGE), ('H2', OUT_OF_RANGE)
+    ]
+
+def test_dedupe_is_opt_in_and_spans_chunks():
+    first_chunk = [['Acme', 'Ann', 'NREL', 1, 1, 1, 1, 1], ['Acme', 'ann', 'NREL', 2, 2, 2, 2, 2]]
+    second_chunk = [['Acme', 'Ann', 'NREL', 3, 3, 3, 3, 3], ['Acme', 'Ann', 'ORNL', 4, 4, 4, 4, 4]]
+
+    keep_all = DataCleaner(dedupe=False)
+    kept = [len(rows) for chunk, first_row in ((first_chunk, 1), (second_chunk, 3))
+            for _, _, rows in company_groups(ingest_rows(chunk, CATEGORIES, first_row, keep_all, 'Tab'))]
+    assert kept == [2, 2]
+
+    cleaner = DataCleaner(dedupe=True)
+    first = list(company_groups(ingest_rows(first_chunk, CATEGORIES, 1, cleaner, 'Tab')))
+    second = list(company_groups(ingest_rows(second_chunk, CATEGORIES, 3, cleaner, 'Tab')))
+    assert [row[:2] for row in first[0][2]] == [('Ann', 'NREL')]
+    assert [row[:2] for row in second[0][2]] == [('Ann', 'ORNL')]
+    assert [(cell['cell'], cell['reason']) for cell in cleaner.report()['cells']] == [
+        ('B3', DUPLICATE), ('B4', DUPLICATE)
+    ]
+
+    # Once the tab is finished its rows are forgotten
+    cleaner.finish_sheet('Tab')
+    again = list(company_groups(ingest_rows(second_chunk, CATEGORIES, 3, cleaner, 'Tab')))
+    assert len(again[0][2]) == 2
+
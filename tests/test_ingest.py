@@ -0,0 +1,55 @@
+import numpy as np
+
+from ingest import company_groups, ingest_rows, parse_scores, tab_categories
+
+HEADER = ['Company', 'Evaluator', 'Lab', 'Innovate', 'Impact', 'Savings', 'Scalability', 'Risk']
+
+
+def test_tab_categories():
+    assert tab_categories(HEADER) == ['Innovate', 'Impact', 'Savings', 'Scalability', 'Risk']
+    assert tab_categories(HEADER[:5]) is None
+    assert tab_categories(None) is None
+
+def test_parse_scores_turns_text_and_blanks_into_nan():
+    scores = parse_scores(np.array([[1, '2', ''], ['x', 4.5, None]], dtype=object))
+    assert scores[0, :2].tolist() == [1.0, 2.0]
+    assert np.isnan(scores[0, 2]) and np.isnan(scores[1, 0]) and np.isnan(scores[1, 2])
+    assert scores[1, 1] == 4.5
+
+def test_ingest_rows():
+    rows = [
+        ['Acme', 'Ann', 'NREL', 1, 2, 3, 4, 5],
+        ['Beta', 'Ann', 'ORNL', 5, 4, 3, 2, 1],
+        ['Acme', 'Bob', 'PNNL', 1, 1, 1, 1, ''],  # Blank score: incomplete
+        ['Gamma', 'Bob'],                          # Short row
+        ['Acme', 'Cy', 'ANL', 2, 2, 2, 2, 2],
+    ]
+    frame = ingest_rows(rows, HEADER[3:], first_row=10)
+    assert frame.company_names == ['Acme', 'Beta']
+    assert frame.company_codes.tolist() == [0, 1, 0, -1, 0]
+    assert frame.valid.tolist() == [True, True, False, False, True]
+    assert frame.row_numbers.tolist() == [10, 11, 12, 13, 14]
+    assert frame.first_rows.tolist() == [10, 11]
+
+def test_ingest_rows_empty():
+    frame = ingest_rows([], HEADER[3:], first_row=1)
+    assert frame.company_names == []
+    assert frame.scores.shape == (0, 5)
+    assert list(company_groups(frame)) == []
+
+def test_company_groups_keep_sheet_order():
+    rows = [
+        ['Acme', 'Ann', 'NREL', 1, 2, 3, 4, 5],
+        ['Beta', 'Ann', 'ORNL', 5, 4, 3, 2, 1],
+        ['Acme', 'Bob', 'PNNL', 'n/a', 1, 1, 1, 1],
+        ['Acme', 'Cy', 'ANL', 2, 2, 2, 2, 2],
+    ]
+    groups = list(company_groups(ingest_rows(rows, HEADER[3:], first_row=1)))
+    assert groups == [
+        ('Acme', 1, [('Ann', 'NREL', [1.0, 2.0, 3.0, 4.0, 5.0]), ('Cy', 'ANL', [2.0, 2.0, 2.0, 2.0, 2.0])]),
+        ('Beta', 2, [('Ann', 'ORNL', [5.0, 4.0, 3.0, 2.0, 1.0])]),
+    ]
+
+def test_company_without_valid_rows_is_yielded_empty():
+    rows = [['Acme', 'Ann', 'NREL', '', '', '', '', '']]
+    assert list(company_groups(ingest_rows(rows, HEADER[3:], first_row=1))) == [('Acme', 1, [])]
@@ -0,0 +1,147 @@
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+import request_scheduler
+from api_emulator import ApiEmulator, synthetic_workbook
+from google_clients import get_sheets_service
+from request_scheduler import (DRIVE, SHEETS_READ, SHEETS_WRITE, RequestScheduler, TokenBucket, backoff_delay,
+                               bucket_for, is_retryable, is_throttled, retry_after)
+
+
+class Clock:
+    """Stands in for time.monotonic and time.sleep, so waits take no time."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(request_scheduler.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(request_scheduler.time, 'sleep', clock.sleep)
+    return clock
+
+def http_error(status, retry_after=None, reason=None):
+    headers = {'status': str(status)}
+    if retry_after is not None:
+        headers['retry-after'] = str(retry_after)
+    body = {'error': {'code': status, 'message': 'Failed', 'errors': [{'reason': reason or 'backendError'}]}}
+    return HttpError(httplib2.Response(headers), json.dumps(body).encode('utf-8'))
+
+
+def test_bucket_for():
+    assert bucket_for('sheets.spreadsheets.values.batchGet') == SHEETS_READ
+    assert bucket_for('sheets.spreadsheets.values.batchUpdate') == SHEETS_WRITE
+    assert bucket_for('drive.files.list') == DRIVE
+
+def test_token_bucket_allows_a_burst_then_paces(clock):
+    bucket = TokenBucket(60, burst=3)  # One token per second
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_acquire() == pytest.approx(1.0)
+    clock.now += 0.5
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+def test_token_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(60, burst=2)
+    bucket.try_acquire(2)
+    clock.now += 60
+    assert bucket.try_acquire(2) == 0.0
+    assert bucket.try_acquire() > 0
+
+def test_token_bucket_lets_large_requests_through_in_debt(clock):
+    bucket = TokenBucket(60, burst=2)
+    assert bucket.try_acquire(5) == 0.0  # A full bucket admits a batch larger than itself
+    assert bucket.try_acquire() == pytest.approx(4.0)
+
+def test_token_bucket_pause(clock):
+    bucket = TokenBucket(60, burst=5)
+    bucket.pause(3)
+    assert bucket.try_acquire() == pytest.approx(3.0)
+    clock.now += 3
+    # The pause also emptied the bucket, so the next token is a refill away
+    assert bucket.try_acquire() == 0.0
+
+def test_retryable_and_throttled_errors():
+    assert is_retryable(http_error(429)) and is_throttled(http_error(429))
+    assert is_retryable(http_error(503)) and not is_throttled(http_error(503))
+    assert is_retryable(http_error(403, reason='userRateLimitExceeded'))
+    assert is_throttled(http_error(403, reason='rateLimitExceeded'))
+    assert not is_retryable(http_error(403, reason='forbidden'))
+    assert not is_retryable(http_error(404))
+    assert is_retryable(ConnectionError())
+    assert not is_retryable(ValueError())
+
+def test_retry_after_and_backoff_delay(monkeypatch):
+    monkeypatch.setattr(request_scheduler.random, 'random', lambda: 0.5)
+    assert retry_after(http_error(429, retry_after=7)) == 7.0
+    assert retry_after(http_error(429, retry_after='Wed, 21 Oct 2026 07:28:00 GMT')) is None
+    assert retry_after(http_error(429)) is None
+    assert backoff_delay(3, http_error(429, retry_after=7)) == 7.0
+    assert backoff_delay(3, http_error(500)) == 4.5
+    assert backoff_delay(20) == request_scheduler.MAX_BACKOFF
+
+def test_call_waits_retry_after_and_pauses_the_bucket(clock):
+    scheduler = RequestScheduler(rates={SHEETS_READ: 6000, SHEETS_WRITE: 6000, DRIVE: 6000})
+    responses = [http_error(429, retry_after=2), http_error(429, retry_after=5), 'done']
+
+    def send():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    start = clock.now
+    assert scheduler.call('sheets.spreadsheets.values.batchGet', send) == 'done'
+    assert clock.sleeps == [2.0, 5.0]
+    assert scheduler.buckets[SHEETS_READ].paused_until == pytest.approx(start + 7)
+    assert scheduler.buckets[SHEETS_WRITE].paused_until == 0.0
+
+def test_call_raises_errors_that_are_not_retryable(clock):
+    scheduler = RequestScheduler()
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise http_error(404)
+
+    with pytest.raises(HttpError):
+        scheduler.call('drive.files.get', send)
+    assert len(calls) == 1 and not clock.sleeps
+
+def test_call_gives_up_after_max_retries(clock):
+    scheduler = RequestScheduler(max_retries=2)
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise http_error(503)
+
+    with pytest.raises(HttpError):
+        scheduler.call('drive.files.get', send)
+    assert len(calls) == 3 and len(clock.sleeps) == 2
+
+def test_quota_errors_from_the_api_are_retried(monkeypatch):
+    import google_clients
+
+    with ApiEmulator(quota_error_rate=0.3, retry_after=0, seed=1) as api:
+        monkeypatch.setattr(google_clients, 'API_EMULATOR', api.url)
+        spreadsheet_id = api.add_spreadsheet(synthetic_workbook(tabs=1, companies_per_tab=2))
+        spreadsheets = get_sheets_service().spreadsheets()
+        for _ in range(20):
+            assert spreadsheets.get(spreadsheetId=spreadsheet_id).execute()['spreadsheetId'] == spreadsheet_id
+        calls = api.call_counts()
+    assert calls['quota_errors'] > 0
+    assert calls['sheets.spreadsheets.get'] == 20 + calls['quota_errors']
@@ -0,0 +1,64 @@
+from run_journal import (RENDERED, RESIZED, UPLOADED, WRITTEN, RunJournal, journal_path, read_journal,
+                         unfinished_steps)
+
+
+def test_unfinished_steps_start_after_the_last_clean_finish():
+    records = [
+        {'step': RENDERED, 'sheet': 'Tab', 'company': 'Old'},
+        {'event': 'run_finished', 'clean': True},
+        {'event': 'run_started', 'resume': False},
+        {'step': RENDERED, 'sheet': 'Tab', 'company': 'Acme', 'fingerprint': 'a'},
+        {'step': UPLOADED, 'sheet': 'Tab', 'company': 'Acme', 'file_id': 'f1'},
+        {'event': 'run_finished', 'clean': False},
+        {'step': UPLOADED, 'sheet': 'Tab', 'company': 'Acme', 'file_id': 'f2'},
+        {'step': 'unknown', 'sheet': 'Tab', 'company': 'Beta'},
+    ]
+    steps = unfinished_steps(records)
+    assert list(steps) == [('Tab', 'Acme')]
+    assert set(steps['Tab', 'Acme']) == {RENDERED, UPLOADED}
+    assert steps['Tab', 'Acme'][UPLOADED]['file_id'] == 'f2'
+
+def test_read_journal_ignores_a_torn_last_line(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    path.write_text('{"event":"run_started"}\n{"step":"rend', encoding='utf-8')
+    assert read_journal(str(path)) == [{'event': 'run_started'}]
+    assert read_journal(str(tmp_path / 'missing.jsonl')) == []
+
+def test_resume_after_an_interrupted_run(tmp_path):
+    directory = str(tmp_path)
+    journal = RunJournal('sheet-1', directory=directory)
+    journal.record(RENDERED, 'Tab', 'Acme', 'fp', 'K2')
+    journal.record(UPLOADED, 'Tab', 'Acme', 'fp', 'K2', file_id='f1')
+    journal.record(WRITTEN, 'Tab', 'Acme', 'fp', 'K2')
+    journal.record(RENDERED, 'Tab', 'Beta', 'fp-beta', 'K5')
+    journal.close()  # Interrupted: no finish()
+
+    resumed = RunJournal('sheet-1', resume=True, directory=directory)
+    assert set(resumed.completed('Tab', 'Acme', 'fp', 'K2')) == {RENDERED, UPLOADED, WRITTEN}
+    assert resumed.completed('Tab', 'Acme', 'fp', 'K2')[UPLOADED]['file_id'] == 'f1'
+    # The company's row moved: the cell steps must be redone, the upload still holds
+    assert set(resumed.completed('Tab', 'Acme', 'fp', 'K3')) == {RENDERED, UPLOADED}
+    # Its scores changed: nothing holds
+    assert resumed.completed('Tab', 'Acme', 'other', 'K2') == {}
+    assert resumed.completed('Tab', 'Gamma', 'fp', 'K9') == {}
+    resumed.record(RESIZED, 'Tab', 'Acme', 'fp', 'K2')
+    resumed.finish(clean=True)
+
+    # The interrupted run's records were kept in the same file
+    steps = [record.get('step') for record in read_journal(journal_path('sheet-1', directory))]
+    assert steps.count(RENDERED) == 2 and steps.count(RESIZED) == 1
+
+    after_clean_run = RunJournal('sheet-1', resume=True, directory=directory)
+    assert after_clean_run.steps == {}
+    after_clean_run.close()
+
+def test_without_resume_the_journal_starts_empty(tmp_path):
+    directory = str(tmp_path)
+    journal = RunJournal('sheet-1', directory=directory)
+    journal.record(RENDERED, 'Tab', 'Acme', 'fp', 'K2')
+    journal.close()
+
+    fresh = RunJournal('sheet-1', directory=directory)
+    assert fresh.completed('Tab', 'Acme', 'fp', 'K2') == {}
+    fresh.close()
+    assert [record.get('event') for record in read_journal(journal_path('sheet-1', directory))] == ['run_started']
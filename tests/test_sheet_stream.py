@@ -0,0 +1,72 @@
+from api_emulator import HEADER, synthetic_workbook
+from google_clients import get_sheets_service
+from ingest import company_groups, ingest_rows
+from sheet_stream import MIN_CHUNK_ROWS, stream_company_groups
+
+
+def _sheet_properties(sheets_service, spreadsheet_id):
+    metadata = sheets_service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
+    return [sheet['properties'] for sheet in metadata['sheets']]
+
+def _trimmed(row):
+    """A row as the API returns it: trailing empty cells dropped."""
+    row = list(row)
+    while row and row[-1] == '':
+        row.pop()
+    return row
+
+def _expected_groups(workbook):
+    """Groups of every tab, from one ingest of the whole tab."""
+    expected = {}
+    for title, rows in workbook.items():
+        rows = [_trimmed(row) for row in rows]
+        for company_name, first_row, valid_rows in company_groups(ingest_rows(rows[1:], rows[0][3:], first_row=1)):
+            expected[(title, company_name)] = (first_row, valid_rows)
+    return expected
+
+
+def test_groups_match_a_single_read_across_page_boundaries(emulator):
+    # Four rows per company, so companies straddle the MIN_CHUNK_ROWS page boundaries
+    workbook = synthetic_workbook(tabs=3, companies_per_tab=70, evaluators=4, seed=3)
+    spreadsheet_id = emulator.add_spreadsheet(workbook)
+    sheets_service = get_sheets_service()
+
+    groups = list(stream_company_groups(sheets_service, spreadsheet_id,
+                                        _sheet_properties(sheets_service, spreadsheet_id), page_rows=MIN_CHUNK_ROWS))
+
+    assert len(groups) == len({(group.sheet_name, group.company_name) for group in groups}) == 3 * 70
+    assert {(group.sheet_name, group.company_name): (group.target_row, group.valid_rows)
+            for group in groups} == _expected_groups(workbook)
+    assert all(group.categories == HEADER[3:] for group in groups)
+    # 281 rows per tab in chunks of MIN_CHUNK_ROWS: several pages, each covering every tab
+    assert emulator.call_counts()['sheets.spreadsheets.values.batchGet'] > 3
+
+def test_groups_are_yielded_before_the_last_page(emulator):
+    workbook = synthetic_workbook(tabs=1, companies_per_tab=100, evaluators=3)
+    spreadsheet_id = emulator.add_spreadsheet(workbook)
+    sheets_service = get_sheets_service()
+    groups = stream_company_groups(sheets_service, spreadsheet_id,
+                                   _sheet_properties(sheets_service, spreadsheet_id), page_rows=MIN_CHUNK_ROWS)
+
+    emulator.reset_counts()
+    first = next(groups)
+    assert first.company_name == 'Company 00-0000'
+    reads = emulator.call_counts()['sheets.spreadsheets.values.batchGet']
+    remaining = list(groups)
+    assert len(remaining) == 99
+    assert emulator.call_counts()['sheets.spreadsheets.values.batchGet'] > reads
+
+def test_tabs_with_another_layout_are_reported_and_skipped(emulator):
+    workbook = synthetic_workbook(tabs=1, companies_per_tab=5)
+    workbook['Notes'] = [['Comment'], ['Looks good']]
+    spreadsheet_id = emulator.add_spreadsheet(workbook)
+    sheets_service = get_sheets_service()
+    invalid_sheets = []
+
+    groups = list(stream_company_groups(sheets_service, spreadsheet_id,
+                                        _sheet_properties(sheets_service, spreadsheet_id),
+                                        invalid_sheets=invalid_sheets))
+
+    assert invalid_sheets == ['Notes']
+    assert {group.sheet_name for group in groups} == {'Topic 01'}
+    assert len(groups) == 5
@@ -0,0 +1,45 @@
+from sheet_writes import SheetWriteBatch, a1_range, column_letter, merge_indices
+
+
+def test_column_letter():
+    assert [column_letter(c) for c in (0, 10, 25, 26, 27, 701, 702)] == ['A', 'K', 'Z', 'AA', 'AB', 'ZZ', 'AAA']
+
+def test_a1_range_quotes_sheet_names():
+    assert a1_range("Bob's Tab", 'K2') == "'Bob''s Tab'!K2"
+
+def test_merge_indices():
+    assert merge_indices([]) == []
+    assert merge_indices([5]) == [(5, 6)]
+    assert merge_indices([7, 3, 4, 5, 5, 9, 8, 12]) == [(3, 6), (7, 10), (12, 13)]
+
+def test_dimension_requests_merge_adjacent_rows_and_columns():
+    batch = SheetWriteBatch('spreadsheet')
+    for row in (4, 1, 2, 7):
+        batch.add_resize('Tab', row, 10)
+    batch.add_resize('Tab', 3, 11, row_height=200, column_width=200)
+    batch.add_resize('Missing', 0, 0)
+
+    requests = batch.dimension_requests({'Tab': 42})
+    ranges = [
+        (r['updateDimensionProperties']['range']['dimension'],
+         r['updateDimensionProperties']['range']['startIndex'],
+         r['updateDimensionProperties']['range']['endIndex'],
+         r['updateDimensionProperties']['properties']['pixelSize'])
+        for r in requests
+    ]
+    assert ranges == [
+        ('COLUMNS', 11, 12, 200),
+        ('COLUMNS', 10, 11, 300),
+        ('ROWS', 3, 4, 200),
+        ('ROWS', 1, 3, 300),
+        ('ROWS', 4, 5, 300),
+        ('ROWS', 7, 8, 300),
+    ]
+    assert {r['updateDimensionProperties']['range']['sheetId'] for r in requests} == {42}
+
+def test_value_data():
+    batch = SheetWriteBatch('spreadsheet')
+    batch.add_image('Tab 1', 1, 10, 'https://example.com/a.png')
+    assert batch.value_data() == [
+        {'range': "'Tab 1'!K2", 'values': [['=IMAGE("https://example.com/a.png", 4, 300, 300)']]}
+    ]
@@ -0,0 +1,66 @@
+import sqlite3
+
+from output_profiles import OUTPUT_PROFILE
+from state_store import StateStore, group_fingerprint, settings_fingerprint, target_cell
+
+ROWS = [('Ann', 'NREL', [1, 2, 3, 4, 5])]
+CATEGORIES = ['Innovate', 'Impact', 'Savings', 'Scalability', 'Risk']
+
+
+def test_group_fingerprint():
+    fingerprint = group_fingerprint(CATEGORIES, ROWS)
+    assert fingerprint == group_fingerprint(CATEGORIES, [('Ann', 'NREL', [1.0, 2.0, 3.0, 4.0, 5.0])])
+    assert fingerprint != group_fingerprint(CATEGORIES, [('Ann', 'NREL', [1, 2, 3, 4, 6])])
+    assert fingerprint != group_fingerprint(CATEGORIES, ROWS, profile=OUTPUT_PROFILE)
+    assert fingerprint != group_fingerprint(CATEGORIES, ROWS, mean_overlay=True)
+
+def test_settings_fingerprint():
+    default = settings_fingerprint(OUTPUT_PROFILE)
+    assert default == settings_fingerprint(OUTPUT_PROFILE, summary_tab=None)
+    assert len({default, settings_fingerprint(OUTPUT_PROFILE, mean_overlay=True),
+                settings_fingerprint(OUTPUT_PROFILE, clean_data=False),
+                settings_fingerprint(OUTPUT_PROFILE, summary_tab='Summary')}) == 4
+
+def test_target_cell():
+    assert target_cell(0, 10) == 'K1'
+
+def test_groups(tmp_path):
+    with StateStore(str(tmp_path / 'state.db')) as state:
+        assert state.group('s', 'Tab', 'Acme') is None
+        state.record_group('s', 'Tab', 'Acme', 'fp', 'file-1', 'K2')
+        assert state.group('s', 'Tab', 'Acme') == ('fp', 'file-1', 'K2')
+        assert state.is_current('s', 'Tab', 'Acme', 'fp', 'K2')
+        assert not state.is_current('s', 'Tab', 'Acme', 'fp', 'K3')
+        assert not state.is_current('s', 'Tab', 'Acme', 'other', 'K2')
+        state.forget_group('s', 'Tab', 'Acme')
+        assert state.group('s', 'Tab', 'Acme') is None
+
+def test_shared_files_outlive_their_group(tmp_path):
+    with StateStore(str(tmp_path / 'state.db')) as state:
+        state.record_group('s', 'Tab', 'Acme', 'fp', 'file-1', 'K2')
+        state.record_shared(['file-1'])
+        state.forget_group('s', 'Tab', 'Acme')
+        assert state.is_shared('file-1') and not state.is_shared('file-2')
+
+def test_is_unchanged_needs_the_same_modified_time_and_settings(tmp_path):
+    with StateStore(str(tmp_path / 'state.db')) as state:
+        assert state.modified_time('s') == (None, None)
+        assert not state.is_unchanged('s', None, None)
+        state.record_modified_time('s', '2026-01-01T00:00:00Z', 'settings-a')
+        assert state.is_unchanged('s', '2026-01-01T00:00:00Z', 'settings-a')
+        assert not state.is_unchanged('s', '2026-01-02T00:00:00Z', 'settings-a')
+        assert not state.is_unchanged('s', '2026-01-01T00:00:00Z', 'settings-b')
+
+def test_databases_without_the_settings_column_are_migrated(tmp_path):
+    path = str(tmp_path / 'state.db')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE spreadsheets (spreadsheet_id TEXT PRIMARY KEY, modified_time TEXT, '
+                       'checked_at TEXT NOT NULL)')
+    connection.execute("INSERT INTO spreadsheets VALUES ('s', '2026-01-01T00:00:00Z', '2026-01-01')")
+    connection.commit()
+    connection.close()
+
+    with StateStore(path) as state:
+        assert state.modified_time('s') == ('2026-01-01T00:00:00Z', None)
+        # Recorded before settings were: never counts as unchanged
+        assert not state.is_unchanged('s', '2026-01-01T00:00:00Z', settings_fingerprint(OUTPUT_PROFILE))
@@ -0,0 +1,72 @@
+import google_clients
+import pytest
+from api_emulator import synthetic_workbook
+from radar_render import RenderPool
+from state_store import StateStore
+from workbook_runner import make_workbooks, run_workbooks
+
+
+@pytest.fixture
+def render_pool():
+    with RenderPool(1, png_backend='raster') as pool:
+        yield pool
+
+def run(workbooks, render_pool, **options):
+    options.setdefault('html_mode', 'none')
+    return run_workbooks(workbooks, google_clients.get_sheets_service, google_clients.get_drive_service,
+                         render_pool, workers=2, **options)
+
+def image_formulas(emulator, spreadsheet_id):
+    values = emulator.spreadsheets[spreadsheet_id]['values']
+    return [cell for rows in values.values() for row in rows for cell in row
+            if isinstance(cell, str) and cell.startswith('=IMAGE(')]
+
+
+def test_run_batches_the_sheet_writes_per_spreadsheet(emulator, render_pool, tmp_path):
+    spreadsheet_ids = [emulator.add_spreadsheet(synthetic_workbook(tabs=2, companies_per_tab=6, seed=seed))
+                       for seed in range(2)]
+    workbooks = make_workbooks(spreadsheet_ids, str(tmp_path))
+
+    summary = run(workbooks, render_pool)
+
+    assert summary['errors'] == {} and summary['failed_inserts'] == {}
+    assert summary['counts']['companies'] == summary['counts']['rendered'] == summary['counts']['written'] == 24
+    calls = emulator.call_counts()
+    assert calls['sheets.spreadsheets.values.batchUpdate'] == len(spreadsheet_ids)
+    assert calls['sheets.spreadsheets.batchUpdate'] == len(spreadsheet_ids)
+    assert 'sheets.spreadsheets.values.update' not in calls
+    assert 'drive.files.get' not in calls  # Only incremental runs check the modifiedTime
+    for spreadsheet_id in spreadsheet_ids:
+        assert len(image_formulas(emulator, spreadsheet_id)) == 12
+
+def test_incremental_runs_skip_unchanged_groups_and_spreadsheets(emulator, render_pool, tmp_path):
+    spreadsheet_id = emulator.add_spreadsheet(synthetic_workbook(tabs=2, companies_per_tab=5))
+    workbooks = make_workbooks([spreadsheet_id], str(tmp_path))
+    state = StateStore(str(tmp_path / 'state.db'))
+
+    first = run(workbooks, render_pool, state=state, incremental=True)
+    assert first['counts']['rendered'] == 10
+
+    # Our own writes changed the modifiedTime, so this pass reads the rows once more
+    emulator.reset_counts()
+    second = run(workbooks, render_pool, state=state, incremental=True)
+    assert second['counts']['skipped'] == 10 and second['counts']['rendered'] == 0
+    assert 'sheets.spreadsheets.values.batchUpdate' not in emulator.call_counts()
+
+    emulator.reset_counts()
+    third = run(workbooks, render_pool, state=state, incremental=True)
+    assert third['unchanged_workbooks'] == [workbooks[0].name]
+    assert emulator.call_counts() == {'drive.files.get': 1}
+
+    # New run settings are not skipped even though the spreadsheet is unchanged
+    emulator.reset_counts()
+    overlay = run(workbooks, render_pool, state=state, incremental=True, mean_overlay=True)
+    assert overlay['unchanged_workbooks'] == []
+    assert overlay['counts']['rendered'] == 10
+
+    # An evaluator's edit republishes only that company
+    emulator.edit_cells(spreadsheet_id, "'Topic 01'!D2:H2", [[1, 2, 3, 4, 5]])
+    edited = run(workbooks, render_pool, state=state, incremental=True, mean_overlay=True)
+    assert edited['unchanged_workbooks'] == []
+    assert edited['counts']['rendered'] == 1 and edited['counts']['skipped'] == 9
+    state.close()